@@ -0,0 +1,293 @@
+"""
+Micro-benchmarks for the model, database, ranking, keyboard and validation hot paths.
+
+Each size seeds a fresh SQLite database with that many links and users.
+--database-uri runs the database cases against another backend instead,
+e.g. a local PostgreSQL database; its links and users tables are dropped
+and reseeded for every size.
+Results are written as JSON and can be compared against a stored baseline:
+
+    python -m benchmarks.run --sizes 1000,10000 --output bench.json
+    python -m benchmarks.run --sizes 1000,10000 --save-baseline bench_baseline.json
+    python -m benchmarks.run --sizes 1000,10000 --baseline bench_baseline.json
+
+The exit status is 1 when any case is slower than the baseline by more
+than --tolerance, so the run can gate a deploy.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+import sqlalchemy
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.link_model import Link
+from models.user_model import User, Base
+from database import get_all_links, get_link_by_id, get_link_page, iter_link_stats
+from handlers.link_handlers import create_links_keyboard
+from handlers.user_handlers import check_active_link
+from handlers.validation import is_valid_title, is_valid_group_link
+from utils.ranking import RankingCalculator
+from utils.helpers import escape_markdown
+
+DEFAULT_SIZES = "1000,10000,100000"
+# Voter lists are capped here; real links rarely collect more votes
+MAX_VOTERS = 10_000
+SEED_CHUNK = 10_000
+
+
+def measure(function: Callable[[], object], repeat: int, min_time: float) -> Dict[str, float]:
+    """
+    Time a callable. The loop count is calibrated so each repeat runs for
+    at least min_time seconds; the per-call median and minimum are reported.
+    """
+    number = 1
+    while True:
+        started = perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = perf_counter() - started
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((perf_counter() - started) / number)
+
+    return {
+        'median_us': statistics.median(timings) * 1e6,
+        'min_us': min(timings) * 1e6,
+        'loops': number,
+        'repeat': repeat,
+    }
+
+
+def seed_database(uri: str, size: int):
+    """Recreate the tables at `uri` with `size` users and `size` links."""
+    engine = create_engine(uri)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    rng = random.Random(size)
+
+    with engine.begin() as connection:
+        for start in range(0, size, SEED_CHUNK):
+            stop = min(start + SEED_CHUNK, size)
+            connection.execute(User.__table__.insert(), [
+                {'user_id': 1_000_000 + i, 'credits': 5, 'referred_by': None}
+                for i in range(start, stop)
+            ])
+            connection.execute(Link.__table__.insert(), [
+                {
+                    'title': f"Benchmark group {i}",
+                    'url': f"https://t.me/bench_group_{i}",
+                    'canonical_url': f"t.me/bench_group_{i}",
+                    'title_md': escape_markdown(f"Benchmark group {i}"),
+                    'url_md': escape_markdown(f"https://t.me/bench_group_{i}"),
+                    'user_id': 1_000_000 + i,
+                    'submit_date': now - timedelta(minutes=rng.randint(0, 3 * 24 * 60)),
+                    'clicks': rng.randint(0, 500),
+                    'upvotes': rng.randint(0, 100),
+                    'downvotes': rng.randint(0, 50),
+                    'score': rng.random() * 300,
+                    'voter_ids': '',
+                    'clicker_ids': '',
+                }
+                for i in range(start, stop)
+            ])
+    return engine
+
+
+def make_link_with_voters(voters: int) -> Link:
+    """Build a detached link whose voter and clicker lists hold `voters` ids."""
+    link = Link(title="Benchmark group", url="https://t.me/bench_group", user_id=1)
+    link.id = 1
+    ids = ','.join(str(10_000_000 + i) for i in range(voters))
+    link.voter_ids = ids
+    link.clicker_ids = ids
+    return link
+
+
+def run_model_cases(size: int, repeat: int, min_time: float) -> Dict[str, Dict]:
+    """Link.add_vote, Link.add_click and has_voter_voted with large voter lists."""
+    voters = min(size, MAX_VOTERS)
+    results = {}
+
+    link = make_link_with_voters(voters)
+    results['has_voter_voted.miss'] = measure(lambda: link.has_voter_voted(1), repeat, min_time)
+    results['has_voter_voted.hit'] = measure(lambda: link.has_voter_voted(10_000_000 + voters - 1), repeat, min_time)
+
+    # add_vote/add_click grow the list, so every call gets a fresh copy of the same link
+    base_ids = link.voter_ids
+
+    def add_vote():
+        link.voter_ids = base_ids
+        link.add_vote(2, True)
+
+    def add_click():
+        link.clicker_ids = base_ids
+        link.add_click(2)
+
+    results['Link.add_vote'] = measure(add_vote, repeat, min_time)
+    results['Link.add_click'] = measure(add_click, repeat, min_time)
+    return results
+
+
+def run_database_cases(engine, size: int, repeat: int, min_time: float) -> Dict[str, Dict]:
+    """Query helpers, ranking and keyboard building against a seeded database."""
+    Session = sessionmaker(bind=engine)
+    rng = random.Random(42)
+    results = {}
+
+    def all_links():
+        with Session() as session:
+            return get_all_links(session)
+
+    def link_page():
+        with Session() as session:
+            return get_link_page(rng.randrange(max(1, size // 10)), 10, session)
+
+    def link_stats():
+        with Session() as session:
+            return list(iter_link_stats(session))
+
+    def link_by_id():
+        with Session() as session:
+            return get_link_by_id(rng.randint(1, size), session)
+
+    def active_link():
+        with Session() as session:
+            return check_active_link(1_000_000 + rng.randrange(size), session)
+
+    results['get_all_links'] = measure(all_links, repeat, min_time)
+    results['get_link_page'] = measure(link_page, repeat, min_time)
+    results['iter_link_stats'] = measure(link_stats, repeat, min_time)
+    results['get_link_by_id'] = measure(link_by_id, repeat, min_time)
+    results['check_active_link'] = measure(active_link, repeat, min_time)
+
+    with Session() as session:
+        links = get_all_links(session)
+        calculator = RankingCalculator()
+        middle_page = (len(links) // 10) // 2
+        results['RankingCalculator.get_top_links'] = measure(
+            lambda: calculator.get_top_links(links), repeat, min_time)
+        stats = list(iter_link_stats(session))
+        results['RankingCalculator.get_top_links[rows]'] = measure(
+            lambda: calculator.get_top_links(stats), repeat, min_time)
+        results['create_links_keyboard'] = measure(
+            lambda: create_links_keyboard(links, middle_page), repeat, min_time)
+
+    return results
+
+
+def run_validation_cases(repeat: int, min_time: float) -> Dict[str, Dict]:
+    """Title and group link validation; independent of the database size."""
+    return {
+        'is_valid_title': measure(lambda: is_valid_title("Weekend hiking club Berlin"), repeat, min_time),
+        'is_valid_group_link': measure(lambda: is_valid_group_link("https://t.me/hiking_berlin"), repeat, min_time),
+    }
+
+
+def run_suite(sizes: List[int], repeat: int, min_time: float,
+              database_uri: Optional[str] = None) -> Dict:
+    """Run every case for every size and return the results document."""
+    results = {}
+    for name, stats in run_validation_cases(repeat, min_time).items():
+        results[name] = stats
+        print(f"  {name:<40} {stats['median_us']:>14.2f} us")
+
+    with tempfile.TemporaryDirectory(prefix='lpb-bench-') as directory:
+        for size in sizes:
+            print(f"Seeding {size} links and users...")
+            uri = database_uri or f"sqlite:///{os.path.join(directory, f'bench_{size}.db')}"
+            engine = seed_database(uri, size)
+            cases = run_model_cases(size, repeat, min_time)
+            cases.update(run_database_cases(engine, size, repeat, min_time))
+            engine.dispose()
+            for name, stats in cases.items():
+                key = f"{name}[n={size}]"
+                results[key] = stats
+                print(f"  {key:<40} {stats['median_us']:>14.2f} us")
+
+    return {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'platform': platform.platform(),
+            'sizes': sizes,
+            'database': (database_uri or 'sqlite').split(':', 1)[0],
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Compare median timings against a baseline document.
+
+    Returns:
+        List[str]: Names of cases slower than baseline * (1 + tolerance)
+    """
+    regressions = []
+    print(f"\n{'case':<40} {'baseline us':>14} {'current us':>14} {'change':>9}")
+    for name, stats in current['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            print(f"{name:<40} {'-':>14} {stats['median_us']:>14.2f} {'new':>9}")
+            continue
+        change = stats['median_us'] / previous['median_us'] - 1 if previous['median_us'] else 0.0
+        flag = '  REGRESSION' if change > tolerance else ''
+        print(f"{name:<40} {previous['median_us']:>14.2f} {stats['median_us']:>14.2f} {change:>+8.1%}{flag}")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run LPB micro-benchmarks.")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="Comma-separated catalog sizes to seed")
+    parser.add_argument('--repeat', type=int, default=5, help="Timing repeats per case")
+    parser.add_argument('--min-time', type=float, default=0.2, help="Minimum seconds per repeat")
+    parser.add_argument('--database-uri',
+                        help="Benchmark against this database (its tables are dropped) instead of SQLite")
+    parser.add_argument('--output', help="Write results JSON here")
+    parser.add_argument('--baseline', help="Compare against this results JSON")
+    parser.add_argument('--save-baseline', help="Write results JSON as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown against the baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    document = run_suite(sizes, args.repeat, args.min_time, args.database_uri)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as output:
+            json.dump(document, output, indent=2)
+        print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            regressions = compare(document, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
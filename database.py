@@ -1,66 +1,526 @@
+import re
 from utils.logger import logger
-from sqlalchemy import create_engine, event
+from sqlalchemy import bindparam, create_engine, event, func, select, text
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.exc import SQLAlchemyError
 from contextlib import contextmanager
 from datetime import datetime
-from models.link_model import Link, Base as LinkBase
-from models.user_model import User, Base as UserBase
-from typing import Optional
-
-# Database configuration
-DATABASE_URI = 'sqlite:///links.db'
-
-# Create engine with SQLite-specific configurations
-engine = create_engine(
-    DATABASE_URI,
-    connect_args={'check_same_thread': False},  # Required for SQLite
-    pool_pre_ping=True  # Connection health checks
+from models.link_model import Link
+from models.user_model import User
+from models.read_models import LinkRow, LinkStatsRow, UserRow
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+from utils.bloom import BloomFilter
+from utils.metrics import DB_SESSION_LATENCY, DB_SESSION_ERRORS
+from utils.tracing import span, install_query_tracing
+from utils.write_queue import WriteQueue
+from utils.migrations import run_migrations
+from utils.cards import forget_link_card
+from utils.journal import journal
+from utils.tenants import current_tenant, bind_tenant
+from threading import Lock, local
+from time import perf_counter
+from config import (
+    DATABASE_URI, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    STORAGE_MODE, WRITER_BATCH_SIZE, WRITER_BATCH_WAIT_MS, READ_POOL_SIZE
 )
 
-# Create session factory
-SessionFactory = sessionmaker(bind=engine)
-Session = scoped_session(SessionFactory)
+T = TypeVar('T')
+
+def set_sqlite_pragma(dbapi_connection, connection_record):
+    """Set SQLite pragmas for better performance."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")  # Write-Ahead Logging
+    cursor.execute("PRAGMA synchronous=NORMAL")  # Faster synchronization
+    cursor.execute("PRAGMA temp_store=MEMORY")  # Store temp tables in memory
+    cursor.execute("PRAGMA cache_size=-2000")  # Use 2MB of memory for cache
+    cursor.close()
+
+def set_sqlite_query_only(dbapi_connection, connection_record):
+    """Make a SQLite connection reject writes."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+def set_sqlite_manual_transactions(dbapi_connection, connection_record):
+    """Stop pysqlite from beginning and committing transactions on its own."""
+    dbapi_connection.isolation_level = None
+
+# Execution options of read sessions on a writable engine: a deferred BEGIN,
+# so WAL readers never hold the write lock
+READ_TRANSACTION = {'sqlite_begin': 'DEFERRED'}
+
+def begin_sqlite_transaction(connection):
+    """
+    Emit BEGIN when SQLAlchemy starts a transaction. Without it pysqlite
+    treats a SAVEPOINT as the start of a transaction and its RELEASE as the
+    commit, so every savepoint of a write batch committed on its own.
+
+    Write transactions begin IMMEDIATE, taking the write lock up front: a
+    deferred transaction that reads and then writes fails with "database is
+    locked", without waiting, when another connection committed in between.
+    Read sessions ask for DEFERRED through READ_TRANSACTION.
+    """
+    options = connection.get_execution_options()
+    if options.get('isolation_level') != 'AUTOCOMMIT':
+        connection.exec_driver_sql(f"BEGIN {options.get('sqlite_begin', 'IMMEDIATE')}")
+
+def create_database_engine(uri: str, read_only: bool = False):
+    """
+    Create an engine tuned for the backend named in the URI.
+
+    SQLite gets check_same_thread disabled, the performance pragmas and
+    explicit BEGINs (SQLAlchemy's pysqlite recipe) so savepoints nest
+    inside the session's transaction; server databases such as PostgreSQL
+    get a sized QueuePool.
+
+    Args:
+        uri (str): SQLAlchemy database URI
+        read_only (bool): Build a pool of query_only SQLite connections
+
+    Returns:
+        Engine: The configured engine
+    """
+    if uri.startswith('sqlite'):
+        pool_args = {'pool_size': READ_POOL_SIZE, 'max_overflow': 0} if read_only else {}
+        new_engine = create_engine(
+            uri,
+            connect_args={'check_same_thread': False},  # Required for SQLite
+            pool_pre_ping=True,  # Connection health checks
+            **pool_args
+        )
+        event.listen(new_engine, "connect", set_sqlite_pragma)
+        event.listen(new_engine, "connect", set_sqlite_manual_transactions)
+        event.listen(new_engine, "begin", begin_sqlite_transaction)
+        if read_only:
+            event.listen(new_engine, "connect", set_sqlite_query_only)
+            return new_engine.execution_options(**READ_TRANSACTION)
+        return new_engine
+
+    return create_engine(
+        uri,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True  # Connection health checks
+    )
+
+class Store:
+    """
+    Everything bound to one database URI: the engines, the session
+    factories, the writer thread in single_writer mode and the duplicate
+    link filter.
+    """
+
+    def __init__(self, uri: str):
+        self.uri = uri
+        self.engine = create_database_engine(uri)
+        # Record SQL statements as spans of the update being traced
+        install_query_tracing(self.engine)
+
+        # Single-writer mode needs a file database: in-memory SQLite is per connection
+        self.single_writer = (
+            STORAGE_MODE == 'single_writer'
+            and self.engine.dialect.name == 'sqlite'
+            and self.engine.url.database not in (None, '', ':memory:')
+        )
+        if self.single_writer:
+            self.read_engine = create_database_engine(uri, read_only=True)
+            install_query_tracing(self.read_engine)
+        else:
+            # Same pool, but transactions begin DEFERRED
+            self.read_engine = self.engine.execution_options(**READ_TRANSACTION)
+
+        self.session = scoped_session(sessionmaker(bind=self.engine))
+        # Objects returned by write operations stay readable after the commit
+        self.write_session = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.read_session = sessionmaker(bind=self.read_engine)
+        self.write_queue: Optional[WriteQueue] = None
+        if self.single_writer:
+            self.write_queue = WriteQueue(self.write_session, WRITER_BATCH_SIZE, WRITER_BATCH_WAIT_MS / 1000)
+
+        # In-memory front for duplicate checks, rebuilt from the database at startup
+        self.link_url_filter = BloomFilter(capacity=100_000)
+
+# Stores are created on first use by get_store(), not at import, and cached
+# by URI so tenants sharing a database share its engines and writer
+_stores: Dict[str, Store] = {}
+_engine_lock = Lock()
+
+def database_uri() -> str:
+    """The database of the current tenant, or config.DATABASE_URI in single-bot mode."""
+    tenant = current_tenant()
+    return tenant.database_uri if tenant is not None else DATABASE_URI
+
+def get_store() -> Store:
+    """Return the current database's Store, creating it on the first call."""
+    uri = database_uri()
+    store = _stores.get(uri)
+    if store is not None:
+        return store
+
+    with _engine_lock:
+        store = _stores.get(uri)
+        if store is None:
+            store = _stores[uri] = Store(uri)
+    return store
+
+def get_engine():
+    """Return the engine of the current database, creating it on the first call."""
+    return get_store().engine
+
+def __getattr__(name):
+    """Keep database.engine, read_engine and link_url_filter working as lazy attributes."""
+    if name == 'engine':
+        return get_engine()
+    if name == 'read_engine':
+        return get_store().read_engine
+    if name == 'link_url_filter':
+        return get_store().link_url_filter
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Per-thread unit of work: the session shared by everything one update does
+_update_scope = local()
+
+class UnitOfWork:
+    """Session shared by the database calls made while handling one update."""
+    __slots__ = ('session', 'depth')
+
+    def __init__(self):
+        self.session = None
+        self.depth = 0
+
+def begin_update_scope() -> None:
+    """Start a unit of work for the update handled on this thread."""
+    _update_scope.unit = UnitOfWork()
+
+def end_update_scope(failed: bool = False) -> None:
+    """Finish this thread's unit of work, rolling back anything uncommitted if the update failed."""
+    unit = getattr(_update_scope, 'unit', None)
+    _update_scope.unit = None
+    if unit is None or unit.session is None:
+        return
+    try:
+        if failed:
+            unit.session.rollback()
+    finally:
+        unit.session.close()
+
+@contextmanager
+def update_scope():
+    """Run the with-block as one unit of work."""
+    begin_update_scope()
+    try:
+        yield
+    except Exception:
+        end_update_scope(failed=True)
+        raise
+    end_update_scope()
+
+def _current_unit() -> Optional[UnitOfWork]:
+    return getattr(_update_scope, 'unit', None)
+
+@contextmanager
+def _unit_session(unit: UnitOfWork, read: bool = False):
+    """
+    Yield the unit of work's session. The outermost block is the commit
+    point: it commits on success and rolls back on error. Objects stay
+    loaded after the commit, so later blocks of the same update reuse
+    them from the identity map. A transaction opened by a read block
+    begins DEFERRED; writes nested in it may then fail on a busy database.
+    """
+    if unit.session is None:
+        store = get_store()
+        # Reads only in single_writer mode; writes go to the writer thread
+        unit.session = (store.read_session if store.single_writer else store.write_session)()
+    session = unit.session
+    if read and not session.in_transaction():
+        session.connection(execution_options=READ_TRANSACTION)
+    unit.depth += 1
+    try:
+        yield session
+        if unit.depth == 1:
+            session.commit()
+    except Exception:
+        if unit.depth == 1:
+            session.rollback()
+        raise
+    finally:
+        unit.depth -= 1
 
 @contextmanager
 def get_db_session():
     """
     Context manager for database sessions.
     Ensures proper handling of sessions including rollback on errors.
+    Inside an update scope the update's session is reused and the
+    outermost block commits.
     """
-    session = Session()
+    store = get_store()
+    unit = _current_unit()
+    started = perf_counter()
+    if unit is not None and not store.single_writer:
+        try:
+            with span('db.session'), _unit_session(unit) as session:
+                yield session
+        except Exception as e:
+            DB_SESSION_ERRORS.inc()
+            logger.error(f"Database error: {str(e)}")
+            raise
+        finally:
+            DB_SESSION_LATENCY.observe(perf_counter() - started)
+        return
+
+    session = store.session()
     try:
-        yield session
-        session.commit()
+        with span('db.session'):
+            yield session
+            session.commit()
     except Exception as e:
         session.rollback()
+        DB_SESSION_ERRORS.inc()
         logger.error(f"Database error: {str(e)}")
         raise
     finally:
         session.close()
+        DB_SESSION_LATENCY.observe(perf_counter() - started)
 
-# SQLite specific optimizations
-@event.listens_for(engine, "connect")
-def set_sqlite_pragma(dbapi_connection, connection_record):
-    """Set SQLite pragmas for better performance."""
-    cursor = dbapi_connection.cursor()
-    cursor.execute("PRAGMA journal_mode=WAL")  # Write-Ahead Logging
-    cursor.execute("PRAGMA synchronous=NORMAL")  # Faster synchronization
-    cursor.execute("PRAGMA temp_store=MEMORY")  # Store temp tables in memory
-    cursor.execute("PRAGMA cache_size=-2000")  # Use 2MB of memory for cache
-    cursor.close()
+def run_write(operation: Callable[..., T]) -> T:
+    """
+    Run a database mutation and return its result.
+
+    In single_writer mode the operation is queued to the writer thread and
+    group-committed with other writes. Otherwise it runs in the update's
+    session, or a new one outside an update scope, and is committed before
+    this returns (or with the enclosing block, when nested in one). Keep
+    operations short and free of Telegram calls; returned ORM objects stay
+    loaded after the commit.
+
+    Args:
+        operation: Callable taking the session to write with
+
+    Returns:
+        Whatever the operation returned
+    """
+    store = get_store()
+    if store.write_queue is not None:
+        with span('db.write'):
+            # The writer thread runs the operation as the submitting tenant
+            return store.write_queue.submit(bind_tenant(operation))
+
+    unit = _current_unit()
+    started = perf_counter()
+    if unit is not None:
+        try:
+            with span('db.write'), _unit_session(unit) as session:
+                return operation(session)
+        except Exception as e:
+            DB_SESSION_ERRORS.inc()
+            logger.error(f"Database error: {str(e)}")
+            raise
+        finally:
+            DB_SESSION_LATENCY.observe(perf_counter() - started)
+
+    session = store.write_session()
+    try:
+        with span('db.write'):
+            result = operation(session)
+            session.commit()
+            return result
+    except Exception as e:
+        session.rollback()
+        DB_SESSION_ERRORS.inc()
+        logger.error(f"Database error: {str(e)}")
+        raise
+    finally:
+        session.close()
+        DB_SESSION_LATENCY.observe(perf_counter() - started)
+
+@contextmanager
+def get_read_session():
+    """
+    Context manager for read-only work. In single_writer mode the session
+    uses the query_only pool. Inside an update scope the update's session
+    is reused; the outermost block ends the read transaction.
+    """
+    store = get_store()
+    unit = _current_unit()
+    if unit is not None:
+        with span('db.read'), _unit_session(unit, read=True) as session:
+            yield session
+        return
+
+    session = store.read_session()
+    try:
+        with span('db.read'):
+            yield session
+    finally:
+        # close() releases the connection without expiring loaded objects
+        session.close()
+
+def stop_writer() -> None:
+    """Flush queued writes and stop the writer threads, if any."""
+    for store in list(_stores.values()):
+        if store.write_queue is not None:
+            store.write_queue.stop()
 
 def init_db():
-    """Initialize the database by creating all tables."""
+    """Bring the database schema up to date by applying pending migrations."""
     try:
-        # Create tables
-        LinkBase.metadata.create_all(engine)
-        UserBase.metadata.create_all(engine)
-        logger.info("Database tables created successfully")
+        applied = run_migrations(get_engine())
+        logger.info(f"Database schema up to date ({len(applied)} migrations applied)")
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
         raise
 
+# Statements built once at import; SQLAlchemy caches their compiled SQL by
+# structure, and bound parameters keep the values out of that cache key
+LINKS_BY_SCORE = select(Link).order_by(Link.score.desc())
+LINKS_BY_IDS = select(Link).where(Link.id.in_(bindparam('link_ids', expanding=True)))
+LINK_ID_BY_CANONICAL_URL = select(Link.id).where(Link.canonical_url == bindparam('canonical_url')).limit(1)
+LATEST_LINK_BY_USER = (
+    select(Link)
+    .where(Link.user_id == bindparam('user_id'))
+    .order_by(Link.submit_date.desc())
+    .limit(1)
+)
+# Column-only selects for list views: no entities, no identity map and no
+# voter_ids/clicker_ids strings
+LINK_ROWS_BY_SCORE = select(Link.id, Link.title, Link.score).order_by(Link.score.desc(), Link.id)
+LINK_STATS_ROWS = select(
+    Link.id, Link.title, Link.url, Link.clicks, Link.upvotes, Link.downvotes,
+    Link.score, Link.submit_date, Link.user_id
+).order_by(Link.id)
+USER_ROWS = select(User.user_id, User.credits, User.referred_by).order_by(User.user_id)
+LINK_COUNT = select(func.count(Link.id))
+LINK_CARDS_BY_IDS = select(Link.id, Link.title_md, Link.url_md).where(
+    Link.id.in_(bindparam('link_ids', expanding=True))
+)
+# Links expiring in a window whose owners want a warning; a range scan of ix_links_submit_date
+EXPIRING_LINKS = (
+    select(Link.id, Link.user_id, Link.title, Link.submit_date)
+    .join(User, User.user_id == Link.user_id)
+    .where(
+        Link.submit_date >= bindparam('submitted_after'),
+        Link.submit_date < bindparam('submitted_before'),
+        Link.expiry_warned_at.is_(None),
+        User.notifications.is_(True),
+    )
+    .order_by(Link.user_id, Link.submit_date)
+)
+NOTIFIED_USERS = select(User.user_id).where(
+    User.user_id.in_(bindparam('user_ids', expanding=True)), User.notifications.is_(True)
+)
+SEARCH_LINK_IDS = text(
+    "SELECT rowid FROM links_fts WHERE links_fts MATCH :query "
+    "ORDER BY rank LIMIT :limit OFFSET :offset"
+)
+
+def search_words(terms: str) -> List[str]:
+    """Split user input into at most 8 lowercase search words."""
+    return re.findall(r'\w+', terms.lower())[:8]
+
+def build_search_query(terms: str) -> Optional[str]:
+    """
+    Turn free user input into a safe FTS5 query. Every word is quoted, so
+    FTS5 operators typed by users are matched literally, and the last word
+    is a prefix term so partially typed words still match.
+    """
+    words = search_words(terms)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+def search_links(terms: str, session=None, limit: int = 50, offset: int = 0) -> List[Link]:
+    """
+    Full-text search over link titles, best matches first.
+
+    Args:
+        terms (str): Words typed by the user
+        session: Optional database session to use
+        limit (int): Maximum number of links to return
+        offset (int): Number of matches to skip
+
+    Returns:
+        List[Link]: Matching links ordered by relevance
+    """
+    query = build_search_query(terms)
+    if not query:
+        return []
+
+    def run(session):
+        if get_engine().dialect.name != 'sqlite':
+            # No FTS5 index: match every word anywhere in the title, best scored first.
+            # Words are \w+ runs, so "_" is the only LIKE wildcard to escape.
+            conditions = [
+                Link.title.ilike('%' + word.replace('_', '\\_') + '%', escape='\\')
+                for word in search_words(terms)
+            ]
+            return session.scalars(
+                select(Link)
+                .where(*conditions)
+                .order_by(Link.score.desc(), Link.id)
+                .limit(limit)
+                .offset(offset)
+            ).all()
+
+        link_ids = session.execute(
+            SEARCH_LINK_IDS, {'query': query, 'limit': limit, 'offset': offset}
+        ).scalars().all()
+        if not link_ids:
+            return []
+        links = {link.id: link for link in session.scalars(LINKS_BY_IDS, {'link_ids': link_ids})}
+        return [links[link_id] for link_id in link_ids if link_id in links]
+
+    try:
+        if session is None:
+            with get_read_session() as session:
+                return run(session)
+        return run(session)
+    except SQLAlchemyError as e:
+        logger.error(f"Error searching links: {str(e)}")
+        return []
+
+def rebuild_link_url_filter() -> int:
+    """
+    Rebuild the duplicate-link Bloom filter from the canonical URLs in the database.
+
+    Returns:
+        int: Number of URLs loaded into the filter
+    """
+    store = get_store()
+    try:
+        with get_read_session() as session:
+            total = session.query(Link.id).filter(Link.canonical_url.isnot(None)).count()
+            new_filter = BloomFilter(capacity=max(100_000, total * 2))
+            query = (
+                session.query(Link.canonical_url)
+                .filter(Link.canonical_url.isnot(None))
+                .yield_per(5000)
+            )
+            for (canonical_url,) in query:
+                new_filter.add(canonical_url)
+
+        store.link_url_filter = new_filter
+        logger.info(f"Duplicate link filter rebuilt with {len(new_filter)} URLs")
+        return len(new_filter)
+    except SQLAlchemyError as e:
+        logger.error(f"Error rebuilding duplicate link filter: {str(e)}")
+        return 0
+
+def is_duplicate_link(canonical_url: str, session) -> bool:
+    """
+    Check whether a canonical URL is already stored.
+    The Bloom filter answers most checks; only possible hits query the database.
+    """
+    if canonical_url not in get_store().link_url_filter:
+        return False
+    return session.scalar(LINK_ID_BY_CANONICAL_URL, {'canonical_url': canonical_url}) is not None
+
+def remember_link_url(canonical_url: str) -> None:
+    """Record a newly stored canonical URL in the duplicate-link filter."""
+    get_store().link_url_filter.add(canonical_url)
+
 def update_user_role(user_id: int, new_role: str) -> bool:
     """
     Update a user's role in the database.
@@ -110,27 +570,34 @@ def save_link(title: str, url: str, user_id: int) -> Link:
 
 def delete_link(link_id: int) -> bool:
     """Delete a link from the database."""
-    with get_db_session() as session:
-        try:
-            link = session.query(Link).filter_by(id=link_id).first()
-            if link:
-                session.delete(link)
-                logger.info(f"Link {link_id} deleted successfully")
-                return True
-            logger.warning(f"Link {link_id} not found")
-            return False
-        except SQLAlchemyError as e:
-            logger.error(f"Error deleting link: {str(e)}")
-            raise
+    def delete(session):
+        link = session.get(Link, link_id)
+        if link:
+            session.delete(link)
+            return True
+        return False
+
+    try:
+        deleted = run_write(delete)
+    except SQLAlchemyError as e:
+        logger.error(f"Error deleting link: {str(e)}")
+        raise
+    if deleted:
+        forget_link_card(link_id)
+        journal.append('delete', link=link_id)
+        logger.info(f"Link {link_id} deleted successfully")
+    else:
+        logger.warning(f"Link {link_id} not found")
+    return deleted
 
 def get_all_links(session=None):
     """Fetch all links from the database ordered by score."""
     try:
         if session is None:
-            with get_db_session() as session:
-                return session.query(Link).order_by(Link.score.desc()).all()
+            with get_read_session() as session:
+                return session.scalars(LINKS_BY_SCORE).all()
         else:
-            return session.query(Link).order_by(Link.score.desc()).all()
+            return session.scalars(LINKS_BY_SCORE).all()
     except SQLAlchemyError as e:
         logger.error(f"Error fetching links: {str(e)}")
         return []
@@ -139,10 +606,10 @@ def get_all_links(session=None):
     """Fetch all links from the database ordered by score."""
     try:
         if session is None:
-            with get_db_session() as session:
-                return session.query(Link).order_by(Link.score.desc()).all()
+            with get_read_session() as session:
+                return session.scalars(LINKS_BY_SCORE).all()
         else:
-            return session.query(Link).order_by(Link.score.desc()).all()
+            return session.scalars(LINKS_BY_SCORE).all()
     except SQLAlchemyError as e:
         logger.error(f"Error fetching links: {str(e)}")
         return []
@@ -151,43 +618,157 @@ def get_all_links(session=None):
     """Fetch all links from the database ordered by score."""
     try:
         if session is None:
-            with get_db_session() as session:
-                return session.query(Link).order_by(Link.score.desc()).all()
+            with get_read_session() as session:
+                return session.scalars(LINKS_BY_SCORE).all()
         else:
-            return session.query(Link).order_by(Link.score.desc()).all()
+            return session.scalars(LINKS_BY_SCORE).all()
     except SQLAlchemyError as e:
         logger.error(f"Error fetching links: {str(e)}")
         return []
 
+def get_link_page(page: int = 0, per_page: int = 10, session=None) -> Tuple[List[LinkRow], int]:
+    """
+    Fetch one page of the score-ordered link list as light rows.
+
+    Args:
+        page (int): Zero-based page number
+        per_page (int): Links per page
+        session: Optional database session to use
+
+    Returns:
+        Tuple[List[LinkRow], int]: The page's rows and the total number of links
+    """
+    def run(session):
+        total = session.scalar(LINK_COUNT)
+        rows = session.execute(LINK_ROWS_BY_SCORE.limit(per_page).offset(page * per_page))
+        return [LinkRow(*row) for row in rows], total
+
+    try:
+        if session is None:
+            with get_read_session() as session:
+                return run(session)
+        return run(session)
+    except SQLAlchemyError as e:
+        logger.error(f"Error fetching link page: {str(e)}")
+        return [], 0
+
+def get_link_cards(link_ids: List[int], session=None) -> List[Tuple[int, str, str]]:
+    """Fetch (id, title_md, url_md) for the given links in one query."""
+    def run(session):
+        return [tuple(row) for row in session.execute(LINK_CARDS_BY_IDS, {'link_ids': link_ids})]
+
+    try:
+        if session is None:
+            with get_read_session() as session:
+                return run(session)
+        return run(session)
+    except SQLAlchemyError as e:
+        logger.error(f"Error fetching link cards: {str(e)}")
+        return []
+
+def iter_link_stats(session, batch_size: int = 1000) -> Iterator[LinkStatsRow]:
+    """
+    Stream every link as a LinkStatsRow in id order, fetching batch_size
+    rows at a time so large catalogs are never held in memory at once.
+    """
+    result = session.execute(LINK_STATS_ROWS.execution_options(yield_per=batch_size))
+    for row in result:
+        yield LinkStatsRow(*row)
+
+def iter_user_rows(session, batch_size: int = 1000) -> Iterator[UserRow]:
+    """Stream every user as a UserRow in id order, batch_size rows at a time."""
+    result = session.execute(USER_ROWS.execution_options(yield_per=batch_size))
+    for row in result:
+        yield UserRow(*row)
+
+def get_expiring_links(submitted_after: datetime, submitted_before: datetime) -> List[Tuple[int, int, str, datetime]]:
+    """
+    Find links submitted in [submitted_after, submitted_before) that have
+    not been warned about and whose owners have notifications on.
+
+    Returns:
+        List[Tuple[int, int, str, datetime]]: (id, user_id, title, submit_date), grouped by owner
+    """
+    with get_read_session() as session:
+        return [tuple(row) for row in session.execute(
+            EXPIRING_LINKS, {'submitted_after': submitted_after, 'submitted_before': submitted_before}
+        )]
+
+def mark_links_warned(link_ids: List[int]) -> None:
+    """Record that the owners of these links have been warned."""
+    if not link_ids:
+        return
+    run_write(lambda session: session.execute(
+        Link.__table__.update()
+        .where(Link.id.in_(bindparam('link_ids', expanding=True)))
+        .values(expiry_warned_at=datetime.utcnow()),
+        {'link_ids': link_ids}
+    ))
+
+def get_notified_users(user_ids: List[int]) -> set:
+    """Return which of these users have notifications on."""
+    notified = set()
+    with get_read_session() as session:
+        # Chunked to stay under SQLite's bound parameter limit
+        for start in range(0, len(user_ids), 500):
+            notified.update(session.scalars(NOTIFIED_USERS, {'user_ids': user_ids[start:start + 500]}))
+    return notified
+
+def set_notifications(user_id: int, enabled: bool) -> None:
+    """Turn expiry notifications on or off for a user, creating the user if needed."""
+    def update(session):
+        user = session.get(User, user_id)
+        if user is None:
+            user = User(user_id=user_id)
+            session.add(user)
+        user.notifications = enabled
+
+    run_write(update)
+
 def get_user_by_id(user_id: int) -> Optional[User]:
     """Fetch a user by their Telegram user ID."""
-    with get_db_session() as session:
+    with get_read_session() as session:
         try:
-            return session.query(User).filter_by(user_id=user_id).first()
+            return session.get(User, user_id)
         except SQLAlchemyError as e:
             logger.error(f"Error fetching user: {str(e)}")
             raise
 
 def save_user(user_id: int) -> User:
     """Save a new user to the database."""
-    with get_db_session() as session:
-        try:
-            # Create user with only user_id
-            user = User(user_id=user_id)
-            session.add(user)
-            logger.info(f"User saved successfully: {user_id}")
-            return user
-        except SQLAlchemyError as e:
-            logger.error(f"Error saving user: {str(e)}")
-            raise
+    def save(session):
+        # Create user with only user_id
+        user = User(user_id=user_id)
+        session.add(user)
+        session.flush()
+        return user
+
+    try:
+        user = run_write(save)
+        logger.info(f"User saved successfully: {user_id}")
+        return user
+    except SQLAlchemyError as e:
+        logger.error(f"Error saving user: {str(e)}")
+        raise
+
+def ensure_user(user_id: int) -> None:
+    """
+    Create a user row if none exists. Links reference users.user_id, and
+    unlike SQLite, PostgreSQL enforces that foreign key.
+    """
+    def ensure(session):
+        if session.get(User, user_id) is None:
+            session.add(User(user_id=user_id))
+
+    run_write(ensure)
 
 def get_link_by_id(link_id: int, session=None) -> Link:
     """Get a link by its ID."""
     try:
         if session is None:
-            with get_db_session() as session:
-                return session.query(Link).get(link_id)
-        return session.query(Link).get(link_id)
+            with get_read_session() as session:
+                return session.get(Link, link_id)
+        return session.get(Link, link_id)
     except SQLAlchemyError as e:
         logger.error(f"Error getting link by ID: {str(e)}")
         raise
@@ -195,12 +776,10 @@ def get_link_by_id(link_id: int, session=None) -> Link:
 def check_database_connection() -> bool:
     """Check if the database connection is working."""
     try:
-        with get_db_session() as session:
-            session.execute("SELECT 1")
+        with get_read_session() as session:
+            session.execute(text("SELECT 1"))
         return True
     except SQLAlchemyError as e:
         logger.error(f"Database connection check failed: {str(e)}")
         return False
 
-# Initialize database when the module is imported
-init_db()
@@ -1,14 +1,46 @@
+import os
+import tempfile
+import threading
 from utils.logger import logger
 from telebot.types import Message
+from utils.importer import import_links, detect_format
+from utils.exporter import export_to_file, EXPORTS, EXPORT_FORMATS
+from utils.backup import backup_database
+from utils.profiler import slow_update_profiler
 from utils.scheduler import link_scheduler
 from utils.helpers import is_admin
-from config import bot  # Import bot instance from config
-from database import get_db_session, get_all_links
+from database import get_read_session, iter_link_stats
+from utils.abuse import get_abuse_detector
+from utils.tenants import admin_ids, bind_tenant
+from utils.rollups import event_totals, daily_counts, active_users, link_activity, top_links
+from datetime import datetime, timedelta
+
+# Largest document a bot may send
+EXPORT_MAX_BYTES = 50 * 1024 * 1024
 
 def register_admin_handlers(bot):
     """
     Register all admin-related command handlers.
     """
+    # In multi-bot mode this runs once per bot, inside that bot's tenant context
+    abuse_detector = get_abuse_detector()
+    admins = admin_ids()
+
+    def send_abuse_alert(flag):
+        """Tell every admin about a flagged vote or click burst."""
+        text = (
+            f"🚨 Possible vote abuse: {flag.kind} {flag.key} made "
+            f"{flag.count} votes/clicks in {flag.window / 60:.0f} min"
+        )
+        if flag.kind == 'link' and abuse_detector.is_frozen(flag.key):
+            text += f"\nScoring is frozen; /unfreeze {flag.key} to release it."
+        for admin_id in admins:
+            try:
+                bot.send_message(admin_id, text)
+            except Exception as e:
+                logger.error(f"Error sending abuse alert to {admin_id}: {str(e)}")
+
+    abuse_detector.on_flag = send_abuse_alert
 
     @bot.message_handler(commands=["del"])
     def handle_del_command(message):
@@ -109,6 +141,141 @@ def register_admin_handlers(bot):
             logger.error(f"Error in cleanup_status: {str(e)}")
             bot.reply_to(message, "❌ An error occurred while getting cleanup status")
 
+    @bot.message_handler(commands=['profiler'])
+    def handle_profiler(message: Message):
+        """Toggle the slow-update profiler: /profiler on|off [threshold_ms]"""
+        try:
+            if not is_admin(message.from_user.id):
+                bot.reply_to(message, "⛔️ This command is only for admins.")
+                return
+
+            args = message.text.split()
+            if len(args) >= 2 and args[1] in ('on', 'off'):
+                slow_update_profiler.enabled = args[1] == 'on'
+            if len(args) >= 3:
+                threshold_ms = int(args[2])
+                if threshold_ms < 1:
+                    bot.reply_to(message, "⚠️ Threshold must be at least 1 ms")
+                    return
+                slow_update_profiler.threshold_ms = threshold_ms
+
+            bot.reply_to(
+                message,
+                f"🧪 Slow-update profiler:\n"
+                f"• Enabled: {slow_update_profiler.enabled}\n"
+                f"• Threshold: {slow_update_profiler.threshold_ms} ms\n"
+                f"• Output: {slow_update_profiler.output_dir}/\n\n"
+                f"Usage: /profiler on|off [threshold_ms]"
+            )
+            logger.info(
+                f"Profiler set to enabled={slow_update_profiler.enabled} "
+                f"threshold={slow_update_profiler.threshold_ms}ms by admin {message.from_user.id}"
+            )
+
+        except ValueError:
+            bot.reply_to(message, "⚠️ Please provide the threshold as a number of milliseconds")
+        except Exception as e:
+            logger.error(f"Error in profiler command: {str(e)}")
+            bot.reply_to(message, "❌ An error occurred while updating the profiler")
+
+    @bot.message_handler(commands=['abuse'])
+    def handle_abuse(message: Message):
+        """Show the busiest voters and links of the current window and recent flags."""
+        try:
+            if not is_admin(message.from_user.id):
+                bot.reply_to(message, "⛔️ This command is only for admins.")
+                return
+
+            report = abuse_detector.report()
+            window_min = abuse_detector.window / 60
+            users = "\n".join(f"• {user_id}: {count}" for user_id, count in report['users']) or "• none"
+            links = "\n".join(f"• {link_id}: {count}" for link_id, count in report['links']) or "• none"
+            flags = "\n".join(
+                f"• {flag.flagged_at:%Y-%m-%d %H:%M} {flag.kind} {flag.key} ({flag.count})"
+                for flag in report['flags']
+            ) or "• none"
+            frozen = ", ".join(str(link_id) for link_id in report['frozen']) or "none"
+
+            bot.reply_to(
+                message,
+                f"🛡 Votes and clicks in the last {window_min:.0f} min (estimates)\n\n"
+                f"Top users:\n{users}\n\nTop links:\n{links}\n\n"
+                f"Recent flags:\n{flags}\n\nFrozen links: {frozen}"
+            )
+
+        except Exception as e:
+            logger.error(f"Error in abuse command: {str(e)}")
+            bot.reply_to(message, "❌ An error occurred while building the abuse report")
+
+    @bot.message_handler(commands=['unfreeze'])
+    def handle_unfreeze(message: Message):
+        """Let a flagged link's score change again: /unfreeze <link_id>"""
+        try:
+            if not is_admin(message.from_user.id):
+                bot.reply_to(message, "⛔️ This command is only for admins.")
+                return
+
+            args = message.text.split()
+            if len(args) != 2:
+                bot.reply_to(message, "Usage: /unfreeze <link_id>")
+                return
+
+            link_id = int(args[1])
+            if abuse_detector.unfreeze(link_id):
+                bot.reply_to(message, f"✅ Scoring unfrozen for link {link_id}")
+                logger.info(f"Link {link_id} unfrozen by admin {message.from_user.id}")
+            else:
+                bot.reply_to(message, f"Link {link_id} is not frozen")
+
+        except ValueError:
+            bot.reply_to(message, "⚠️ Please provide the link ID as a number")
+        except Exception as e:
+            logger.error(f"Error in unfreeze command: {str(e)}")
+            bot.reply_to(message, "❌ An error occurred while unfreezing the link")
+
+    @bot.message_handler(commands=['stats'])
+    def handle_stats(message: Message):
+        """Show activity from the hourly rollups: /stats, or /stats <link_id> for one link."""
+        try:
+            if not is_admin(message.from_user.id):
+                bot.reply_to(message, "⛔️ This command is only for admins.")
+                return
+
+            args = message.text.split()
+            if len(args) >= 2:
+                link_id = int(args[1])
+                lines = [
+                    f"• {day:%m-%d}: {views} views, {clicks} clicks, 👍 {upvotes} 👎 {downvotes}"
+                    for day, views, clicks, upvotes, downvotes in link_activity(link_id, 7)
+                ]
+                bot.reply_to(message, f"📈 Link {link_id}, last 7 days:\n" + "\n".join(lines))
+                return
+
+            since = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=23)
+            totals = event_totals(since)
+            last_day = ", ".join(
+                f"{totals.get(event, 0)} {event}s"
+                for event in ('view', 'click', 'vote', 'submit', 'referral', 'delete')
+            )
+            dau = "\n".join(f"• {day:%m-%d}: {count}" for day, count in active_users(7))
+            submissions = "\n".join(f"• {day:%m-%d}: {count}" for day, count in daily_counts('submit', 7))
+            top = "\n".join(f"• {link_id}: {clicks} clicks" for link_id, clicks in top_links(since)) or "• none"
+
+            bot.reply_to(
+                message,
+                f"📊 Last 24 hours: {last_day}\n\n"
+                f"Daily active users:\n{dau}\n\n"
+                f"Submissions per day:\n{submissions}\n\n"
+                f"Most clicked links (24 h):\n{top}\n\n"
+                f"Usage: /stats [link_id]"
+            )
+
+        except ValueError:
+            bot.reply_to(message, "⚠️ Please provide the link ID as a number")
+        except Exception as e:
+            logger.error(f"Error in stats command: {str(e)}")
+            bot.reply_to(message, "❌ An error occurred while loading stats")
+
     @bot.message_handler(commands=['list_links'])
     def handle_list_links(message: Message):
         """Handle the /list_links command to list all links."""
@@ -118,14 +285,14 @@ def register_admin_handlers(bot):
                 logger.warning(f"Unauthorized list links attempt by user {message.from_user.id}")
                 return
 
-            with get_db_session() as session:
-                links = get_all_links(session)
-                if not links:
-                    bot.reply_to(message, "No links found.")
-                    return
+            with get_read_session() as session:
+                links = list(iter_link_stats(session))
+            if not links:
+                bot.reply_to(message, "No links found.")
+                return
 
-                links_text = "\n".join(f"{link.id}: {link.title} - {link.url}" for link in links)
-                bot.reply_to(message, f"List of links:\n{links_text}")
+            links_text = "\n".join(f"{link.id}: {link.title} - {link.url}" for link in links)
+            bot.reply_to(message, f"List of links:\n{links_text}")
 
         except Exception as e:
             logger.error(f"Error in list links command: {str(e)}")
@@ -147,3 +314,152 @@ def register_admin_handlers(bot):
         except Exception as e:
             logger.error(f"Error in delete command: {str(e)}")
             bot.reply_to(message, "An error occurred. Please try again later.")
+
+    @bot.message_handler(
+        content_types=['document'],
+        func=lambda message: (message.caption or '').startswith('/import')
+    )
+    def handle_import_document(message: Message):
+        """Handle a CSV/JSONL document sent with the /import caption."""
+        try:
+            if not is_admin(message.from_user.id):
+                bot.reply_to(message, "⛔️ This command is only for admins.")
+                return
+
+            file_info = bot.get_file(message.document.file_id)
+            content = bot.download_file(file_info.file_path)
+            fmt = detect_format(message.document.file_name or '')
+
+            bot.reply_to(message, f"⏳ Importing {message.document.file_name}...")
+            # Run the import off the polling workers; it can take a while
+            # bind_tenant keeps the worker on this bot's database
+            threading.Thread(
+                target=bind_tenant(_run_import),
+                args=(message, content, fmt),
+                name="link-import",
+                daemon=True
+            ).start()
+
+        except Exception as e:
+            logger.error(f"Error in import command: {str(e)}")
+            bot.reply_to(message, "❌ An error occurred while starting the import")
+
+    @bot.message_handler(commands=['export'])
+    def handle_export(message: Message):
+        """Send links or users as a compressed file: /export links|users [csv|jsonl]"""
+        try:
+            if not is_admin(message.from_user.id):
+                bot.reply_to(message, "⛔️ This command is only for admins.")
+                return
+
+            args = message.text.split()
+            kind = args[1] if len(args) >= 2 else None
+            fmt = args[2] if len(args) >= 3 else 'csv'
+            if kind not in EXPORTS or fmt not in EXPORT_FORMATS:
+                bot.reply_to(message, "Usage: /export links|users [csv|jsonl]")
+                return
+
+            bot.reply_to(message, f"⏳ Exporting {kind} as {fmt}...")
+            # Large tables take a while; keep the polling workers free
+            threading.Thread(
+                target=bind_tenant(_run_export),
+                args=(message, kind, fmt),
+                name="export",
+                daemon=True
+            ).start()
+
+        except Exception as e:
+            logger.error(f"Error in export command: {str(e)}")
+            bot.reply_to(message, "❌ An error occurred while starting the export")
+
+    def _run_export(message: Message, kind: str, fmt: str):
+        """Export a table to a temporary file and send it to the admin."""
+        result = None
+        try:
+            result = export_to_file(kind, fmt)
+            if result.size > EXPORT_MAX_BYTES:
+                bot.reply_to(
+                    message,
+                    f"❌ The export is {result.size / 1024 / 1024:.0f} MB, over Telegram's "
+                    f"{EXPORT_MAX_BYTES // 1024 // 1024} MB limit. Use python -m utils.exporter on the server."
+                )
+                return
+
+            with open(result.path, 'rb') as document:
+                bot.send_document(
+                    message.chat.id,
+                    document,
+                    visible_file_name=f"{kind}-{datetime.utcnow():%Y%m%d-%H%M}.{fmt}.gz",
+                    caption=f"✅ {result.rows} {kind} exported in {result.duration:.1f}s"
+                )
+
+        except Exception as e:
+            logger.error(f"Error exporting {kind}: {str(e)}")
+            bot.reply_to(message, "❌ Export failed")
+        finally:
+            if result and os.path.exists(result.path):
+                os.remove(result.path)
+
+    @bot.message_handler(commands=['backup'])
+    def handle_backup(message: Message):
+        """Take an online database backup now and report its size and duration."""
+        try:
+            if not is_admin(message.from_user.id):
+                bot.reply_to(message, "⛔️ This command is only for admins.")
+                return
+
+            bot.reply_to(message, "⏳ Backing up the database...")
+            threading.Thread(target=bind_tenant(_run_backup), args=(message,), name="backup", daemon=True).start()
+
+        except Exception as e:
+            logger.error(f"Error in backup command: {str(e)}")
+            bot.reply_to(message, "❌ An error occurred while starting the backup")
+
+    def _run_backup(message: Message):
+        """Run a backup off the polling workers and report the result."""
+        try:
+            result = backup_database()
+            bot.reply_to(
+                message,
+                f"✅ Backup {os.path.basename(result.path)}\n"
+                f"• Size: {result.size / 1024 / 1024:.1f} MB\n"
+                f"• Duration: {result.duration:.1f}s\n"
+                f"• Pages: {result.pages} ({result.restarts} restarts)\n"
+                f"• Integrity check: ok"
+            )
+            logger.info(f"Backup triggered by admin {message.from_user.id}")
+        except Exception as e:
+            logger.error(f"Error in backup: {str(e)}")
+            bot.reply_to(message, f"❌ Backup failed: {str(e)}")
+
+    def _run_import(message: Message, content: bytes, fmt: str):
+        """Import a downloaded file and report the result back to the admin."""
+        source_path = report_path = None
+        try:
+            with tempfile.NamedTemporaryFile('wb', suffix=f'.{fmt}', delete=False) as source:
+                source.write(content)
+                source_path = source.name
+            report_path = source_path + '.rejects.csv'
+
+            with open(source_path, encoding='utf-8', newline='') as source, \
+                    open(report_path, 'w', encoding='utf-8', newline='') as report:
+                result = import_links(source, fmt, message.from_user.id, report)
+
+            bot.reply_to(
+                message,
+                f"✅ Import finished in {result.duration:.1f}s:\n"
+                f"• Rows read: {result.total}\n"
+                f"• Imported: {result.imported}\n"
+                f"• Rejected: {result.rejected}"
+            )
+            if result.rejected:
+                with open(report_path, 'rb') as report:
+                    bot.send_document(message.chat.id, report, visible_file_name='import_rejects.csv')
+
+        except Exception as e:
+            logger.error(f"Error importing links: {str(e)}")
+            bot.reply_to(message, "❌ Import failed. Check the file format (CSV with title,url header or JSONL).")
+        finally:
+            for path in (source_path, report_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,95 @@
+from telebot.types import InlineQuery, InlineQueryResultArticle, InputTextMessageContent
+from database import get_read_session, search_links, build_search_query, LINKS_BY_SCORE
+from utils.cache import TTLCache
+from utils.logger import logger
+from utils.tenants import tenant_key
+
+# Results per answer; Telegram accepts at most 50
+INLINE_PAGE_SIZE = 20
+# Seconds Telegram and our own cache may reuse an answer
+INLINE_CACHE_TIME = 60
+
+# (normalized query, offset) -> (results, next_offset)
+inline_results_cache = TTLCache(ttl=INLINE_CACHE_TIME, max_size=2048)
+
+
+def result_url(url: str) -> str:
+    """
+    Give a stored link the scheme Telegram requires of a result URL. Links
+    may be saved as plain t.me/..., and one invalid URL fails the whole answer.
+    """
+    url = (url or '').strip()
+    return url if '://' in url else f"https://{url}"
+
+
+def build_inline_results(links) -> list:
+    """Turn links into inline query results that share the group link."""
+    return [
+        InlineQueryResultArticle(
+            id=str(link.id),
+            title=link.title,
+            description=link.url,
+            url=result_url(link.url),
+            hide_url=True,
+            input_message_content=InputTextMessageContent(
+                f"{link.title}\n{link.url}",
+                disable_web_page_preview=True
+            )
+        )
+        for link in links
+    ]
+
+
+def fetch_inline_page(terms: str, offset: int):
+    """
+    Fetch one page of inline results.
+    An empty query shows the top links by score; otherwise titles are
+    matched by the full-text index, with the last word as a prefix.
+
+    Returns:
+        tuple: (results, next_offset)
+    """
+    with get_read_session() as session:
+        if terms:
+            links = search_links(terms, session, limit=INLINE_PAGE_SIZE + 1, offset=offset)
+        else:
+            links = session.scalars(
+                LINKS_BY_SCORE.offset(offset).limit(INLINE_PAGE_SIZE + 1)
+            ).all()
+
+        has_more = len(links) > INLINE_PAGE_SIZE
+        results = build_inline_results(links[:INLINE_PAGE_SIZE])
+
+    next_offset = str(offset + INLINE_PAGE_SIZE) if has_more else ""
+    return results, next_offset
+
+
+def register_inline_handlers(bot):
+    """Register inline query handlers (inline mode must be enabled in BotFather)."""
+
+    @bot.inline_handler(func=lambda query: True)
+    def handle_inline_query(query: InlineQuery):
+        """Answer @bot queries with matching links, served from cache when possible."""
+        try:
+            terms = query.query.strip()[:64]
+            offset = int(query.offset) if query.offset and query.offset.isdigit() else 0
+
+            # Queries that differ only in case or punctuation share a cache entry;
+            # queries without any words fall back to the top links
+            search_query = build_search_query(terms) or ""
+            cache_key = tenant_key((search_query, offset))
+            cached = inline_results_cache.get(cache_key)
+            if cached is None:
+                cached = fetch_inline_page(terms if search_query else "", offset)
+                inline_results_cache.set(cache_key, cached)
+
+            results, next_offset = cached
+            bot.answer_inline_query(
+                query.id,
+                results,
+                cache_time=INLINE_CACHE_TIME,
+                next_offset=next_offset
+            )
+
+        except Exception as e:
+            logger.error(f"Error in inline query handler: {str(e)}")
@@ -1,31 +1,75 @@
 from telebot.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
-from database import get_db_session, get_link_by_id, get_all_links
+from database import run_write, get_link_by_id, get_link_page, get_link_cards
 from utils.logger import logger
 from sqlalchemy.exc import SQLAlchemyError
 from utils.helpers import format_timestamp, is_admin
-from config import ADMINS
+from utils.cards import link_cards, card_head, render_link_card, forget_link_card
+from utils.journal import journal
+from utils.tenants import admin_ids, tenant_key
 from models.user_model import User
 from models.link_model import Link
-from typing import List, Tuple
-
-
-def escape_markdown(text: str) -> str:
-    """Escape Markdown special characters."""
-    special_chars = ['_', '*', '`', '[', ']']
-    for char in special_chars:
-        text = text.replace(char, f'\\{char}')
-    return text
-
-
-def create_links_keyboard(links: List[Link], current_page: int = 0, links_per_page: int = 10) -> Tuple[InlineKeyboardMarkup, int]:
-    """Create paginated keyboard for links list."""
-    total_links = len(links)
+from models.read_models import LinkRow
+from typing import List, Optional, Tuple, Union
+
+# Link buttons per page of the links list
+LINKS_PER_PAGE = 10
+
+# Marker appended to link callbacks -> list the Back button returns to;
+# links opened from /search results carry "s"
+LIST_PREFIXES = {'': 'page_', 's': 'search_page_'}
+LIST_MARKERS = {prefix: marker for marker, prefix in LIST_PREFIXES.items()}
+
+
+def link_callback(action: str, link_id: int, current_page: int, page_prefix: str = "page_") -> str:
+    """Callback data for a link button that remembers which list it was opened from."""
+    marker = LIST_MARKERS.get(page_prefix, '')
+    return f"{action}_{link_id}_{current_page}" + (f"_{marker}" if marker else "")
+
+
+def list_prefix(parts: List[str], index: int) -> str:
+    """The page prefix of the list a link callback came from, given its split data."""
+    return LIST_PREFIXES.get(parts[index], 'page_') if len(parts) > index else 'page_'
+
+
+def prefetch_link_cards(links: List[Union[Link, LinkRow]]) -> None:
+    """
+    Fill the card cache for the links on a page so the next view tap does
+    not render. Entities carry their escaped columns; rows are looked up
+    together in one query.
+    """
+    try:
+        missing = []
+        for link in links:
+            if link_cards.get(tenant_key(link.id)) is not None:
+                continue
+            if isinstance(link, Link) and link.title_md and link.url_md:
+                link_cards.set(tenant_key(link.id), card_head(link.title_md, link.url_md))
+            else:
+                missing.append(link.id)
+
+        if missing:
+            for link_id, title_md, url_md in get_link_cards(missing):
+                if title_md and url_md:
+                    link_cards.set(tenant_key(link_id), card_head(title_md, url_md))
+    except Exception as e:
+        logger.error(f"Error prefetching link cards: {str(e)}")
+
+
+def create_links_keyboard(links: List[Union[Link, LinkRow]], current_page: int = 0,
+                          links_per_page: int = LINKS_PER_PAGE, page_prefix: str = "page_",
+                          total_links: Optional[int] = None) -> Tuple[InlineKeyboardMarkup, int]:
+    """
+    Create paginated keyboard for links list; page_prefix selects the navigation callback.
+    When total_links is given, links is already the current page (see get_link_page).
+    """
+    if total_links is None:
+        total_links = len(links)
+        start_idx = current_page * links_per_page
+        current_links = links[start_idx:start_idx + links_per_page]
+    else:
+        current_links = links
     total_pages = (total_links + links_per_page - 1) // links_per_page
 
-    start_idx = current_page * links_per_page
-    end_idx = min(start_idx + links_per_page, total_links)
-    current_links = links[start_idx:end_idx]
-
     keyboard = InlineKeyboardMarkup(row_width=1)
 
     # Add link buttons
@@ -33,7 +77,7 @@ def create_links_keyboard(links: List[Link], current_page: int = 0, links_per_pa
         keyboard.add(
             InlineKeyboardButton(
                 text=f"📌 {link.title}",
-                callback_data=f"view_link_{link.id}_{current_page}"  # Include current page
+                callback_data=link_callback("view_link", link.id, current_page, page_prefix)
             )
         )
 
@@ -41,11 +85,11 @@ def create_links_keyboard(links: List[Link], current_page: int = 0, links_per_pa
     nav_buttons = []
     if current_page > 0:
         nav_buttons.append(
-            InlineKeyboardButton("⬅️ Previous", callback_data=f"page_{current_page-1}")
+            InlineKeyboardButton("⬅️ Previous", callback_data=f"{page_prefix}{current_page-1}")
         )
     if current_page < total_pages - 1:
         nav_buttons.append(
-            InlineKeyboardButton("Next ➡️", callback_data=f"page_{current_page+1}")
+            InlineKeyboardButton("Next ➡️", callback_data=f"{page_prefix}{current_page+1}")
         )
     if nav_buttons:
         keyboard.row(*nav_buttons)
@@ -53,15 +97,15 @@ def create_links_keyboard(links: List[Link], current_page: int = 0, links_per_pa
     return keyboard, total_pages
 
 
-def create_link_detail_keyboard(link, voter_id, current_page=0):
-    """Create keyboard for link detail view."""
+def create_link_detail_keyboard(link, voter_id, current_page=0, page_prefix="page_"):
+    """Create keyboard for link detail view; Back returns to the page_prefix list."""
     keyboard = InlineKeyboardMarkup()
 
     # Add vote buttons
     if not link.has_voter_voted(voter_id):
         keyboard.row(
-            InlineKeyboardButton(f"👍 {link.upvotes}", callback_data=f"upvote_{link.id}_{current_page}"),
-            InlineKeyboardButton(f"👎 {link.downvotes}", callback_data=f"downvote_{link.id}_{current_page}")
+            InlineKeyboardButton(f"👍 {link.upvotes}", callback_data=link_callback("upvote", link.id, current_page, page_prefix)),
+            InlineKeyboardButton(f"👎 {link.downvotes}", callback_data=link_callback("downvote", link.id, current_page, page_prefix))
         )
     else:
         keyboard.row(
@@ -71,7 +115,7 @@ def create_link_detail_keyboard(link, voter_id, current_page=0):
 
     # Add visit and back buttons
     keyboard.add(InlineKeyboardButton("🔗 Visit Link", url=link.url))
-    keyboard.add(InlineKeyboardButton("⬅️ Back to List", callback_data=f"page_{current_page}"))
+    keyboard.add(InlineKeyboardButton("⬅️ Back to List", callback_data=f"{page_prefix}{current_page}"))
 
     # Add delete button for admins
     if is_admin(voter_id):
@@ -91,67 +135,71 @@ def register_link_handlers(bot):
             parts = call.data.split('_')
             link_id = int(parts[2])
             current_page = int(parts[3]) if len(parts) > 3 else 0
+            page_prefix = list_prefix(parts, 4)
             user_id = call.from_user.id
 
-            with get_db_session() as session:
+            def view_link(session):
                 # Credit check logic
-                if user_id not in ADMINS:
-                    user = session.query(User).filter(User.user_id == user_id).first()
+                if user_id not in admin_ids():
+                    user = session.get(User, user_id)
                     if not user:
                         user = User(user_id=user_id, credits=5)
                         session.add(user)
 
                     if user.credits <= 0:
-                        bot_username = bot.get_me().username
-                        referral_link = f"t.me/{bot_username}?start={user_id}"
-                        message_text = (
-                            "❌ You don't have enough credits!\n\n"
-                            "To earn more credits:\n"
-                            "- Invite friends using your referral link\n"
-                            "- Get 3 credits for each new user\n\n"
-                            f"Your referral link: {referral_link}"
-                        )
-                        bot.answer_callback_query(call.id, "No credits left!")
-                        bot.edit_message_text(
-                            message_text,
-                            chat_id=call.message.chat.id,
-                            message_id=call.message.message_id
-                        )
-                        return
+                        return 'no_credits', None, False
 
                     user.credits -= 1
 
                 link = get_link_by_id(link_id, session)
                 if not link:
-                    bot.answer_callback_query(call.id, "❌ Link not found!")
-                    return
-
-                if not link.has_user_clicked(user_id):
-                    link.add_click(user_id)
-                    session.commit()
-
-                keyboard = create_link_detail_keyboard(link, user_id, current_page)
-
-                # Escape special characters in title and URL for Markdown
-                safe_title = escape_markdown(link.title)
-                safe_url = escape_markdown(link.url)
-
-                link_text = (
-                    f"*{safe_title}*\n\n"
-                    f"🔗 `{safe_url}`\n"
-                    f"👀 {link.clicks} views\n"
+                    return 'not_found', None, False
+
+                clicked = not link.has_user_clicked(user_id) and link.add_click(user_id)
+                return 'ok', link, clicked
+
+            status, link, clicked = run_write(view_link)
+            if status == 'ok':
+                journal.append('view', link=link_id, user=user_id)
+                if clicked:
+                    journal.append('click', link=link_id, user=user_id)
+
+            if status == 'no_credits':
+                bot_username = bot.get_me().username
+                referral_link = f"t.me/{bot_username}?start={user_id}"
+                message_text = (
+                    "❌ You don't have enough credits!\n\n"
+                    "To earn more credits:\n"
+                    "- Invite friends using your referral link\n"
+                    "- Get 3 credits for each new user\n\n"
+                    f"Your referral link: {referral_link}"
                 )
-
+                bot.answer_callback_query(call.id, "No credits left!")
                 bot.edit_message_text(
+                    message_text,
                     chat_id=call.message.chat.id,
-                    message_id=call.message.message_id,
-                    text=link_text,
-                    parse_mode="MarkdownV2",  # Use MarkdownV2 for better escaping
-                    reply_markup=keyboard,
-                    disable_web_page_preview=True  # Prevent URL preview to avoid formatting issues
+                    message_id=call.message.message_id
                 )
+                return
 
-                bot.answer_callback_query(call.id)
+            if status == 'not_found':
+                bot.answer_callback_query(call.id, "❌ Link not found!")
+                return
+
+            keyboard = create_link_detail_keyboard(link, user_id, current_page, page_prefix)
+
+            link_text = render_link_card(link)
+
+            bot.edit_message_text(
+                chat_id=call.message.chat.id,
+                message_id=call.message.message_id,
+                text=link_text,
+                parse_mode="MarkdownV2",  # Use MarkdownV2 for better escaping
+                reply_markup=keyboard,
+                disable_web_page_preview=True  # Prevent URL preview to avoid formatting issues
+            )
+
+            bot.answer_callback_query(call.id)
 
         except Exception as e:
             logger.error(f"Error in link view handler: {str(e)}")
@@ -166,55 +214,50 @@ def register_link_handlers(bot):
             action = parts[0]
             link_id = int(parts[1])
             current_page = int(parts[2]) if len(parts) > 2 else 0
+            page_prefix = list_prefix(parts, 3)
             voter_id = call.from_user.id
 
-            with get_db_session() as session:
-                link = get_link_by_id(link_id, session)
+            is_upvote = (action == 'upvote')
 
+            def vote(session):
+                link = get_link_by_id(link_id, session)
                 if not link:
-                    bot.answer_callback_query(call.id, "❌ Link not found!")
-                    return
-
-                if link.has_voter_voted(voter_id):
-                    bot.answer_callback_query(call.id, "❌ You've already voted on this link!", show_alert=True)
-                    return
-
-                is_upvote = (action == 'upvote')
-                success = link.add_vote(voter_id, is_upvote)
-
-                if not success:
-                    bot.answer_callback_query(call.id, "❌ You've already voted on this link!", show_alert=True)
-                    return
-
+                    return 'not_found', None
+                if link.has_voter_voted(voter_id) or not link.add_vote(voter_id, is_upvote):
+                    return 'already_voted', None
                 session.flush()
                 session.refresh(link)
-                session.commit()
+                return 'ok', link
+
+            status, link = run_write(vote)
+            if status == 'ok':
+                journal.append('vote', link=link_id, user=voter_id, up=is_upvote)
+
+            if status == 'not_found':
+                bot.answer_callback_query(call.id, "❌ Link not found!")
+                return
 
-                vote_msg = "👍 Upvoted!" if is_upvote else "👎 Downvoted!"
+            if status == 'already_voted':
+                bot.answer_callback_query(call.id, "❌ You've already voted on this link!", show_alert=True)
+                return
 
-                # Use the helper function to create the keyboard with the current page
-                keyboard = create_link_detail_keyboard(link, voter_id, current_page)
+            vote_msg = "👍 Upvoted!" if is_upvote else "👎 Downvoted!"
 
-                # Escape special characters in title and URL for Markdown
-                safe_title = escape_markdown(link.title)
-                safe_url = escape_markdown(link.url)
+            # Use the helper function to create the keyboard with the current page
+            keyboard = create_link_detail_keyboard(link, voter_id, current_page, page_prefix)
 
-                link_text = (
-                    f"*{safe_title}*\n\n"
-                    f"🔗 `{safe_url}`\n"
-                    f"👀 {link.clicks} views\n"
-                )
+            link_text = render_link_card(link)
 
-                bot.edit_message_text(
-                    chat_id=call.message.chat.id,
-                    message_id=call.message.message_id,
-                    text=link_text,
-                    parse_mode="MarkdownV2",  # Use MarkdownV2 for better escaping
-                    reply_markup=keyboard,
-                    disable_web_page_preview=True  # Prevent URL preview to avoid formatting issues
-                )
+            bot.edit_message_text(
+                chat_id=call.message.chat.id,
+                message_id=call.message.message_id,
+                text=link_text,
+                parse_mode="MarkdownV2",  # Use MarkdownV2 for better escaping
+                reply_markup=keyboard,
+                disable_web_page_preview=True  # Prevent URL preview to avoid formatting issues
+            )
 
-                bot.answer_callback_query(call.id, vote_msg)
+            bot.answer_callback_query(call.id, vote_msg)
 
         except Exception as e:
             logger.error(f"Error in vote handler: {str(e)}")
@@ -226,28 +269,28 @@ def register_link_handlers(bot):
         try:
             current_page = int(call.data.split('_')[1])
 
-            with get_db_session() as session:
-                links = get_all_links(session)
-
-                if not links:
-                    bot.edit_message_text(
-                        chat_id=call.message.chat.id,
-                        message_id=call.message.message_id,
-                        text="No links have been shared yet."
-                    )
-                    return
-
-                keyboard, total_pages = create_links_keyboard(links, current_page)
+            links, total_links = get_link_page(current_page, LINKS_PER_PAGE)
 
+            if not total_links:
                 bot.edit_message_text(
                     chat_id=call.message.chat.id,
                     message_id=call.message.message_id,
-                    text=f"📋 *Shared Links*\nClick on a title to view details:\nPage {current_page + 1} of {total_pages}",
-                    parse_mode="Markdown",
-                    reply_markup=keyboard
+                    text="No links have been shared yet."
                 )
+                return
+
+            keyboard, total_pages = create_links_keyboard(links, current_page, total_links=total_links)
+
+            bot.edit_message_text(
+                chat_id=call.message.chat.id,
+                message_id=call.message.message_id,
+                text=f"📋 *Shared Links*\nClick on a title to view details:\nPage {current_page + 1} of {total_pages}",
+                parse_mode="Markdown",
+                reply_markup=keyboard
+            )
 
-                bot.answer_callback_query(call.id)
+            bot.answer_callback_query(call.id)
+            prefetch_link_cards(links)
 
         except Exception as e:
             logger.error(f"Error in page navigation handler: {str(e)}")
@@ -266,23 +309,26 @@ def register_link_handlers(bot):
             _, link_id = call.data.split('_')
             link_id = int(link_id)
 
-            with get_db_session() as session:
+            def visit(session):
                 link = get_link_by_id(link_id, session)
-
                 if not link:
-                    bot.answer_callback_query(call.id, "❌ Link not found!")
-                    return
-
+                    return None
                 # Increment click counter
                 link.clicks += 1
-                session.commit()
+                return link.url
 
-                # Answer callback query with link URL
-                bot.answer_callback_query(
-                    call.id,
-                    "🔗 Opening link...",
-                    url=link.url
-                )
+            url = run_write(visit)
+            if not url:
+                bot.answer_callback_query(call.id, "❌ Link not found!")
+                return
+            journal.append('click', link=link_id, user=call.from_user.id)
+
+            # Answer callback query with link URL
+            bot.answer_callback_query(
+                call.id,
+                "🔗 Opening link...",
+                url=url
+            )
 
         except ValueError:
             bot.answer_callback_query(call.id, "❌ Invalid link data!")
@@ -302,25 +348,29 @@ def register_link_handlers(bot):
             link_id = int(parts[2])
             user_id = call.from_user.id
 
-            if user_id not in ADMINS:
+            if user_id not in admin_ids():
                 bot.answer_callback_query(call.id, "You are not authorized to delete links.")
                 return
 
-            with get_db_session() as session:
+            def delete(session):
                 link = get_link_by_id(link_id, session)
                 if not link:
-                    bot.answer_callback_query(call.id, "❌ Link not found!")
-                    return
-
+                    return False
                 session.delete(link)
-                session.commit()
+                return True
 
-                bot.answer_callback_query(call.id, "Link deleted successfully!")
-                bot.edit_message_text(
-                    chat_id=call.message.chat.id,
-                    message_id=call.message.message_id,
-                    text="Link deleted successfully!"
-                )
+            if not run_write(delete):
+                bot.answer_callback_query(call.id, "❌ Link not found!")
+                return
+            forget_link_card(link_id)
+            journal.append('delete', link=link_id, by=user_id)
+
+            bot.answer_callback_query(call.id, "Link deleted successfully!")
+            bot.edit_message_text(
+                chat_id=call.message.chat.id,
+                message_id=call.message.message_id,
+                text="Link deleted successfully!"
+            )
 
         except Exception as e:
             logger.error(f"Error in delete link handler: {str(e)}")
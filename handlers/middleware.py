@@ -0,0 +1,30 @@
+from telebot.handler_backends import BaseMiddleware
+from database import begin_update_scope, end_update_scope
+from utils.logger import logger
+
+
+class UpdateScopeMiddleware(BaseMiddleware):
+    """
+    Give each update one database unit of work: every session opened while
+    its handler runs shares one SQLAlchemy session, which is closed (and
+    rolled back if the handler raised) once the update is done.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.update_types = ['message', 'edited_message', 'callback_query',
+                             'inline_query', 'chosen_inline_result']
+
+    def pre_process(self, message, data):
+        begin_update_scope()
+
+    def post_process(self, message, data, exception):
+        try:
+            end_update_scope(failed=exception is not None)
+        except Exception as e:
+            logger.error(f"Error closing update unit of work: {str(e)}")
+
+
+def register_middlewares(bot):
+    """Register update middlewares; the bot needs use_class_middlewares=True."""
+    bot.setup_middleware(UpdateScopeMiddleware())
@@ -1,56 +1,30 @@
 from telebot.types import (
     Message,
+    CallbackQuery,
     ReplyKeyboardMarkup,
     KeyboardButton,
     ForceReply,
     InlineKeyboardMarkup,
     InlineKeyboardButton
 )
-from database import get_user_by_id, save_user, get_all_links, get_db_session
-from handlers.validation import is_valid_title, is_valid_group_link
+from database import (
+    get_user_by_id, save_user, get_link_page, get_read_session, run_write,
+    is_duplicate_link, remember_link_url, search_links, set_notifications, LATEST_LINK_BY_USER
+)
+from handlers.link_handlers import create_links_keyboard, prefetch_link_cards, LINKS_PER_PAGE
+from handlers.validation import is_valid_title, is_valid_group_link, canonicalize_group_link
 from models.link_model import Link
 from models.user_model import User
 from utils.logger import logger
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from utils.helpers import format_timestamp, is_admin as is_admin_user
 from config import ADMINS
 from handlers.start_handler import handle_start
 from datetime import datetime, timedelta
+from utils.journal import journal
 
-def create_links_keyboard(links, current_page=0, links_per_page=10):
-    """Create paginated keyboard for links list."""
-    total_links = len(links)
-    total_pages = (total_links + links_per_page - 1) // links_per_page
-    
-    start_idx = current_page * links_per_page
-    end_idx = min(start_idx + links_per_page, total_links)
-    current_links = links[start_idx:end_idx]
-    
-    keyboard = InlineKeyboardMarkup(row_width=1)
-    
-    # Add link buttons
-    for link in current_links:
-        keyboard.add(
-            InlineKeyboardButton(
-                text=f"📌 {link.title}",
-                callback_data=f"view_link_{link.id}_{current_page}"  # Include current page
-            )
-        )
-    
-    # Add navigation buttons
-    nav_buttons = []
-    if current_page > 0:
-        nav_buttons.append(
-            InlineKeyboardButton("⬅️ Previous", callback_data=f"page_{current_page-1}")
-        )
-    if current_page < total_pages - 1:
-        nav_buttons.append(
-            InlineKeyboardButton("Next ➡️", callback_data=f"page_{current_page+1}")
-        )
-    if nav_buttons:
-        keyboard.row(*nav_buttons)
-    
-    return keyboard, total_pages
+# Maximum number of matches a /search paginates through
+SEARCH_RESULT_LIMIT = 50
 
 def check_active_link(user_id: int, session) -> tuple[bool, str]:
     """
@@ -70,12 +44,7 @@ def check_active_link(user_id: int, session) -> tuple[bool, str]:
             return False, ""  # Admins can always post
             
         # Get user's most recent link
-        user_link = (
-            session.query(Link)
-            .filter(Link.user_id == user_id)
-            .order_by(Link.submit_date.desc())
-            .first()
-        )
+        user_link = session.scalar(LATEST_LINK_BY_USER, {'user_id': user_id})
         
         if not user_link:
             return False, ""
@@ -118,45 +87,46 @@ def register_user_handlers(bot):
             user_id = message.from_user.id
             is_admin = is_admin_user(user_id)
             
-            with get_db_session() as session:
+            has_active_link = False
+            if not is_admin:
                 # Check if user has an active link (skipped for admins)
-                if not is_admin:
+                with get_read_session() as session:
                     has_active_link, time_message = check_active_link(user_id, session)
-                    
-                    if has_active_link:
-                        keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
-                        keyboard.add(
-                            KeyboardButton("📝 Add Your Link"),
-                            KeyboardButton("🔗 View Links"),
-                            KeyboardButton("💎 Check Credits")
-                        )
-                        bot.reply_to(message, time_message, reply_markup=keyboard)
-                        return
-                
-                # Send warning message first
-                warning_message = (
-                    "⚠️DISCLAIMER⚠️\n"
-                    "We strictly prohibit and do not endorse any illegal activities, including but not limited to "
-                    "hacking, spamming, pornography, or any other harmful material. Violations of these restrictions "
-                    "will result in immediate and strict action.\n\n"
-                    "Please verify the title and link before sending, as they cannot be changed after submission."
-                )
-                bot.send_message(message.chat.id, warning_message)
-                
-                # Wait a short moment before sending the prompt
-                # Use force reply to ensure we get a response from the correct user
-                prompt = "Please send the title for your link:"
-                if is_admin:
-                    prompt = "[Admin] " + prompt
-                    
-                # Important: Register the next step handler after sending the message
-                sent_msg = bot.send_message(
-                    message.chat.id,
-                    prompt,
-                    reply_markup=ForceReply()
+
+            if has_active_link:
+                keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
+                keyboard.add(
+                    KeyboardButton("📝 Add Your Link"),
+                    KeyboardButton("🔗 View Links"),
+                    KeyboardButton("💎 Check Credits")
                 )
-                bot.register_next_step_handler(sent_msg, process_title)
+                bot.reply_to(message, time_message, reply_markup=keyboard)
+                return
+            
+            # Send warning message first
+            warning_message = (
+                "⚠️DISCLAIMER⚠️\n"
+                "We strictly prohibit and do not endorse any illegal activities, including but not limited to "
+                "hacking, spamming, pornography, or any other harmful material. Violations of these restrictions "
+                "will result in immediate and strict action.\n\n"
+                "Please verify the title and link before sending, as they cannot be changed after submission."
+            )
+            bot.send_message(message.chat.id, warning_message)
+            
+            # Wait a short moment before sending the prompt
+            # Use force reply to ensure we get a response from the correct user
+            prompt = "Please send the title for your link:"
+            if is_admin:
+                prompt = "[Admin] " + prompt
                 
+            # Important: Register the next step handler after sending the message
+            sent_msg = bot.send_message(
+                message.chat.id,
+                prompt,
+                reply_markup=ForceReply()
+            )
+            bot.register_next_step_handler(sent_msg, process_title)
+            
         except Exception as e:
             logger.error(f"Error in add button handler: {str(e)}")
             bot.reply_to(message, "Sorry, an error occurred. Please try again.")
@@ -203,19 +173,39 @@ def register_user_handlers(bot):
                 bot.reply_to(message, "Sorry, something went wrong. Please try again.")
                 return
 
-            submit_time = None  # We'll store this for the message
+            canonical_url = canonicalize_group_link(url)
 
-            # Save link to database
-            with get_db_session() as session:
+            def save_link(session):
+                if canonical_url and is_duplicate_link(canonical_url, session):
+                    return None
                 new_link = Link(
                     title=title,
                     url=url,
-                    user_id=user_id
+                    user_id=user_id,
+                    canonical_url=canonical_url
                 )
                 session.add(new_link)
-                session.flush()  # This will populate the submit_date
-                submit_time = new_link.submit_date  # Store it before committing
-                session.commit()
+                session.flush()  # This will populate the id and submit_date
+                return new_link.id, new_link.submit_date
+
+            # Save link to database
+            duplicate = False
+            try:
+                saved = run_write(save_link)
+                duplicate = saved is None
+            except IntegrityError:
+                # Same group submitted concurrently; the unique index caught it
+                duplicate = True
+
+            if duplicate:
+                bot.user_data.pop(user_id, None)
+                bot.reply_to(message, "❌ This group has already been shared.")
+                return
+
+            link_id, submit_time = saved
+            if canonical_url:
+                remember_link_url(canonical_url)
+            journal.append('submit', link=link_id, user=user_id)
 
             # Clear stored data
             bot.user_data.pop(user_id, None)
@@ -253,26 +243,26 @@ def register_user_handlers(bot):
                 KeyboardButton("💎 Check Credits")
             )
 
-            with get_db_session() as session:
-                links = get_all_links(session)
-                
-                if not links:
-                    bot.reply_to(
-                        message, 
-                        "No links have been shared yet.", 
-                        reply_markup=keyboard
-                    )
-                    return
-                
-                # Use the new pagination system
-                inline_keyboard, total_pages = create_links_keyboard(links)
-                
+            links, total_links = get_link_page(0, LINKS_PER_PAGE)
+
+            if not total_links:
                 bot.reply_to(
-                    message,
-                    f"📋 *Shared Links*\nClick on a title to view details:\nPage 1 of {total_pages}",
-                    parse_mode="Markdown",
-                    reply_markup=inline_keyboard
+                    message, 
+                    "No links have been shared yet.", 
+                    reply_markup=keyboard
                 )
+                return
+
+            # Use the new pagination system
+            inline_keyboard, total_pages = create_links_keyboard(links, total_links=total_links)
+
+            bot.reply_to(
+                message,
+                f"📋 *Shared Links*\nClick on a title to view details:\nPage 1 of {total_pages}",
+                parse_mode="Markdown",
+                reply_markup=inline_keyboard
+            )
+            prefetch_link_cards(links)
             
         except Exception as e:
             logger.error(f"Error in view links handler: {str(e)}")
@@ -294,42 +284,134 @@ def register_user_handlers(bot):
         try:
             user_id = message.from_user.id
             
-            with get_db_session() as session:
-                user = session.query(User).filter(User.user_id == user_id).first()
-                if not user:
-                    # Create user if doesn't exist
-                    user = User(user_id=user_id, credits=5)
-                    session.add(user)
-                    session.commit()
-                
-                bot_username = bot.get_me().username
-                referral_link = f"t.me/{bot_username}?start={user_id}"
-                message_text = (
-                    f"💎 You have {user.credits} credits\n\n"
-                    "To earn more credits:\n"
-                    "- Invite friends using your referral link\n"
-                    "- Get 3 credits for each new user\n\n"
-                    f"Your referral link: {referral_link}"
-                )
-                
-                # Create keyboard for consistent UI
-                keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
-                keyboard.add(
-                    KeyboardButton("📝 Add Your Link"),
-                    KeyboardButton("🔗 View Links"),
-                    KeyboardButton("💎 Check Credits")
-                )
-                
-                bot.reply_to(
-                    message,
-                    message_text,
-                    reply_markup=keyboard
-                )
-                
+            with get_read_session() as session:
+                user = session.get(User, user_id)
+            if not user:
+                # Create user if doesn't exist
+                user = save_user(user_id)
+
+            bot_username = bot.get_me().username
+            referral_link = f"t.me/{bot_username}?start={user_id}"
+            message_text = (
+                f"💎 You have {user.credits} credits\n\n"
+                "To earn more credits:\n"
+                "- Invite friends using your referral link\n"
+                "- Get 3 credits for each new user\n\n"
+                f"Your referral link: {referral_link}"
+            )
+            
+            # Create keyboard for consistent UI
+            keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
+            keyboard.add(
+                KeyboardButton("📝 Add Your Link"),
+                KeyboardButton("🔗 View Links"),
+                KeyboardButton("💎 Check Credits")
+            )
+            
+            bot.reply_to(
+                message,
+                message_text,
+                reply_markup=keyboard
+            )
+            
         except Exception as e:
             logger.error(f"Error in check credits handler: {str(e)}")
             bot.reply_to(message, "Sorry, an error occurred while checking credits.")
 
+    # Last search terms per user, used when turning search result pages
+    search_terms = {}
+
+    def send_search_page(chat_id: int, user_id: int, current_page: int, message_id=None):
+        """Send or edit a page of search results for the user's last query."""
+        terms = search_terms.get(user_id)
+        with get_read_session() as session:
+            links = search_links(terms, session, limit=SEARCH_RESULT_LIMIT) if terms else []
+        if not links:
+            text = f"No links found for \"{terms}\"." if terms else "Search expired, please search again."
+            if message_id:
+                bot.edit_message_text(text, chat_id=chat_id, message_id=message_id)
+            else:
+                bot.send_message(chat_id, text)
+            return
+
+        keyboard, total_pages = create_links_keyboard(links, current_page, page_prefix="search_page_")
+        text = f"🔎 Results for \"{terms}\"\nPage {current_page + 1} of {total_pages}"
+        if message_id:
+            bot.edit_message_text(text, chat_id=chat_id, message_id=message_id, reply_markup=keyboard)
+        else:
+            bot.send_message(chat_id, text, reply_markup=keyboard)
+        start = current_page * LINKS_PER_PAGE
+        prefetch_link_cards(links[start:start + LINKS_PER_PAGE])
+
+    @bot.message_handler(commands=['search'])
+    def handle_search(message: Message):
+        """Handle /search <terms> with ranked full-text matches on link titles."""
+        try:
+            parts = message.text.split(maxsplit=1)
+            if len(parts) < 2 or not parts[1].strip():
+                bot.reply_to(message, "Usage: /search <words>\nExample: /search python")
+                return
+
+            search_terms[message.from_user.id] = parts[1].strip()[:100]
+            send_search_page(message.chat.id, message.from_user.id, 0)
+
+        except Exception as e:
+            logger.error(f"Error in search handler: {str(e)}")
+            bot.reply_to(message, "Sorry, an error occurred while searching.")
+
+    @bot.callback_query_handler(func=lambda call: call.data.startswith("search_page_"))
+    def handle_search_page(call: CallbackQuery):
+        """Handle pagination of search results."""
+        try:
+            current_page = int(call.data.split('_')[2])
+            send_search_page(
+                call.message.chat.id,
+                call.from_user.id,
+                current_page,
+                message_id=call.message.message_id
+            )
+            bot.answer_callback_query(call.id)
+
+        except Exception as e:
+            logger.error(f"Error in search page handler: {str(e)}")
+            bot.answer_callback_query(call.id, "❌ An error occurred!")
+
+    @bot.message_handler(commands=['notifications'])
+    def handle_notifications(message: Message):
+        """Handle /notifications [on|off]: show or change the expiry notification setting."""
+        try:
+            user_id = message.from_user.id
+            parts = message.text.split()
+            choice = parts[1].lower() if len(parts) > 1 else None
+
+            if choice in ('on', 'off'):
+                set_notifications(user_id, choice == 'on')
+                enabled = choice == 'on'
+            elif choice is None:
+                with get_read_session() as session:
+                    user = session.get(User, user_id)
+                enabled = user is None or user.notifications
+            else:
+                bot.reply_to(message, "Usage: /notifications on|off")
+                return
+
+            if enabled:
+                text = (
+                    "🔔 Expiry notifications are on.\n"
+                    "You will get a message before your link expires and once it has.\n\n"
+                    "Use /notifications off to stop them."
+                )
+            else:
+                text = (
+                    "🔕 Expiry notifications are off.\n\n"
+                    "Use /notifications on to be told before your link expires."
+                )
+            bot.reply_to(message, text)
+
+        except Exception as e:
+            logger.error(f"Error in notifications handler: {str(e)}")
+            bot.reply_to(message, "Sorry, an error occurred while updating notifications.")
+
     # Register all handlers
     bot.register_next_step_handler_by_chat_id = getattr(bot, 'register_next_step_handler_by_chat_id', {})
     bot.user_data = getattr(bot, 'user_data', {})
\ No newline at end of file
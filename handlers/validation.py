@@ -1,9 +1,16 @@
 import re
-from utils.logger import logger
+from utils.logger import logger, hot_logger
+from utils.content_filter import content_filter
 from urllib.parse import urlparse
 from typing import Tuple, Optional
 from datetime import datetime
 
+# Structural patterns, compiled once at import
+JOINCHAT_CODE_RE = re.compile(r'^[a-zA-Z0-9_-]{16,}$')
+PUBLIC_USERNAME_RE = re.compile(r'^[a-zA-Z0-9_]{5,64}$')
+TITLE_INVALID_CHARS_RE = re.compile(r'[<>{}[\]\\/@#$%^&*()]')
+UNSAFE_INPUT_CHARS_RE = re.compile(r'[<>{}[\]\\]')
+
 
 class ValidationError(Exception):
     """Custom exception for validation errors."""
@@ -49,7 +56,7 @@ def is_valid_group_link(url: str) -> Tuple[bool, Optional[str]]:
         # Handle joinchat links
         if path.startswith('joinchat/'):
             invite_code = path.split('/')[-1]
-            if not re.match(r'^[a-zA-Z0-9_-]{16,}$', invite_code):
+            if not JOINCHAT_CODE_RE.match(invite_code):
                 return False, "Invalid private group invite code"
             return True, None
 
@@ -62,36 +69,21 @@ def is_valid_group_link(url: str) -> Tuple[bool, Optional[str]]:
             return True, None
 
         # Validate public group username - Updated regex to properly handle underscores
-        if not re.match(r'^[a-zA-Z0-9_]{5,64}$', path):
+        if not PUBLIC_USERNAME_RE.match(path):
             return False, "Invalid public group username format"
 
-        # Check for reserved words
-        reserved_words = {
-            'admin', 'support', 'telegram', 'abuse', 'contact', 
-            'spam', 'scam', 'fake', 'official', 'help', 'bot',
-            'service', 'security', 'verification'
-        }
-        
-        if path.lower() in reserved_words:  # Changed to exact match to allow partial matches in usernames
-            return False, "Username contains reserved word"
+        # Check for reserved words (exact match to allow partial matches in usernames)
+        match = content_filter.check('group_username', path)
+        if match:
+            return False, match.message
 
         # Security checks
-        security_patterns = [
-            (r'javascript:', 'JavaScript injection attempt detected'),
-            (r'data:', 'Data URI not allowed'),
-            (r'<.*?>', 'HTML tags not allowed'),
-            (r'[\'";\{\}]', 'Special characters not allowed'),  # Removed backslash from pattern
-            (r'file:', 'File protocol not allowed'),
-            (r'about:', 'About protocol not allowed'),
-            (r'vbscript:', 'VBScript not allowed')
-        ]
-        
-        for pattern, error_msg in security_patterns:
-            if re.search(pattern, url, re.IGNORECASE):
-                logger.warning(f"Security violation in URL: {error_msg}")
-                return False, f"Security violation: {error_msg}"
+        match = content_filter.check('url', url)
+        if match:
+            logger.warning("Security violation in URL: %s (rule %s)", match.message, match.rule_id)
+            return False, f"Security violation: {match.message}"
 
-        logger.info(f"Valid group link validated: {url}")
+        hot_logger.info("Valid group link validated: %s", url)
         return True, None
 
     except Exception as e:
@@ -99,6 +91,37 @@ def is_valid_group_link(url: str) -> Tuple[bool, Optional[str]]:
         return False, "Error validating URL"
 
 
+def canonicalize_group_link(url: str) -> Optional[str]:
+    """
+    Reduce a group link to one canonical form for duplicate detection.
+    Scheme, domain variants (telegram.me) and username case are dropped;
+    invite codes keep their case and joinchat links become t.me/+code.
+
+    Args:
+        url (str): A link that passed is_valid_group_link
+
+    Returns:
+        Optional[str]: Canonical link such as 't.me/username', or None if
+                       the URL is not a Telegram link
+    """
+    try:
+        url = url.strip()
+        parsed_url = urlparse(url if '://' in url else f'https://{url}')
+        if parsed_url.netloc.lower() not in ['t.me', 'telegram.me']:
+            return None
+
+        path = parsed_url.path.strip('/')
+        if path.lower().startswith('joinchat/'):
+            return f"t.me/+{path.split('/')[-1]}"
+        if path.startswith('+'):
+            return f"t.me/{path}"
+        return f"t.me/{path.lower()}"
+
+    except Exception as e:
+        logger.error(f"Error canonicalizing URL {url}: {str(e)}")
+        return None
+
+
 def is_valid_title(title: str) -> Tuple[bool, Optional[str]]:
     """
     Validate a link title.
@@ -124,24 +147,16 @@ def is_valid_title(title: str) -> Tuple[bool, Optional[str]]:
             return False, "Title must not exceed 100 characters"
 
         # Character validation
-        if re.search(r'[<>{}[\]\\/@#$%^&*()]', title):
+        if TITLE_INVALID_CHARS_RE.search(title):
             return False, "Title contains invalid characters"
 
         # Content validation
-        spam_patterns = {
-            r'\b(?:buy|sell|spam)\b': 'Commercial spam detected',
-            r'\b(?:xxx|porn|adult)\b': 'Adult content not allowed',
-            r'\b(?:hack|crack|cheat)\b': 'Malicious content detected',
-            r'\b(?:free.*money|easy.*cash)\b': 'Suspicious promotional content',
-            r'\b(?:bitcoin|crypto.*invest)\b': 'Cryptocurrency spam detected'
-        }
-
-        for pattern, error_msg in spam_patterns.items():
-            if re.search(pattern, title, re.IGNORECASE):
-                logger.warning(f"Spam detected in title: {error_msg}")
-                return False, f"Invalid content: {error_msg}"
-
-        logger.info(f"Valid title validated: {title}")
+        match = content_filter.check('title', title)
+        if match:
+            logger.warning("Spam detected in title: %s (rule %s)", match.message, match.rule_id)
+            return False, f"Invalid content: {match.message}"
+
+        hot_logger.info("Valid title validated: %s", title)
         return True, None
 
     except Exception as e:
@@ -168,17 +183,10 @@ def is_valid_message(message: str) -> Tuple[bool, Optional[str]]:
             return False, "Message exceeds maximum length of 4096 characters"
 
         # Security validation
-        security_patterns = [
-            (r'<script.*?>.*?</script>', 'Script tags not allowed'),
-            (r'javascript:', 'JavaScript code not allowed'),
-            (r'onclick|onload|onerror', 'Event handlers not allowed'),
-            (r'data:.*?base64', 'Base64 data not allowed')
-        ]
-
-        for pattern, error_msg in security_patterns:
-            if re.search(pattern, message, re.IGNORECASE):
-                logger.warning(f"Security violation in message: {error_msg}")
-                return False, f"Security violation: {error_msg}"
+        match = content_filter.check('message', message)
+        if match:
+            logger.warning("Security violation in message: %s (rule %s)", match.message, match.rule_id)
+            return False, f"Security violation: {match.message}"
 
         return True, None
 
@@ -205,7 +213,7 @@ def sanitize_input(text: str) -> str:
         text = ''.join(char for char in text if ord(char) >= 32)
 
         # Remove potentially dangerous characters
-        text = re.sub(r'[<>{}[\]\\]', '', text)
+        text = UNSAFE_INPUT_CHARS_RE.sub('', text)
 
         # Remove multiple spaces
         text = ' '.join(text.split())
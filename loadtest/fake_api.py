@@ -0,0 +1,169 @@
+import json
+import random
+import threading
+from collections import Counter as CallCounter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep, time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+FAKE_BOT_USER = {
+    'id': 1000000001,
+    'is_bot': True,
+    'first_name': 'LPB Load Test',
+    'username': 'lpb_loadtest_bot',
+    'can_join_groups': True,
+    'can_read_all_group_messages': False,
+    'supports_inline_queries': True,
+}
+
+# Methods that never get artificial latency or 429s
+CONTROL_METHODS = {'getUpdates', 'getMe', 'deleteWebhook', 'setWebhook', 'close', 'logOut'}
+
+
+class FakeBotAPI:
+    """
+    Local stand-in for the Telegram Bot API.
+
+    Serves getUpdates from an in-memory queue and accepts every other
+    method with a plausible result. Each call can be delayed and answered
+    with 429 Too Many Requests, and every call is reported to `on_call`
+    so a driver can match bot responses to the updates it sent.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 rate_limit_probability: float = 0.0, retry_after: int = 1,
+                 on_call: Optional[Callable[[str, Dict[str, str]], None]] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.on_call = on_call
+        self.calls = CallCounter()
+        self.rate_limited = CallCounter()
+
+        self._updates: List[Dict] = []
+        self._next_update_id = 1
+        self._message_id = 1
+        self._condition = threading.Condition()
+        self._random = random.Random()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self) -> str:
+        """Value for telebot.apihelper.API_URL."""
+        return self.address + "/bot{0}/{1}"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-bot-api', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def push_update(self, update: Dict) -> int:
+        """Queue an update for the next getUpdates call and return its update_id."""
+        with self._condition:
+            update = dict(update)
+            update['update_id'] = self._next_update_id
+            self._next_update_id += 1
+            self._updates.append(update)
+            self._condition.notify_all()
+            return update['update_id']
+
+    def _get_updates(self, params: Dict[str, str]) -> List[Dict]:
+        offset = int(params.get('offset', 0) or 0)
+        limit = int(params.get('limit', 100) or 100)
+        # Long polling, but short enough for a quick shutdown
+        timeout = min(float(params.get('timeout', 0) or 0), 1.0)
+        deadline = monotonic() + timeout
+        with self._condition:
+            # Updates below the offset are confirmed and can be dropped
+            self._updates = [update for update in self._updates if update['update_id'] >= offset]
+            while not self._updates and monotonic() < deadline:
+                self._condition.wait(deadline - monotonic())
+            return self._updates[:limit]
+
+    def _result_for(self, method: str, params: Dict[str, str]):
+        if method == 'getMe':
+            return FAKE_BOT_USER
+        if method in ('answerCallbackQuery', 'answerInlineQuery', 'deleteMessage',
+                      'deleteWebhook', 'setWebhook'):
+            return True
+        if method == 'getFile':
+            return {'file_id': params.get('file_id', ''), 'file_unique_id': 'x', 'file_path': 'documents/file'}
+
+        # sendMessage, editMessageText, sendDocument, ...: echo a message
+        with self._condition:
+            self._message_id += 1
+            message_id = self._message_id
+        chat_id = int(params.get('chat_id', 0) or 0)
+        return {
+            'message_id': int(params.get('message_id', message_id) or message_id),
+            'from': FAKE_BOT_USER,
+            'chat': {'id': chat_id, 'type': 'private', 'first_name': 'Load'},
+            'date': int(time()),
+            'text': params.get('text', ''),
+        }
+
+    def _make_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                parsed = urlparse(self.path)
+                method = parsed.path.rstrip('/').rsplit('/', 1)[-1]
+                params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                if body and self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'):
+                    params.update({key: values[-1] for key, values in parse_qs(body.decode()).items()})
+
+                api.calls[method] += 1
+                if method not in CONTROL_METHODS:
+                    delay = api.latency_ms + api._random.uniform(0, api.jitter_ms)
+                    if delay:
+                        sleep(delay / 1000)
+                    if api._random.random() < api.rate_limit_probability:
+                        api.rate_limited[method] += 1
+                        self._reply(429, {
+                            'ok': False,
+                            'error_code': 429,
+                            'description': f"Too Many Requests: retry after {api.retry_after}",
+                            'parameters': {'retry_after': api.retry_after},
+                        })
+                        return
+
+                if method == 'getUpdates':
+                    result = api._get_updates(params)
+                else:
+                    result = api._result_for(method, params)
+                    if api.on_call:
+                        api.on_call(method, params)
+                self._reply(200, {'ok': True, 'result': result})
+
+            do_GET = _handle
+            do_POST = _handle
+
+            def _reply(self, status: int, payload: Dict) -> None:
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,383 @@
+"""
+End-to-end load test: run the bot against a local fake Telegram Bot API
+and replay synthetic or recorded updates at a target rate.
+
+    python -m loadtest.replay --rate 50 --duration 30
+    python -m loadtest.replay --rate 20 --latency-ms 40 --rate-limit 0.02
+    python -m loadtest.replay --updates recorded.jsonl --rate 100
+
+The bot runs in-process with its normal handlers and database; only
+telebot.apihelper.API_URL is pointed at the fake server. Per update type
+the report shows throughput, p50/p99 latency (update queued until the
+bot's answering API call) and error rates. The run writes users, links
+and votes to the configured database, so point it at a scratch copy, e.g.
+LPB_DATABASE_URI=sqlite:////tmp/loadtest.db or a throwaway PostgreSQL database.
+"""
+import argparse
+import itertools
+import json
+import random
+import statistics
+import threading
+from collections import defaultdict, deque
+from datetime import datetime
+from time import monotonic, sleep, time
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+
+from telebot import TeleBot, apihelper
+
+from loadtest.fake_api import FakeBotAPI
+
+# Share of each synthetic update type in the generated stream
+UPDATE_MIX = {
+    'start': 0.15,
+    'view_link': 0.35,
+    'vote': 0.20,
+    'page': 0.20,
+    'submit': 0.10,
+}
+
+# Owner of the seeded links
+SEED_OWNER_ID = 1
+
+# Token of the replay bot; only the fake API ever sees it
+FAKE_TOKEN = "123:fake"
+
+# Reply texts that mean a handler hit its error path
+ERROR_MARKERS = ('error occurred', 'an error', 'database error')
+
+
+class Pending:
+    """An update waiting for the bot's response calls."""
+    __slots__ = ('kind', 'sent_at', 'expected', 'on_done', 'failed')
+
+    def __init__(self, kind: str, expected: int, on_done: Optional[Callable[[], None]]):
+        self.kind = kind
+        self.sent_at = monotonic()
+        self.expected = expected
+        self.on_done = on_done
+        self.failed = False
+
+
+class ReplayDriver:
+    """Sends updates to the fake API and matches the bot's responses to them."""
+
+    def __init__(self, api: FakeBotAPI, think_time: float = 0.2):
+        self.api = api
+        # Delay before a follow-up step; the bot registers its next-step
+        # handler only after the prompt's API call has returned
+        self.think_time = think_time
+        self.sent: Dict[str, int] = defaultdict(int)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self._pending: Dict[str, Deque[Pending]] = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        api.on_call = self.on_call
+
+    # Update builders -------------------------------------------------------
+
+    def _user(self, user_id: int) -> Dict:
+        return {'id': user_id, 'is_bot': False, 'first_name': 'Load', 'username': f'load{user_id}'}
+
+    def _message(self, user_id: int, text: str) -> Dict:
+        return {
+            'message_id': next(self._ids),
+            'from': self._user(user_id),
+            'chat': {'id': user_id, 'type': 'private', 'first_name': 'Load'},
+            'date': int(time()),
+            'text': text,
+        }
+
+    def send_message(self, kind: str, user_id: int, text: str, expected: int = 1,
+                     on_done: Optional[Callable[[], None]] = None) -> None:
+        self._send(kind, f"chat:{user_id}", {'message': self._message(user_id, text)}, expected, on_done)
+
+    def send_callback(self, kind: str, user_id: int, data: str) -> None:
+        callback_id = str(next(self._ids))
+        update = {
+            'callback_query': {
+                'id': callback_id,
+                'from': self._user(user_id),
+                'chat_instance': str(user_id),
+                'data': data,
+                'message': self._message(user_id, 'list'),
+            }
+        }
+        self._send(kind, f"cb:{callback_id}", update, 1, None)
+
+    def send_raw(self, update: Dict) -> None:
+        """Replay a recorded update; completion is its first matching response."""
+        if 'callback_query' in update:
+            key = f"cb:{update['callback_query']['id']}"
+            kind = update['callback_query'].get('data', 'callback').split('_', 1)[0]
+        elif 'message' in update:
+            key = f"chat:{update['message']['chat']['id']}"
+            kind = (update['message'].get('text') or 'message').split()[0][:20]
+        else:
+            key, kind = None, next(iter(update.keys() - {'update_id'}), 'update')
+        self._send(kind, key, update, 1, None)
+
+    def _send(self, kind: str, key: Optional[str], update: Dict, expected: int,
+              on_done: Optional[Callable[[], None]]) -> None:
+        with self._lock:
+            self.sent[kind] += 1
+            if key is not None:
+                self._pending[key].append(Pending(kind, expected, on_done))
+        self.api.push_update(update)
+
+    # Response matching -----------------------------------------------------
+
+    def on_call(self, method: str, params: Dict[str, str]) -> None:
+        """Called by the fake API for every bot request other than getUpdates."""
+        if method == 'answerCallbackQuery':
+            key = f"cb:{params.get('callback_query_id')}"
+        elif method in ('sendMessage', 'sendDocument', 'sendPhoto'):
+            key = f"chat:{params.get('chat_id')}"
+        else:
+            return
+
+        text = (params.get('text') or '').lower()
+        done = None
+        with self._lock:
+            queue = self._pending.get(key)
+            if not queue:
+                return
+            pending = queue[0]
+            pending.expected -= 1
+            if any(marker in text for marker in ERROR_MARKERS):
+                pending.failed = True
+            if pending.expected <= 0:
+                queue.popleft()
+                if not queue:
+                    del self._pending[key]
+                self.latencies[pending.kind].append(monotonic() - pending.sent_at)
+                if pending.failed:
+                    self.errors[pending.kind] += 1
+                done = pending.on_done
+        if done:
+            threading.Timer(self.think_time, done).start()
+
+    def outstanding(self) -> Dict[str, int]:
+        """Updates still waiting for a response, per type."""
+        counts: Dict[str, int] = defaultdict(int)
+        with self._lock:
+            for queue in self._pending.values():
+                for pending in queue:
+                    counts[pending.kind] += 1
+        return counts
+
+
+class SyntheticStream:
+    """Generates user actions following UPDATE_MIX."""
+
+    def __init__(self, driver: ReplayDriver, link_ids: List[int], users: int, seed: int = 1):
+        self.driver = driver
+        self.link_ids = link_ids
+        self.random = random.Random(seed)
+        # Fresh ids per run so new-user and submission paths are exercised
+        self.user_base = 7_000_000_000 + int(time()) * 1000
+        self.returning_users = [self.user_base + i for i in range(users)]
+        self.fresh_users = itertools.count(self.user_base + users)
+        self.kinds = list(UPDATE_MIX)
+        self.weights = [UPDATE_MIX[kind] for kind in self.kinds]
+
+    def emit(self) -> None:
+        kind = self.random.choices(self.kinds, self.weights)[0]
+        user_id = self.random.choice(self.returning_users)
+        link_id = self.random.choice(self.link_ids)
+        page = self.random.randrange(max(1, len(self.link_ids) // 10))
+
+        if kind == 'start':
+            self.driver.send_message('start', next(self.fresh_users), '/start')
+        elif kind == 'view_link':
+            self.driver.send_callback('view_link', user_id, f"view_link_{link_id}_{page}")
+        elif kind == 'vote':
+            action = self.random.choice(('upvote', 'downvote'))
+            self.driver.send_callback('vote', user_id, f"{action}_{link_id}_{page}")
+        elif kind == 'page':
+            self.driver.send_callback('page', user_id, f"page_{page}")
+        else:
+            self._submit(next(self.fresh_users))
+
+    def _submit(self, user_id: int) -> None:
+        """Three-step submission: button, title, link; each step waits for the previous one."""
+        send = self.driver.send_message
+
+        def send_link():
+            send('submit.link', user_id, f"https://t.me/lt_group_{user_id}")
+
+        def send_title():
+            send('submit.title', user_id, f"Load test group {user_id % 100000}", on_done=send_link)
+
+        # The button answers with a disclaimer and a ForceReply prompt
+        send('submit.button', user_id, "📝 Add Your Link", expected=2, on_done=send_title)
+
+
+def recorded_stream(path: str, driver: ReplayDriver) -> Iterator[Callable[[], None]]:
+    """Yield one send action per update in a JSONL file, looping forever."""
+    with open(path, encoding='utf-8') as source:
+        updates = [json.loads(line) for line in source if line.strip()]
+    if not updates:
+        raise ValueError(f"No updates in {path}")
+    for update in itertools.cycle(updates):
+        yield lambda update=update: driver.send_raw(update)
+
+
+def seed_links(count: int) -> List[int]:
+    """Make sure at least `count` links exist and return their ids."""
+    from database import ensure_user, get_read_session, run_write
+    from models.link_model import Link
+    from utils.helpers import escape_markdown
+
+    def existing_ids() -> List[int]:
+        with get_read_session() as session:
+            return [link_id for (link_id,) in session.query(Link.id).order_by(Link.id).limit(count)]
+
+    ensure_user(SEED_OWNER_ID)
+    link_ids = existing_ids()
+    missing = count - len(link_ids)
+    if missing > 0:
+        def insert(session):
+            stamp = int(time())
+            now = datetime.utcnow()
+            session.execute(Link.__table__.insert(), [
+                {
+                    'title': f"Load test seed {stamp} {i}",
+                    'url': f"https://t.me/lt_seed_{stamp}_{i}",
+                    'canonical_url': f"t.me/lt_seed_{stamp}_{i}",
+                    'title_md': escape_markdown(f"Load test seed {stamp} {i}"),
+                    'url_md': escape_markdown(f"https://t.me/lt_seed_{stamp}_{i}"),
+                    'user_id': SEED_OWNER_ID,
+                    'submit_date': now,
+                    'clicks': 0, 'upvotes': 0, 'downvotes': 0, 'score': 2.0,
+                    'voter_ids': '', 'clicker_ids': '',
+                }
+                for i in range(missing)
+            ])
+
+        run_write(insert)
+        link_ids = existing_ids()
+    return link_ids
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def print_report(driver: ReplayDriver, api: FakeBotAPI, elapsed: float) -> Dict:
+    """Print and return the per-type throughput, latency and error summary."""
+    outstanding = driver.outstanding()
+    report = {'elapsed_s': round(elapsed, 2), 'types': {}, 'api_calls': dict(api.calls),
+              'rate_limited': dict(api.rate_limited)}
+
+    print(f"\n{'type':<14} {'sent':>6} {'done':>6} {'rate/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'timeouts':>9}")
+    for kind in sorted(driver.sent):
+        latencies = driver.latencies.get(kind, [])
+        row = {
+            'sent': driver.sent[kind],
+            'done': len(latencies),
+            'throughput': len(latencies) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 0.50) * 1000 if latencies else None,
+            'p99_ms': percentile(latencies, 0.99) * 1000 if latencies else None,
+            'errors': driver.errors.get(kind, 0),
+            'timeouts': outstanding.get(kind, 0),
+        }
+        report['types'][kind] = row
+        p50 = f"{row['p50_ms']:.1f}" if latencies else '-'
+        p99 = f"{row['p99_ms']:.1f}" if latencies else '-'
+        print(f"{kind:<14} {row['sent']:>6} {row['done']:>6} {row['throughput']:>8.1f} "
+              f"{p50:>9} {p99:>9} {row['errors']:>7} {row['timeouts']:>9}")
+
+    all_latencies = [value for values in driver.latencies.values() for value in values]
+    total_done = len(all_latencies)
+    total_sent = sum(driver.sent.values())
+    print(f"\nCompleted {total_done}/{total_sent} updates in {elapsed:.1f}s "
+          f"({total_done / elapsed if elapsed else 0:.1f}/s)")
+    if all_latencies:
+        print(f"Overall p50 {statistics.median(all_latencies) * 1000:.1f} ms, "
+              f"p99 {percentile(all_latencies, 0.99) * 1000:.1f} ms")
+    if api.rate_limited:
+        print(f"429 responses injected: {sum(api.rate_limited.values())} {dict(api.rate_limited)}")
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay updates against the bot through a fake Bot API.")
+    parser.add_argument('--rate', type=float, default=20.0, help="Updates per second to send")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds to send for")
+    parser.add_argument('--drain', type=float, default=10.0, help="Seconds to wait for outstanding responses")
+    parser.add_argument('--updates', help="JSONL file of recorded updates to replay instead of synthetic ones")
+    parser.add_argument('--links', type=int, default=200, help="Links to seed for view/vote/page taps")
+    parser.add_argument('--users', type=int, default=1000, help="Returning users tapping links")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Fake API latency per call")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Random extra latency per call")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="Probability of a 429 per call")
+    parser.add_argument('--retry-after', type=int, default=1, help="retry_after sent with 429s")
+    parser.add_argument('--think-time', type=float, default=0.2,
+                        help="Seconds between the steps of a link submission")
+    parser.add_argument('--threads', type=int, default=2, help="Bot worker threads")
+    parser.add_argument('--report', help="Write the report JSON here")
+    args = parser.parse_args(argv)
+
+    api = FakeBotAPI(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                     rate_limit_probability=args.rate_limit, retry_after=args.retry_after)
+    api.start()
+    apihelper.API_URL = api.api_url
+    driver = ReplayDriver(api, args.think_time)
+
+    import config
+    import main as app
+    from database import init_db, rebuild_link_url_filter
+    # The fake API accepts any token; config.BOT_TOKEN may be a placeholder that
+    # telebot rejects. Installed as config.bot so jobs and helpers use it too
+    bot = config.bot = TeleBot(FAKE_TOKEN, use_class_middlewares=True, num_threads=args.threads)
+    init_db()
+    app.setup_handlers(bot)
+    link_ids = seed_links(args.links)
+    rebuild_link_url_filter()
+
+    polling = threading.Thread(
+        target=bot.infinity_polling,
+        kwargs={'timeout': 5, 'long_polling_timeout': 1},
+        name='bot-polling',
+        daemon=True
+    )
+    polling.start()
+
+    if args.updates:
+        actions = recorded_stream(args.updates, driver)
+        emit = lambda: next(actions)()
+    else:
+        emit = SyntheticStream(driver, link_ids, args.users).emit
+
+    print(f"Sending {args.rate:g} updates/s for {args.duration:g}s to {api.address}")
+    started = monotonic()
+    interval = 1.0 / args.rate
+    next_at = started
+    while monotonic() - started < args.duration:
+        emit()
+        next_at += interval
+        delay = next_at - monotonic()
+        if delay > 0:
+            sleep(delay)
+
+    drain_until = monotonic() + args.drain
+    while driver.outstanding() and monotonic() < drain_until:
+        sleep(0.1)
+    elapsed = monotonic() - started
+
+    bot.stop_polling()
+    report = print_report(driver, api, elapsed)
+    api.stop()
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
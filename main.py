@@ -1,25 +1,59 @@
+from time import perf_counter
+_import_started = perf_counter()
+
+import config
+from typing import List, Optional
 from utils.logger import logger
-from config import bot  # Import bot instance from config
+from config import (
+    METRICS_ENABLED, METRICS_HOST, METRICS_PORT, WARM_UP_ENABLED, ROLLUP_INTERVAL_MINUTES,
+    BACKUP_ENABLED, BACKUP_INTERVAL_HOURS, MAINTENANCE_ENABLED, MAINTENANCE_HOUR,
+    CHECKPOINT_INTERVAL_MINUTES, NOTIFICATIONS_ENABLED, NOTIFY_INTERVAL_MINUTES, BOTS_FILE,
+    BOT_WORKER_THREADS
+)
 from handlers.link_handlers import register_link_handlers
 from handlers.admin_handlers import register_admin_handlers
 from handlers.user_handlers import register_user_handlers
+from handlers.inline_handlers import register_inline_handlers
 from handlers.start_handler import handle_start
+from handlers.middleware import register_middlewares
 from utils.scheduler import link_scheduler
+from database import init_db, rebuild_link_url_filter, check_database_connection, stop_writer
+from utils.metrics import MetricsServer, instrument_handlers, instrument_api_requests
+from utils.startup import StartupTimer, warm_up
+from utils.journal import journal
+from utils.rollups import run_scheduled_rollup
+from utils.backup import run_scheduled_backup
+from utils.maintenance import run_scheduled_checkpoint, run_nightly_maintenance
+from utils.tenants import load_tenants, tenant_context, for_each_tenant, per_tenant
+from utils.multibot import create_bots, poll_all, stop_all
+
+# Time spent importing the application modules above
+IMPORT_MS = (perf_counter() - _import_started) * 1000
 
+metrics_server = MetricsServer(METRICS_HOST, METRICS_PORT)
+# Set once the bot has reached Telegram and is about to poll
+bot_ready = False
 
-def setup_handlers():
-    """Set up all message handlers for the bot."""
+
+def setup_handlers(bot=None):
+    """Set up all message handlers for the bot (config.bot unless one is given)."""
+    if bot is None:
+        bot = config.bot
     try:
+        register_middlewares(bot)
+
         # Register handlers
         register_link_handlers(bot)
         register_admin_handlers(bot)
         register_user_handlers(bot)
+        register_inline_handlers(bot)
         
         # Register start handler
         @bot.message_handler(commands=['start'])
         def start(message):
             handle_start(message, bot)
         
+        instrument_handlers(bot)
         logger.info("All handlers registered successfully")
     except Exception as e:
         logger.error(f"Error setting up handlers: {str(e)}")
@@ -30,33 +64,125 @@ def setup_scheduler():
     try:
         # Default configuration: 4 times per day, keep links for 3 days
         link_scheduler.setup_schedule(runs_per_day=4, cleanup_days=3)
+        # One job serves every bot in multi-bot mode; per_tenant runs it once per bot
+        # Fold new journal events into the /stats rollups and drop the segments read by all bots
+        link_scheduler.scheduler.add_job(
+            run_scheduled_rollup, 'interval', minutes=ROLLUP_INTERVAL_MINUTES,
+            id='stats_rollup', name='stats_rollup',
+            replace_existing=True, max_instances=1, coalesce=True
+        )
+        if BACKUP_ENABLED:
+            link_scheduler.scheduler.add_job(
+                per_tenant(run_scheduled_backup), 'interval', hours=BACKUP_INTERVAL_HOURS,
+                id='backup', name='backup',
+                replace_existing=True, max_instances=1, coalesce=True
+            )
+        if MAINTENANCE_ENABLED:
+            # Keep the WAL short, and vacuum and refresh statistics at the quiet hour
+            link_scheduler.scheduler.add_job(
+                per_tenant(run_scheduled_checkpoint), 'interval', minutes=CHECKPOINT_INTERVAL_MINUTES,
+                id='wal_checkpoint', name='wal_checkpoint',
+                replace_existing=True, max_instances=1, coalesce=True
+            )
+            link_scheduler.scheduler.add_job(
+                per_tenant(run_nightly_maintenance), 'cron', hour=MAINTENANCE_HOUR, timezone='UTC',
+                id='db_maintenance', name='db_maintenance',
+                replace_existing=True, max_instances=1, coalesce=True
+            )
+        if NOTIFICATIONS_ENABLED:
+            link_scheduler.scheduler.add_job(
+                per_tenant(link_scheduler.warn_expiring_links), 'interval', minutes=NOTIFY_INTERVAL_MINUTES,
+                id='expiry_warnings', name='expiry_warnings',
+                replace_existing=True, max_instances=1, coalesce=True
+            )
         link_scheduler.start()
         logger.info("Link cleanup scheduler initialized")
     except Exception as e:
         logger.error(f"Error setting up scheduler: {str(e)}")
 
-def main():
-    """Main function to run the bot."""
+def setup_metrics():
+    """Instrument API calls and start the metrics and health endpoint."""
     try:
-        # Setup handlers
-        setup_handlers()
-        
-        # Setup and start scheduler
+        instrument_api_requests()
+        if METRICS_ENABLED:
+            metrics_server.add_readiness_check('database', check_databases)
+            metrics_server.add_readiness_check('telegram', lambda: bot_ready)
+            metrics_server.start()
+    except Exception as e:
+        logger.error(f"Error setting up metrics: {str(e)}")
+
+def check_databases() -> bool:
+    """Readiness check: the database of every hosted bot answers."""
+    results = []
+    for_each_tenant(lambda: results.append(check_database_connection()))
+    return all(results)
+
+def bootstrap(warm: bool = WARM_UP_ENABLED, bots: Optional[List] = None) -> StartupTimer:
+    """
+    Prepare everything polling needs, timing each phase: migrate the
+    database, register handlers, start metrics and the scheduler, load the
+    duplicate filter and optionally warm caches. With bots (multi-bot
+    mode) the per-bot phases run for each bot inside its tenant context.
+    """
+    hosted = [(bot.tenant, bot) for bot in bots] if bots else [(None, None)]
+    timer = StartupTimer()
+    timer.record('import', IMPORT_MS)
+    with timer.phase('database'):
+        for tenant, _ in hosted:
+            with tenant_context(tenant):
+                init_db()
+    with timer.phase('handlers'):
+        for tenant, bot in hosted:
+            with tenant_context(tenant):
+                setup_handlers(bot)
+    with timer.phase('metrics'):
+        setup_metrics()
+    with timer.phase('scheduler'):
         setup_scheduler()
-        
+    with timer.phase('duplicate_filter'):
+        # Load known links into the duplicate filter
+        for tenant, _ in hosted:
+            with tenant_context(tenant):
+                rebuild_link_url_filter()
+    if warm:
+        with timer.phase('warm_up'):
+            for tenant, _ in hosted:
+                with tenant_context(tenant):
+                    warm_up()
+    return timer
+
+def main():
+    """Main function to run the bot, or every bot in BOTS_FILE."""
+    global bot_ready
+    bots = []
+    try:
+        if BOTS_FILE:
+            bots = create_bots(load_tenants(BOTS_FILE), BOT_WORKER_THREADS)
+        timer = bootstrap(bots=bots)
+
         # Log bot information
-        bot_info = bot.get_me()
-        logger.info(f"Bot started successfully: @{bot_info.username}")
+        with timer.phase('telegram'):
+            usernames = [bot.get_me().username for bot in bots or [config.bot]]
+        logger.info(f"Bot started successfully: {', '.join('@' + name for name in usernames)}")
+        logger.info(f"Startup timings: {timer.summary()}")
+        bot_ready = True
         
         # Start the bot
         logger.info("Bot is running...")
-        bot.infinity_polling(timeout=60, long_polling_timeout=60)
+        if bots:
+            poll_all(bots, timeout=60, long_polling_timeout=60)
+        else:
+            config.bot.infinity_polling(timeout=60, long_polling_timeout=60)
     except Exception as e:
         logger.error(f"Bot crashed: {str(e)}")
         raise
     finally:
         # Ensure scheduler is stopped when bot stops
+        stop_all(bots)
         link_scheduler.stop()
+        metrics_server.stop()
+        stop_writer()
+        journal.close()
 
 if __name__ == "__main__":
     try:
@@ -1,36 +1,51 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timedelta
-from utils.logger import logger
+from typing import Optional
+from utils.logger import logger, hot_logger
+from utils.helpers import escape_markdown
+from utils.abuse import get_abuse_detector
 from .user_model import Base
 
 
 class Link(Base):
     """Link model with voting users tracking"""
     __tablename__ = "links"
+    # Kept in step with utils.migrations, which adds these to existing databases
+    __table_args__ = (Index('ix_links_user_id_submit_date', 'user_id', 'submit_date'),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String(100), nullable=False)
     url = Column(String(255), nullable=False)
+    # Normalized form of url used to reject duplicate submissions
+    canonical_url = Column(String(255), nullable=True, unique=True, index=True)
     clicks = Column(Integer, default=0)
     upvotes = Column(Integer, default=0)
     downvotes = Column(Integer, default=0)
-    submit_date = Column(DateTime, default=datetime.utcnow, nullable=False)
-    score = Column(Float, default=0.0)
+    submit_date = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    score = Column(Float, default=0.0, index=True)
+    # MarkdownV2-escaped title and url, rendered once at insert for link cards
+    title_md = Column(String(200), nullable=True)
+    url_md = Column(String(510), nullable=True)
+    # Set once the owner has been warned that the link is about to expire
+    expiry_warned_at = Column(DateTime, nullable=True)
     # Store voter IDs as comma-separated string
     voter_ids = Column(String(1000), default='')
     # Add clicker_ids column
     clicker_ids = Column(String(1000), default='')
 
     # Relationship with User
-    user_id = Column(Integer, ForeignKey('users.user_id'), nullable=False)
+    user_id = Column(BigInteger, ForeignKey('users.user_id'), nullable=False)
     user = relationship("User", back_populates="links")
 
-    def __init__(self, title: str, url: str, user_id: int):
+    def __init__(self, title: str, url: str, user_id: int, canonical_url: Optional[str] = None):
         """Initialize a new Link instance."""
         self.title = title
         self.url = url
+        self.canonical_url = canonical_url
         self.user_id = user_id
+        self.title_md = escape_markdown(title)
+        self.url_md = escape_markdown(url)
         self.submit_date = datetime.utcnow()
         self.voter_ids = ''
         self.clicker_ids = ''
@@ -103,7 +118,7 @@ class Link(Base):
         try:
             # Check if voter has already voted
             if self.has_voter_voted(voter_id):
-                logger.info(f"Voter {voter_id} has already voted on link {self.id}")
+                hot_logger.info("Voter %s has already voted on link %s", voter_id, self.id)
                 return False
 
             # Add voter ID
@@ -118,7 +133,8 @@ class Link(Base):
                 self.downvotes += 1
 
             self.calculate_score()
-            logger.info(f"Vote added for link {self.id} by voter {voter_id}")
+            get_abuse_detector().record_vote(voter_id, self.id)
+            hot_logger.info("Vote added for link %s by voter %s", self.id, voter_id)
             return True
 
         except Exception as e:
@@ -130,7 +146,7 @@ class Link(Base):
         try:
             # Check if user has already clicked
             if self.has_user_clicked(user_id):
-                logger.info(f"User {user_id} has already clicked on link {self.id}")
+                hot_logger.info("User %s has already clicked on link %s", user_id, self.id)
                 return False
 
             # Add user ID to clickers
@@ -141,7 +157,8 @@ class Link(Base):
             # Increment click counter
             self.clicks += 1
             self.calculate_score()
-            logger.info(f"Click added for link {self.id} by user {user_id}")
+            get_abuse_detector().record_click(user_id, self.id)
+            hot_logger.info("Click added for link %s by user %s", self.id, user_id)
             return True
 
         except Exception as e:
@@ -149,7 +166,9 @@ class Link(Base):
             return False
 
     def calculate_score(self) -> float:
-        """Calculate link score with a base value."""
+        """Calculate link score with a base value; frozen links keep their score."""
+        if self.id is not None and get_abuse_detector().is_frozen(self.id):
+            return self.score
         base_score = 2.0  # Default base score for every link
         self.score = (
             base_score +
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+
+class LinkRow(NamedTuple):
+    """Id, title and score of a link: all that link lists and keyboards need."""
+    id: int
+    title: str
+    score: float
+
+
+class LinkStatsRow(NamedTuple):
+    """A link without its voter and clicker id strings, for ranking and export."""
+    id: int
+    title: str
+    url: str
+    clicks: int
+    upvotes: int
+    downvotes: int
+    score: float
+    submit_date: datetime
+    user_id: int
+
+
+class UserRow(NamedTuple):
+    """A user's exportable columns."""
+    user_id: int
+    credits: int
+    referred_by: Optional[int]
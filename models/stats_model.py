@@ -0,0 +1,47 @@
+from sqlalchemy import BigInteger, Column, Date, DateTime, Index, Integer, String, Table
+from .user_model import Base
+
+# Event counts per hour (view, click, vote, submit, referral, delete)
+stats_hourly = Table(
+    'stats_hourly', Base.metadata,
+    Column('hour', DateTime, primary_key=True),
+    Column('event', String(20), primary_key=True),
+    Column('count', Integer, nullable=False),
+)
+
+# Per-link activity per hour
+stats_link_hourly = Table(
+    'stats_link_hourly', Base.metadata,
+    Column('hour', DateTime, primary_key=True),
+    Column('link_id', Integer, primary_key=True),
+    Column('views', Integer, nullable=False),
+    Column('clicks', Integer, nullable=False),
+    Column('upvotes', Integer, nullable=False),
+    Column('downvotes', Integer, nullable=False),
+    Index('ix_stats_link_hourly_link_id_hour', 'link_id', 'hour'),
+)
+
+# Users seen per day; only kept long enough to deduplicate stats_daily
+stats_daily_users = Table(
+    'stats_daily_users', Base.metadata,
+    Column('day', Date, primary_key=True),
+    Column('user_id', BigInteger, primary_key=True),
+)
+
+# Distinct active users per day
+stats_daily = Table(
+    'stats_daily', Base.metadata,
+    Column('day', Date, primary_key=True),
+    Column('active_users', Integer, nullable=False),
+)
+
+# How far into the journal each rollup has read
+rollup_checkpoints = Table(
+    'rollup_checkpoints', Base.metadata,
+    Column('name', String(100), primary_key=True),
+    Column('segment', Integer, nullable=False),
+    Column('position', BigInteger, nullable=False),
+    Column('updated_at', DateTime, nullable=False),
+)
+
+STATS_TABLES = [stats_hourly, stats_link_hourly, stats_daily_users, stats_daily, rollup_checkpoints]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer
+from sqlalchemy import BigInteger, Boolean, Column, Integer, true
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -8,9 +8,11 @@ class User(Base):
     """User model with credits and referral tracking."""
     __tablename__ = "users"
 
-    user_id = Column(Integer, primary_key=True)  # Telegram user ID
+    user_id = Column(BigInteger, primary_key=True, autoincrement=False)  # Telegram user ID
     credits = Column(Integer, default=5)  # Initial 5 credits for new users
-    referred_by = Column(Integer, nullable=True)  # Store who referred this user
+    referred_by = Column(BigInteger, nullable=True, index=True)  # Store who referred this user
+    # Expiry warnings and notices; users opt out with /notifications off
+    notifications = Column(Boolean, default=True, server_default=true(), nullable=False)
 
     # Define the relationship to Link model
     links = relationship("Link", back_populates="user")
@@ -0,0 +1,140 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Lock
+from time import monotonic
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional
+from utils.logger import logger
+from utils.metrics import ABUSE_FLAGS
+from utils.sketch import WindowedSketch
+from utils.tenants import current_tenant
+from config import (
+    ABUSE_WINDOW_SECONDS, ABUSE_USER_THRESHOLD, ABUSE_LINK_THRESHOLD, ABUSE_FREEZE_SCORING
+)
+
+
+class AbuseFlag(NamedTuple):
+    """One burst that crossed a threshold."""
+    kind: str  # 'user' or 'link'
+    key: int
+    count: int
+    window: float
+    flagged_at: datetime
+
+
+class AbuseDetector:
+    """
+    Online vote and click burst detector.
+
+    Every vote and click is counted per acting user and per target link in
+    sliding-window count-min sketches, so memory stays fixed however many
+    users and links there are. A user or link whose count in the window
+    reaches its threshold is flagged once per window: the flag is logged,
+    kept for /abuse and handed to the alert callback. When freeze_scoring
+    is on, flagged links keep their score until an admin unfreezes them.
+    """
+
+    def __init__(self, window: float = ABUSE_WINDOW_SECONDS,
+                 user_threshold: int = ABUSE_USER_THRESHOLD,
+                 link_threshold: int = ABUSE_LINK_THRESHOLD,
+                 freeze_scoring: bool = ABUSE_FREEZE_SCORING):
+        self.window = window
+        self.user_threshold = user_threshold
+        self.link_threshold = link_threshold
+        self.freeze_scoring = freeze_scoring
+        self.users = WindowedSketch(window)
+        self.links = WindowedSketch(window)
+        self.flags: Deque[AbuseFlag] = deque(maxlen=50)
+        self.frozen_links = set()
+        # Called with each new AbuseFlag, off the recording thread
+        self.on_flag: Optional[Callable[[AbuseFlag], None]] = None
+        self._flagged_until: Dict[tuple, float] = {}
+        self._lock = Lock()
+        self._alerts: Optional[ThreadPoolExecutor] = None
+
+    def record_vote(self, user_id: int, link_id: int) -> None:
+        """Count a vote by user_id on link_id."""
+        self._record(user_id, link_id)
+
+    def record_click(self, user_id: int, link_id: int) -> None:
+        """Count a first click by user_id on link_id."""
+        self._record(user_id, link_id)
+
+    def _record(self, user_id: int, link_id: int) -> None:
+        try:
+            now = monotonic()
+            user_count = self.users.add(user_id, now)
+            if user_count >= self.user_threshold:
+                self._flag('user', user_id, user_count, now)
+            if link_id is not None:
+                link_count = self.links.add(link_id, now)
+                if link_count >= self.link_threshold:
+                    self._flag('link', link_id, link_count, now)
+        except Exception as e:
+            logger.error(f"Error recording activity for abuse detection: {str(e)}")
+
+    def _flag(self, kind: str, key: int, count: int, now: float) -> None:
+        with self._lock:
+            if self._flagged_until.get((kind, key), 0) > now:
+                return
+            # Drop expired entries so the map stays as small as the flag rate
+            self._flagged_until = {k: until for k, until in self._flagged_until.items() if until > now}
+            self._flagged_until[(kind, key)] = now + self.window
+            flag = AbuseFlag(kind, key, count, self.window, datetime.utcnow())
+            self.flags.append(flag)
+            if kind == 'link' and self.freeze_scoring:
+                self.frozen_links.add(key)
+
+        ABUSE_FLAGS.inc(kind=kind)
+        logger.warning(f"Abuse flag: {kind} {key} reached {count} actions in {self.window:.0f}s")
+        if self.on_flag is not None:
+            if self._alerts is None:
+                self._alerts = ThreadPoolExecutor(max_workers=1, thread_name_prefix='abuse-alerts')
+            self._alerts.submit(self._alert, flag)
+
+    def _alert(self, flag: AbuseFlag) -> None:
+        try:
+            self.on_flag(flag)
+        except Exception as e:
+            logger.error(f"Error sending abuse alert: {str(e)}")
+
+    def is_frozen(self, link_id: int) -> bool:
+        """True while a flagged link's score must not change."""
+        return link_id in self.frozen_links
+
+    def unfreeze(self, link_id: int) -> bool:
+        """Let a link's score move again; returns False if it was not frozen."""
+        with self._lock:
+            if link_id not in self.frozen_links:
+                return False
+            self.frozen_links.discard(link_id)
+            return True
+
+    def report(self, limit: int = 5) -> Dict[str, List]:
+        """Heaviest users and links in the current window, recent flags and frozen links."""
+        return {
+            'users': self.users.top(limit),
+            'links': self.links.top(limit),
+            'flags': list(self.flags)[-limit:],
+            'frozen': sorted(self.frozen_links),
+        }
+
+
+# Global detector fed by Link.add_vote and Link.add_click
+abuse_detector = AbuseDetector()
+
+# One detector per bot in multi-bot mode, since link ids overlap between bots
+_tenant_detectors: Dict[str, AbuseDetector] = {}
+_tenant_detectors_lock = Lock()
+
+
+def get_abuse_detector() -> AbuseDetector:
+    """Return the current bot's detector; abuse_detector outside multi-bot mode."""
+    tenant = current_tenant()
+    if tenant is None:
+        return abuse_detector
+    detector = _tenant_detectors.get(tenant.name)
+    if detector is None:
+        with _tenant_detectors_lock:
+            detector = _tenant_detectors.setdefault(tenant.name, AbuseDetector())
+    return detector
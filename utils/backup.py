@@ -0,0 +1,185 @@
+"""
+Online backups of the SQLite database.
+
+Copying links.db while the bot runs is unsafe: recent commits may still
+live in the -wal file. This uses SQLite's backup API instead, a few pages
+per step with a pause between steps so writers keep getting the lock.
+Every snapshot is checked with PRAGMA integrity_check before it replaces
+anything, optionally gzip-compressed, and only the newest generations
+are kept.
+
+    python -m utils.backup
+"""
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+from datetime import datetime
+from threading import Lock
+from time import perf_counter, sleep
+from typing import List, NamedTuple, Optional
+from utils.logger import logger
+from database import get_engine
+from utils.tenants import tenant_directory
+from config import (
+    BACKUP_DIR, BACKUP_GENERATIONS, BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP_MS, BACKUP_COMPRESS
+)
+
+BACKUP_PATTERN = re.compile(r'^links-\d{8}-\d{6}\.db(\.gz)?$')
+# Times a stepped copy may restart (the source changed under it) before
+# the backup falls back to copying everything in one step
+MAX_RESTARTS = 3
+
+# One backup at a time, whether scheduled or from /backup
+_backup_lock = Lock()
+
+
+class BackupResult(NamedTuple):
+    """Summary of one backup run."""
+    path: str
+    size: int
+    pages: int
+    restarts: int
+    duration: float
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def database_path() -> Optional[str]:
+    """Return the file behind the application database, or None if it is not a SQLite file."""
+    engine = get_engine()
+    if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+        return None
+    return engine.url.database
+
+
+def _copy(source: sqlite3.Connection, destination: sqlite3.Connection,
+          pages: int, step_sleep: float) -> tuple:
+    """Run the backup API, pausing between steps; returns (total pages, restarts)."""
+    state = {'remaining': None, 'total': 0, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        # A write to the source restarts the copy, so a step makes no progress
+        if state['remaining'] is not None and remaining >= state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > MAX_RESTARTS:
+                raise _TooManyRestarts()
+        state['remaining'] = remaining
+        state['total'] = total
+        if remaining and step_sleep:
+            sleep(step_sleep)
+
+    try:
+        source.backup(destination, pages=pages, progress=progress)
+    except _TooManyRestarts:
+        logger.warning(f"Backup restarted {state['restarts']} times under writes; copying in one step")
+        source.backup(destination, pages=-1)
+    return state['total'], state['restarts']
+
+
+def _compress(path: str) -> str:
+    compressed = path + '.gz'
+    with open(path, 'rb') as raw, gzip.open(compressed + '.partial', 'wb', compresslevel=6) as output:
+        shutil.copyfileobj(raw, output, 1024 * 1024)
+    os.replace(compressed + '.partial', compressed)
+    os.remove(path)
+    return compressed
+
+
+def prune_backups(directory: str, generations: int) -> List[str]:
+    """Delete all but the newest `generations` backups; returns the removed paths."""
+    names = sorted(name for name in os.listdir(directory) if BACKUP_PATTERN.match(name))
+    removed = []
+    for name in names[:max(0, len(names) - generations)]:
+        path = os.path.join(directory, name)
+        os.remove(path)
+        removed.append(path)
+    return removed
+
+
+def backup_database(directory: str = BACKUP_DIR, generations: int = BACKUP_GENERATIONS,
+                    pages: int = BACKUP_PAGES_PER_STEP, step_sleep: float = BACKUP_STEP_SLEEP_MS / 1000,
+                    compress: bool = BACKUP_COMPRESS) -> BackupResult:
+    """
+    Take a verified snapshot of the live database.
+
+    Args:
+        directory (str): Where backups are kept; each bot gets a subdirectory in multi-bot mode
+        generations (int): Number of backups to keep
+        pages (int): Pages copied per step
+        step_sleep (float): Seconds to pause between steps
+        compress (bool): gzip the snapshot
+
+    Returns:
+        BackupResult: Where the backup went, its size and how long it took
+
+    Raises:
+        RuntimeError: The database is not a SQLite file, a backup is already
+            running, or the snapshot failed its integrity check
+    """
+    if not _backup_lock.acquire(blocking=False):
+        raise RuntimeError("A backup is already running")
+    try:
+        return _backup(tenant_directory(directory), generations, pages, step_sleep, compress)
+    finally:
+        _backup_lock.release()
+
+
+def _backup(directory: str, generations: int, pages: int, step_sleep: float, compress: bool) -> BackupResult:
+    source_path = database_path()
+    if source_path is None:
+        raise RuntimeError("Online backups need a SQLite file database; back up other servers with their own tools")
+
+    started = perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"links-{datetime.utcnow():%Y%m%d-%H%M%S}.db")
+    partial = path + '.partial'
+
+    source = sqlite3.connect(source_path)
+    destination = sqlite3.connect(partial)
+    try:
+        total_pages, restarts = _copy(source, destination, pages, step_sleep)
+        check = destination.execute("PRAGMA integrity_check").fetchone()[0]
+        if check != 'ok':
+            raise RuntimeError(f"Backup failed integrity check: {check}")
+    except Exception:
+        destination.close()
+        os.remove(partial)
+        raise
+    finally:
+        source.close()
+    destination.close()
+
+    os.replace(partial, path)
+    if compress:
+        path = _compress(path)
+    removed = prune_backups(directory, generations)
+
+    result = BackupResult(path, os.path.getsize(path), total_pages, restarts, perf_counter() - started)
+    logger.info(
+        f"Backup {os.path.basename(path)}: {result.size / 1024:.0f} KiB, {total_pages} pages, "
+        f"{restarts} restarts, {result.duration:.1f}s; pruned {len(removed)} old backups"
+    )
+    return result
+
+
+def run_scheduled_backup() -> None:
+    """Scheduler job: take a backup, logging instead of raising on failure."""
+    try:
+        backup_database()
+    except Exception as e:
+        logger.error(f"Scheduled backup failed: {str(e)}")
+
+
+def main() -> int:
+    """Command-line entry point: python -m utils.backup"""
+    result = backup_database()
+    print(f"Backed up to {result.path} ({result.size} bytes) in {result.duration:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
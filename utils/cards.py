@@ -0,0 +1,39 @@
+from utils.cache import TTLCache
+from utils.helpers import escape_markdown
+from utils.tenants import tenant_key
+
+# Seconds a rendered card stays cached; links are never edited, only deleted
+LINK_CARD_TTL = 3600
+
+# link id (with the bot's name in multi-bot mode) -> MarkdownV2 card text up to the view counter
+link_cards = TTLCache(ttl=LINK_CARD_TTL, max_size=4096)
+
+
+def card_head(title_md: str, url_md: str) -> str:
+    """The fixed part of a link detail card, from the pre-escaped title and URL."""
+    return f"*{title_md}*\n\n🔗 `{url_md}`\n👀 "
+
+
+def render_link_card(link) -> str:
+    """
+    Build the MarkdownV2 detail text for a link. The escaped part comes from
+    the card cache; only the view counter is filled in per call.
+
+    Args:
+        link: Link entity (or any object with id, title, url, title_md, url_md and clicks)
+
+    Returns:
+        str: Message text for parse_mode="MarkdownV2"
+    """
+    key = tenant_key(link.id)
+    head = link_cards.get(key)
+    if head is None:
+        head = card_head(link.title_md or escape_markdown(link.title),
+                         link.url_md or escape_markdown(link.url))
+        link_cards.set(key, head)
+    return f"{head}{link.clicks} views\n"
+
+
+def forget_link_card(link_id: int) -> None:
+    """Drop a deleted link's card; SQLite may hand its id to a new link."""
+    link_cards.pop(tenant_key(link_id))
@@ -0,0 +1,171 @@
+import re
+import json
+import os
+from threading import Lock
+from time import monotonic
+from typing import Dict, List, NamedTuple, Optional, Pattern, Tuple
+from utils.logger import logger
+from config import FILTER_RULES_PATH
+
+# Words are matched on \w+ tokens, the same boundaries `\b` uses in the rule patterns
+_TOKEN_RE = re.compile(r'\w+')
+
+
+class FilterMatch(NamedTuple):
+    """A rule hit reported by the content filter."""
+    rule_id: str
+    category: str
+    message: str
+    matched: str
+
+
+class _CompiledCategory:
+    """All rules of one category compiled into lookup tables and a single regex."""
+    __slots__ = ('words', 'exact', 'max_phrase', 'regex', 'regex_rules')
+
+    def __init__(self, rules: List[dict], category: str):
+        # word / phrase -> (rule_id, message)
+        self.words: Dict[str, Tuple[str, str]] = {}
+        self.exact: Dict[str, Tuple[str, str]] = {}
+        self.max_phrase = 0
+        # group name -> (rule_id, message)
+        self.regex_rules: Dict[str, Tuple[str, str]] = {}
+        alternatives = []
+
+        for index, rule in enumerate(rules):
+            rule_id = rule.get('id') or f"{category}_{index}"
+            info = (rule_id, rule.get('message', rule_id))
+
+            for word in rule.get('words', []):
+                tokens = _TOKEN_RE.findall(word.lower())
+                if tokens:
+                    self.words.setdefault(' '.join(tokens), info)
+                    self.max_phrase = max(self.max_phrase, len(tokens))
+
+            for word in rule.get('exact', []):
+                self.exact.setdefault(word.strip().lower(), info)
+
+            if rule.get('pattern'):
+                # Validate each pattern on its own so a bad rule points at itself
+                re.compile(rule['pattern'])
+                group = f"r{index}"
+                self.regex_rules[group] = info
+                alternatives.append(f"(?P<{group}>{rule['pattern']})")
+
+        self.regex: Optional[Pattern] = (
+            re.compile('|'.join(alternatives), re.IGNORECASE) if alternatives else None
+        )
+
+    def match(self, text: str, category: str) -> Optional[FilterMatch]:
+        """Return the first rule hit in text, if any."""
+        lowered = text.strip().lower()
+
+        info = self.exact.get(lowered)
+        if info:
+            return FilterMatch(info[0], category, info[1], lowered)
+
+        if self.words:
+            tokens = _TOKEN_RE.findall(lowered)
+            for start in range(len(tokens)):
+                for size in range(1, min(self.max_phrase, len(tokens) - start) + 1):
+                    phrase = ' '.join(tokens[start:start + size])
+                    info = self.words.get(phrase)
+                    if info:
+                        return FilterMatch(info[0], category, info[1], phrase)
+
+        if self.regex is not None:
+            found = self.regex.search(text)
+            if found:
+                info = self.regex_rules[found.lastgroup]
+                return FilterMatch(info[0], category, info[1], found.group())
+
+        return None
+
+
+class ContentFilter:
+    """
+    Rule-driven content filter for titles, group links and messages.
+
+    Rules are loaded from a JSON file and compiled per category into word
+    tables and one combined regex, so a check costs the same whether the
+    file holds ten rules or thousands. The file is first read on the first
+    check and re-read when it changes.
+    """
+
+    def __init__(self, rules_path: str, reload_interval: float = 5.0):
+        self.rules_path = rules_path
+        self.reload_interval = reload_interval
+        self._categories: Dict[str, _CompiledCategory] = {}
+        self._mtime: Optional[float] = None
+        # Not 0.0: monotonic() may itself be under reload_interval right after boot
+        self._last_check = float('-inf')
+        self._lock = Lock()
+
+    def load(self) -> bool:
+        """
+        Load and compile the rules file.
+
+        Returns:
+            bool: True if the rules were (re)loaded, False if the previous
+                  rules were kept because the file could not be used
+        """
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.rules_path)
+                with open(self.rules_path, encoding='utf-8') as rules_file:
+                    data = json.load(rules_file)
+
+                categories = {
+                    name: _CompiledCategory(rules, name)
+                    for name, rules in data.get('categories', {}).items()
+                }
+
+                # Swap in one assignment so readers never see a half-built set
+                self._categories = categories
+                self._mtime = mtime
+                rule_count = sum(len(rules) for rules in data.get('categories', {}).values())
+                logger.info(f"Loaded {rule_count} filter rules from {self.rules_path}")
+                return True
+            except (OSError, ValueError, re.error) as e:
+                logger.error(f"Error loading filter rules from {self.rules_path}: {str(e)}")
+                return False
+            finally:
+                self._last_check = monotonic()
+
+    def _reload_if_changed(self) -> None:
+        """Load the rules file on first use and reload it when it changes."""
+        now = monotonic()
+        if now - self._last_check < self.reload_interval:
+            return
+        self._last_check = now
+        if self._mtime is None:
+            self.load()
+            return
+        try:
+            mtime = os.path.getmtime(self.rules_path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            logger.info("Filter rules changed on disk, reloading")
+            self.load()
+
+    def check(self, category: str, text: str) -> Optional[FilterMatch]:
+        """
+        Check text against every rule of a category.
+
+        Args:
+            category (str): Rule category, e.g. 'title' or 'url'
+            text (str): Text to check
+
+        Returns:
+            Optional[FilterMatch]: The rule that matched, or None if text is clean
+        """
+        self._reload_if_changed()
+        compiled = self._categories.get(category)
+        if compiled is None or not text:
+            return None
+        return compiled.match(text, category)
+
+
+# Create global content filter instance
+content_filter = ContentFilter(FILTER_RULES_PATH)
@@ -0,0 +1,108 @@
+import csv
+import gzip
+import json
+import os
+import argparse
+import shutil
+import tempfile
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+from utils.logger import logger
+from models.read_models import LinkStatsRow, UserRow
+import database
+
+DEFAULT_BATCH_SIZE = 1000
+
+# What can be exported: column names and the streaming row source
+EXPORTS: Dict[str, Tuple[Tuple[str, ...], Callable[..., Iterator[NamedTuple]]]] = {
+    'links': (LinkStatsRow._fields, database.iter_link_stats),
+    'users': (UserRow._fields, database.iter_user_rows),
+}
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+
+class ExportResult(NamedTuple):
+    """Summary of an export run."""
+    path: str
+    rows: int
+    size: int
+    duration: float
+
+
+def write_rows(output: TextIO, kind: str, fmt: str, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Stream every row of one table to output as CSV (with a header) or JSONL.
+    Rows are fetched batch_size at a time, so memory use does not grow with
+    the table.
+
+    Returns:
+        int: Number of rows written
+    """
+    columns, source = EXPORTS[kind]
+    count = 0
+    with database.get_read_session() as session:
+        if fmt == 'csv':
+            writer = csv.writer(output)
+            writer.writerow(columns)
+            for row in source(session, batch_size):
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in source(session, batch_size):
+                output.write(json.dumps(row._asdict(), separators=(',', ':'), default=str))
+                output.write('\n')
+                count += 1
+    return count
+
+
+def export_to_file(kind: str, fmt: str, batch_size: int = DEFAULT_BATCH_SIZE) -> ExportResult:
+    """
+    Export one table into a gzip-compressed temporary file. The caller
+    owns the file and must remove it.
+
+    Args:
+        kind (str): 'links' or 'users'
+        fmt (str): 'csv' or 'jsonl'
+        batch_size (int): Rows fetched per round trip
+
+    Returns:
+        ExportResult: Path, row count, compressed size and duration
+    """
+    started = perf_counter()
+    handle, path = tempfile.mkstemp(prefix=f'lpb-{kind}-', suffix=f'.{fmt}.gz')
+    os.close(handle)
+    try:
+        with gzip.open(path, 'wt', encoding='utf-8', newline='', compresslevel=6) as output:
+            rows = write_rows(output, kind, fmt, batch_size)
+    except Exception:
+        os.remove(path)
+        raise
+
+    result = ExportResult(path, rows, os.path.getsize(path), perf_counter() - started)
+    logger.info(
+        f"Exported {rows} {kind} as {fmt} in {result.duration:.1f}s "
+        f"({result.size / 1024:.0f} KiB compressed)"
+    )
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point: python -m utils.exporter links|users [--format] [--output]"""
+    parser = argparse.ArgumentParser(description="Export links or users as gzip-compressed CSV or JSONL.")
+    parser.add_argument('kind', choices=sorted(EXPORTS))
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    parser.add_argument('--output', help="Destination file (default: a temporary file)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    result = export_to_file(args.kind, args.format, args.batch_size)
+    path = result.path
+    if args.output:
+        shutil.move(result.path, args.output)
+        path = args.output
+    print(f"Exported {result.rows} {args.kind} to {path} in {result.duration:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
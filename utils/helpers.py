@@ -1,14 +1,14 @@
 import re
-from utils.logger import logger
+from utils.logger import logger, hot_logger
 from functools import wraps
 from time import time
 from typing import Callable, Any, Dict, Optional
 from datetime import datetime, timedelta
-from config import ADMINS
+from utils.tenants import admin_ids
 
 def is_admin(user_id: int) -> bool:
     """
-    Check if a user is an admin with additional logging.
+    Check if a user is an admin of the current bot, with additional logging.
 
     Args:
         user_id (int): The user's Telegram ID
@@ -17,9 +17,9 @@ def is_admin(user_id: int) -> bool:
         bool: True if user is admin, False otherwise
     """
     try:
-        admin_status = user_id in ADMINS
+        admin_status = user_id in admin_ids()
         if admin_status:
-            logger.info(f"Admin action performed by user {user_id}")
+            hot_logger.info("Admin action performed by user %s", user_id)
         return admin_status
     except Exception as e:
         logger.error(f"Error checking admin status: {str(e)}")
@@ -177,7 +177,8 @@ def validate_username(username: str) -> bool:
 
 def escape_markdown(text: str) -> str:
     """
-    Escape special characters for Markdown formatting.
+    Escape special characters for MarkdownV2 formatting. The result is
+    safe both in plain text and inside `code` entities.
 
     Args:
         text (str): Text to escape
@@ -186,7 +187,7 @@ def escape_markdown(text: str) -> str:
         str: Escaped text
     """
     try:
-        escape_chars = r'_*[]()~`>#+-=|{}.!'
+        escape_chars = '\\_*[]()~`>#+-=|{}.!'
         return ''.join(f'\\{c}' if c in escape_chars else c for c in text)
     except Exception as e:
         logger.error(f"Error escaping markdown: {str(e)}")
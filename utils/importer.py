@@ -0,0 +1,261 @@
+import csv
+import json
+import argparse
+from datetime import datetime
+from time import perf_counter
+from typing import Dict, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+from sqlalchemy.exc import IntegrityError
+from utils.logger import logger
+from utils.helpers import escape_markdown
+from models.link_model import Link
+from handlers.validation import is_valid_title, is_valid_group_link, canonicalize_group_link
+import database
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Header written at the top of every reject report
+REJECT_REPORT_HEADER = ['line', 'title', 'url', 'reason']
+
+
+class ImportResult(NamedTuple):
+    """Summary of a bulk import run."""
+    total: int
+    imported: int
+    rejected: int
+    duration: float
+
+
+def detect_format(filename: str) -> str:
+    """Guess the import format from a file name, defaulting to CSV."""
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    Stream (line_number, row) pairs from a CSV or JSONL file.
+    CSV files need a header with 'title' and 'url' columns.
+    Malformed JSON lines are yielded with an '_error' key.
+    """
+    if fmt == 'jsonl':
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError("expected a JSON object")
+                yield line_no, row
+            except ValueError as e:
+                yield line_no, {'_error': f"Malformed JSON: {str(e)}"}
+        return
+
+    reader = csv.DictReader(stream)
+    for row in reader:
+        # DictReader counts the header, so line_num is the physical line
+        yield reader.line_num, row
+
+
+def _text_field(row: Dict, name: str) -> Tuple[str, Optional[str]]:
+    """
+    Read a text column of a row, stripped. JSONL values may be numbers,
+    lists or objects; those come back as their str() with an error.
+
+    Returns:
+        Tuple[str, Optional[str]]: The value and an error message, if any
+    """
+    value = row.get(name)
+    if value is None:
+        return '', None
+    if not isinstance(value, str):
+        return str(value), f"expected text, got {type(value).__name__}"
+    return value.strip(), None
+
+
+def import_links(stream: TextIO, fmt: str, user_id: int,
+                 reject_writer: Optional[TextIO] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> ImportResult:
+    """
+    Import links from a CSV/JSONL stream in batched transactions.
+
+    Every row goes through the same title, link and duplicate checks as a
+    manual submission. Memory use is bounded by the batch size.
+
+    Args:
+        stream (TextIO): Open text stream with the rows
+        fmt (str): 'csv' or 'jsonl'
+        user_id (int): Owner recorded for the imported links
+        reject_writer (Optional[TextIO]): Where to write the per-row reject report
+        batch_size (int): Rows per insert transaction
+
+    Returns:
+        ImportResult: Counts and duration of the run
+    """
+    started = perf_counter()
+    database.ensure_user(user_id)
+    report = csv.writer(reject_writer) if reject_writer is not None else None
+    if report:
+        report.writerow(REJECT_REPORT_HEADER)
+
+    total = imported = rejected = 0
+    batch: List[Tuple[int, Dict]] = []
+
+    def reject(line_no: int, title: str, url: str, reason: str) -> None:
+        nonlocal rejected
+        rejected += 1
+        if report:
+            report.writerow([line_no, title, url, reason])
+
+    def flush() -> None:
+        nonlocal imported
+        if batch:
+            stored, duplicates = _insert_batch(batch, user_id)
+            imported += stored
+            for line_no, row in duplicates:
+                reject(line_no, row['title'], row['url'], "Duplicate link")
+            batch.clear()
+
+    seen_in_batch = set()
+    for line_no, row in read_rows(stream, fmt):
+        total += 1
+        if '_error' in row:
+            reject(line_no, '', '', row['_error'])
+            continue
+
+        title, title_type_error = _text_field(row, 'title')
+        url, url_type_error = _text_field(row, 'url')
+        if title_type_error:
+            reject(line_no, title, url, f"Invalid title: {title_type_error}")
+            continue
+        if url_type_error:
+            reject(line_no, title, url, f"Invalid link: {url_type_error}")
+            continue
+
+        title_valid, title_error = is_valid_title(title)
+        if not title_valid:
+            reject(line_no, title, url, f"Invalid title: {title_error}")
+            continue
+
+        url_valid, url_error = is_valid_group_link(url)
+        if not url_valid:
+            reject(line_no, title, url, f"Invalid link: {url_error}")
+            continue
+
+        canonical_url = canonicalize_group_link(url)
+        if canonical_url in seen_in_batch:
+            reject(line_no, title, url, "Duplicate link")
+            continue
+        seen_in_batch.add(canonical_url)
+
+        batch.append((line_no, {'title': title, 'url': url, 'canonical_url': canonical_url}))
+        if len(batch) >= batch_size:
+            flush()
+            seen_in_batch.clear()
+
+    flush()
+
+    result = ImportResult(total, imported, rejected, perf_counter() - started)
+    logger.info(
+        f"Bulk import finished: {result.imported} imported, {result.rejected} rejected "
+        f"of {result.total} rows in {result.duration:.2f}s"
+    )
+    return result
+
+
+def _insert_batch(batch: List[Tuple[int, Dict]], user_id: int) -> Tuple[int, List[Tuple[int, Dict]]]:
+    """
+    Insert one batch of validated rows in a single transaction.
+
+    Returns:
+        Tuple[int, List]: Number of rows stored and the rows rejected as duplicates
+    """
+    def store(session):
+        # Only URLs the Bloom filter might know need a database lookup
+        maybe_known = [
+            row['canonical_url'] for _, row in batch
+            if row['canonical_url'] in database.link_url_filter
+        ]
+        existing = set()
+        if maybe_known:
+            existing = {
+                canonical_url for (canonical_url,) in
+                session.query(Link.canonical_url).filter(Link.canonical_url.in_(maybe_known))
+            }
+
+        duplicates = [(line_no, row) for line_no, row in batch if row['canonical_url'] in existing]
+        fresh = [row for _, row in batch if row['canonical_url'] not in existing]
+        if not fresh:
+            return [], duplicates
+
+        now = datetime.utcnow()
+        values = [
+            {
+                'title': row['title'],
+                'url': row['url'],
+                'canonical_url': row['canonical_url'],
+                'title_md': escape_markdown(row['title']),
+                'url_md': escape_markdown(row['url']),
+                'user_id': user_id,
+                'submit_date': now,
+                'clicks': 0,
+                'upvotes': 0,
+                'downvotes': 0,
+                'score': 2.0,  # Same base score Link.calculate_score gives a new link
+                'voter_ids': '',
+                'clicker_ids': '',
+            }
+            for row in fresh
+        ]
+
+        try:
+            with session.begin_nested():
+                session.execute(Link.__table__.insert(), values)
+        except IntegrityError:
+            # A concurrent submission won the race; fall back to row-by-row inserts
+            values_by_url = {value['canonical_url']: value for value in values}
+            stored_values = []
+            for line_no, row in batch:
+                value = values_by_url.get(row['canonical_url'])
+                if value is None:
+                    continue
+                try:
+                    with session.begin_nested():
+                        session.execute(Link.__table__.insert(), [value])
+                    stored_values.append(value)
+                except IntegrityError:
+                    duplicates.append((line_no, row))
+            values = stored_values
+        return values, duplicates
+
+    values, duplicates = database.run_write(store)
+    for value in values:
+        database.remember_link_url(value['canonical_url'])
+    return len(values), duplicates
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point: python -m utils.importer links.csv --user-id 123"""
+    parser = argparse.ArgumentParser(description="Bulk import links from a CSV or JSONL file.")
+    parser.add_argument('path', help="CSV (title,url header) or JSONL file to import")
+    parser.add_argument('--user-id', type=int, required=True, help="Owner of the imported links")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="Input format (default: from extension)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--rejects', default='import_rejects.csv', help="Where to write the reject report")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+    database.init_db()
+    database.rebuild_link_url_filter()
+    with open(args.path, encoding='utf-8', newline='') as source, \
+            open(args.rejects, 'w', encoding='utf-8', newline='') as rejects:
+        result = import_links(source, fmt, args.user_id, rejects, args.batch_size)
+
+    print(
+        f"Imported {result.imported} of {result.total} rows in {result.duration:.2f}s "
+        f"({result.rejected} rejected, see {args.rejects})"
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,249 @@
+"""
+Append-only journal of user interaction events.
+
+Events are compact JSON lines ({"t": unix time, "e": type, ...fields})
+appended to numbered segment files (events-000001.jsonl, ...). Handlers
+only add events to an in-memory buffer; a background thread writes the
+buffer out every flush interval and fsyncs at most once per fsync
+interval, so a crash loses at most that much. A segment is closed once it
+passes the size limit, and every start opens a new segment, so a line
+torn by a crash can only be the last line of a segment.
+
+Old segments are deleted by delete_segments once the stats rollups have
+read them (see utils/rollups.py). Readers walk the segments lazily and
+never touch the database:
+
+    for event in iter_events("journal", types={"vote"}):
+        ...
+"""
+import json
+import os
+import re
+import threading
+from time import monotonic, time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from utils.logger import logger
+from utils.tenants import current_tenant
+from config import (
+    JOURNAL_ENABLED, JOURNAL_DIR, JOURNAL_SEGMENT_BYTES,
+    JOURNAL_FLUSH_INTERVAL_MS, JOURNAL_FSYNC_INTERVAL_MS
+)
+
+SEGMENT_PATTERN = re.compile(r'^events-(\d{6})\.jsonl$')
+# Event types written by the handlers
+EVENT_TYPES = ('view', 'vote', 'click', 'submit', 'referral', 'delete')
+
+
+class JournalPosition(NamedTuple):
+    """A point in the journal: byte offset within a segment."""
+    segment: int
+    offset: int
+
+
+def segment_name(number: int) -> str:
+    return f"events-{number:06d}.jsonl"
+
+
+def list_segments(directory: str) -> List[int]:
+    """Return the segment numbers in directory, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    numbers = []
+    for name in os.listdir(directory):
+        match = SEGMENT_PATTERN.match(name)
+        if match:
+            numbers.append(int(match.group(1)))
+    return sorted(numbers)
+
+
+def delete_segments(directory: str, before: int, keep: int) -> List[int]:
+    """
+    Delete the segments numbered below before, always keeping the newest
+    keep segments (and so the one being written).
+
+    Returns:
+        List[int]: Numbers of the deleted segments
+    """
+    numbers = list_segments(directory)
+    deleted = []
+    for number in numbers[:max(0, len(numbers) - max(1, keep))]:
+        if number >= before:
+            break
+        try:
+            os.remove(os.path.join(directory, segment_name(number)))
+            deleted.append(number)
+        except OSError as e:
+            logger.error(f"Error deleting journal segment {segment_name(number)}: {str(e)}")
+    return deleted
+
+
+class EventJournal:
+    """Buffered, batched-fsync writer for the event journal."""
+
+    def __init__(self, directory: str, segment_bytes: int = 16 * 1024 * 1024,
+                 flush_interval: float = 0.2, fsync_interval: float = 1.0, enabled: bool = True):
+        """
+        Args:
+            directory (str): Where segment files live
+            segment_bytes (int): Size after which a new segment is started
+            flush_interval (float): Seconds between buffer writes
+            fsync_interval (float): Minimum seconds between fsyncs
+            enabled (bool): When False, append() drops events
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.enabled = enabled
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        # Serializes file writes between the writer thread and explicit flushes
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        self._segment = 0
+        self._size = 0
+        self._last_fsync = 0.0
+
+    def append(self, event_type: str, **fields) -> None:
+        """Queue one event; it reaches disk on the next flush."""
+        if not self.enabled:
+            return
+        try:
+            record = {'t': round(time(), 3), 'e': event_type}
+            tenant = current_tenant()
+            if tenant is not None:
+                # Bots share one journal in multi-bot mode; rollups split it by bot
+                record['bot'] = tenant.name
+            record.update(fields)
+            line = json.dumps(record, separators=(',', ':'), default=str) + '\n'
+            with self._lock:
+                self._buffer.append(line)
+            self._ensure_started()
+        except Exception as e:
+            logger.error(f"Error journaling {event_type} event: {str(e)}")
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='journal-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _open_segment(self) -> None:
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        existing = list_segments(self.directory)
+        self._segment = (existing[-1] if existing else 0) + 1
+        self._file = open(os.path.join(self.directory, segment_name(self._segment)), 'ab')
+        self._size = 0
+        logger.info(f"Journal segment {segment_name(self._segment)} opened")
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_fsync = monotonic()
+
+    def flush(self, sync: bool = False) -> int:
+        """
+        Write buffered events to the current segment.
+
+        Args:
+            sync (bool): fsync now instead of waiting for the fsync interval
+
+        Returns:
+            int: Number of events written
+        """
+        with self._write_lock:
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+            try:
+                if not lines:
+                    if sync and self._file is not None:
+                        self._sync()
+                    return 0
+                if self._file is None or self._size >= self.segment_bytes:
+                    self._open_segment()
+                data = ''.join(lines).encode('utf-8')
+                self._file.write(data)
+                self._size += len(data)
+                if sync or monotonic() - self._last_fsync >= self.fsync_interval:
+                    self._sync()
+                return len(lines)
+            except Exception as e:
+                logger.error(f"Error writing {len(lines)} journal events: {str(e)}")
+                return 0
+
+    def close(self) -> None:
+        """Flush and fsync everything buffered, then stop the writer thread."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+        self.flush(sync=True)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_events(directory: str, start: Optional[JournalPosition] = None,
+                types: Optional[Iterable[str]] = None) -> Iterator[Tuple[JournalPosition, Dict]]:
+    """
+    Lazily yield (position after the event, event) from start onwards.
+
+    Only complete lines are read, so an event still being written is left
+    for the next call; resuming from the last yielded position never skips
+    or repeats an event.
+
+    Args:
+        directory (str): Journal directory
+        start (Optional[JournalPosition]): Where to resume (default: the beginning)
+        types (Optional[Iterable[str]]): Event types to yield (default: all)
+    """
+    wanted = set(types) if types else None
+    for number in list_segments(directory):
+        if start is not None and number < start.segment:
+            continue
+        offset = start.offset if start is not None and number == start.segment else 0
+        with open(os.path.join(directory, segment_name(number)), 'rb') as segment:
+            segment.seek(offset)
+            for line in segment:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping unreadable journal line in {segment_name(number)}")
+                    continue
+                if wanted is None or event.get('e') in wanted:
+                    yield JournalPosition(number, offset), event
+
+
+def iter_events(directory: str = JOURNAL_DIR, types: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+    """Lazily yield every journaled event, oldest first."""
+    for _, event in read_events(directory, types=types):
+        yield event
+
+
+# Global journal the handlers append to
+journal = EventJournal(
+    JOURNAL_DIR,
+    segment_bytes=JOURNAL_SEGMENT_BYTES,
+    flush_interval=JOURNAL_FLUSH_INTERVAL_MS / 1000,
+    fsync_interval=JOURNAL_FSYNC_INTERVAL_MS / 1000,
+    enabled=JOURNAL_ENABLED
+)
@@ -1,25 +1,111 @@
+import atexit
+import json
 import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from threading import Lock
+from time import monotonic
+from typing import Dict, Tuple
+from config import LOG_FORMAT, LOG_LEVELS, LOG_SAMPLE_RATE, LOG_SAMPLE_INTERVAL
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_STANDARD_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most `rate` records per message template every `interval`
+    seconds. The first record after a window reports how many were dropped.
+    """
+
+    def __init__(self, rate: int, interval: float):
+        super().__init__()
+        self.rate = rate
+        self.interval = interval
+        # (logger, template) -> (window_start, passed, suppressed)
+        self._windows: Dict[Tuple[str, str], list] = {}
+        self._lock = Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, str(record.msg))
+        now = monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} [{suppressed} similar messages suppressed]"
+                return True
+            if window[1] < self.rate:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+def _build_formatter() -> logging.Formatter:
+    if LOG_FORMAT == 'json':
+        return JsonFormatter()
+    return logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
 
 def setup_logger(name='LPB'):
     """
-    Set up a simple console-only logger
+    Set up the application logger.
+    Records are handed to a queue and written by a background listener
+    thread, so handlers never block on console I/O.
     """
+    global _listener
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    
-    # Console handler only
+    if _listener is not None:
+        return logger
+
+    # Console output happens on the listener thread
     console_handler = logging.StreamHandler()
-    
-    # Create formatter and add it to handler
-    log_format = logging.Formatter(
-        '%(asctime)s - %(levelname)s - %(message)s'
-    )
-    console_handler.setFormatter(log_format)
-    
-    # Add handler to the logger
-    logger.addHandler(console_handler)
-    
+    console_handler.setFormatter(_build_formatter())
+
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    logger.propagate = False
+
+    _listener = QueueListener(log_queue, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    for logger_name, level in LOG_LEVELS.items():
+        logging.getLogger(logger_name).setLevel(level)
+    if name not in LOG_LEVELS:
+        logger.setLevel(logging.INFO)
+
+    # Per-update messages are sampled so bursts cannot flood the output
+    logging.getLogger(f'{name}.hot').addFilter(RateLimitFilter(LOG_SAMPLE_RATE, LOG_SAMPLE_INTERVAL))
+
     return logger
 
 # Create main logger instance
-logger = setup_logger()
\ No newline at end of file
+logger = setup_logger()
+# Logger for messages emitted on every update; use lazy %-style arguments
+hot_logger = logging.getLogger('LPB.hot')
@@ -0,0 +1,223 @@
+"""
+Scheduled SQLite maintenance.
+
+Expired links are deleted every few hours, which leaves free pages inside
+links.db, and under steady traffic the -wal file only grows. These jobs
+keep both in check: a WAL checkpoint in TRUNCATE mode, an incremental
+vacuum that frees a bounded number of pages per run (the database is
+switched to auto_vacuum=INCREMENTAL by migration 7), and PRAGMA optimize /
+ANALYZE so the query planner works from current statistics. Every task
+records its duration and the bytes it gave back to the filesystem.
+
+    python -m utils.maintenance checkpoint|vacuum|optimize|analyze|all
+"""
+import argparse
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from threading import Lock
+from time import perf_counter, sleep
+from typing import List, NamedTuple, Optional
+from sqlalchemy import text
+from utils.logger import logger
+from utils.metrics import DB_MAINTENANCE_DURATION, DB_MAINTENANCE_RECLAIMED
+from database import get_engine
+from config import MAINTENANCE_ANALYZE_DAY, VACUUM_MAX_PAGES, VACUUM_STEP_PAGES
+
+# Pause between incremental vacuum steps so queued writes get the lock
+VACUUM_STEP_SLEEP = 0.05
+# Rows sampled per index by PRAGMA optimize; keeps it fast on large tables
+ANALYSIS_LIMIT = 1000
+
+# One maintenance task at a time
+_maintenance_lock = Lock()
+
+
+class MaintenanceResult(NamedTuple):
+    """Outcome of one maintenance task."""
+    task: str
+    duration: float
+    reclaimed: int
+
+
+def _sqlite_engine():
+    """Return the application engine if it is a SQLite database, else None."""
+    engine = get_engine()
+    return engine if engine.dialect.name == 'sqlite' else None
+
+
+def _file_size(path: Optional[str]) -> int:
+    try:
+        return os.path.getsize(path) if path else 0
+    except OSError:
+        return 0
+
+
+@contextmanager
+def _connection(engine):
+    """An autocommit connection: VACUUM and wal_checkpoint cannot run inside a transaction."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        yield connection
+
+
+def _record(task: str, started: float, reclaimed: int) -> MaintenanceResult:
+    result = MaintenanceResult(task, perf_counter() - started, max(0, reclaimed))
+    DB_MAINTENANCE_DURATION.observe(result.duration, task=task)
+    DB_MAINTENANCE_RECLAIMED.inc(result.reclaimed, task=task)
+    logger.info(
+        f"Maintenance {task} finished in {result.duration * 1000:.0f} ms, "
+        f"reclaimed {result.reclaimed / 1024:.0f} KiB"
+    )
+    return result
+
+
+def checkpoint_wal() -> Optional[MaintenanceResult]:
+    """
+    Copy the WAL back into the database file and truncate it to zero bytes.
+    Gives up without truncating if readers still need the log.
+
+    Returns:
+        Optional[MaintenanceResult]: None unless the database is a SQLite file
+    """
+    engine = _sqlite_engine()
+    if engine is None or engine.url.database in (None, '', ':memory:'):
+        return None
+
+    wal_path = engine.url.database + '-wal'
+    started = perf_counter()
+    before = _file_size(wal_path)
+    with _connection(engine) as connection:
+        busy, log_frames, checkpointed = connection.execute(text("PRAGMA wal_checkpoint(TRUNCATE)")).one()
+    if busy:
+        logger.warning(f"WAL checkpoint blocked by readers: {checkpointed} of {log_frames} frames copied")
+    return _record('wal_checkpoint', started, before - _file_size(wal_path))
+
+
+def incremental_vacuum(max_pages: int = VACUUM_MAX_PAGES,
+                       step_pages: int = VACUUM_STEP_PAGES) -> Optional[MaintenanceResult]:
+    """
+    Return up to max_pages free pages to the filesystem, step_pages at a
+    time with a pause between steps so writers are never held up for long.
+
+    Args:
+        max_pages (int): Most pages freed in this run
+        step_pages (int): Pages freed per write transaction
+
+    Returns:
+        Optional[MaintenanceResult]: None unless the database is SQLite in
+            auto_vacuum=INCREMENTAL mode
+    """
+    engine = _sqlite_engine()
+    if engine is None:
+        return None
+
+    started = perf_counter()
+    with _connection(engine) as connection:
+        # 2 is INCREMENTAL; in other modes incremental_vacuum does nothing
+        if connection.execute(text("PRAGMA auto_vacuum")).scalar() != 2:
+            logger.warning("Skipping incremental vacuum: auto_vacuum is not INCREMENTAL")
+            return None
+
+        page_size = connection.execute(text("PRAGMA page_size")).scalar()
+        pages_before = connection.execute(text("PRAGMA page_count")).scalar()
+        freed = 0
+        while freed < max_pages:
+            free_pages = connection.execute(text("PRAGMA freelist_count")).scalar()
+            if not free_pages:
+                break
+            step = min(step_pages, max_pages - freed, free_pages)
+            # sqlite3's execute() steps this pragma only once, freeing a single
+            # page; executescript() runs it to completion
+            connection.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({int(step)});")
+            freed += step
+            sleep(VACUUM_STEP_SLEEP)
+        pages_after = connection.execute(text("PRAGMA page_count")).scalar()
+
+    return _record('incremental_vacuum', started, (pages_before - pages_after) * page_size)
+
+
+def optimize(full: bool = False) -> Optional[MaintenanceResult]:
+    """
+    Refresh the query planner's statistics.
+
+    Args:
+        full (bool): Run a full ANALYZE of every table and index instead of
+            PRAGMA optimize, which only analyzes what looks stale
+
+    Returns:
+        Optional[MaintenanceResult]: None unless the database is SQLite
+    """
+    engine = _sqlite_engine()
+    if engine is None:
+        return None
+
+    started = perf_counter()
+    with _connection(engine) as connection:
+        if full:
+            connection.execute(text("ANALYZE"))
+        else:
+            connection.execute(text(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}"))
+            connection.execute(text("PRAGMA optimize"))
+    return _record('analyze' if full else 'optimize', started, 0)
+
+
+TASKS = {
+    'checkpoint': checkpoint_wal,
+    'vacuum': incremental_vacuum,
+    'optimize': optimize,
+    'analyze': lambda: optimize(full=True),
+}
+
+
+def run_maintenance(tasks: List[str]) -> List[MaintenanceResult]:
+    """
+    Run the named tasks in order, skipping the rest if another run holds the lock.
+
+    Returns:
+        List[MaintenanceResult]: Results of the tasks that ran
+    """
+    if not _maintenance_lock.acquire(blocking=False):
+        logger.warning(f"Skipping maintenance {', '.join(tasks)}: another task is running")
+        return []
+    try:
+        results = []
+        for name in tasks:
+            try:
+                result = TASKS[name]()
+                if result is not None:
+                    results.append(result)
+            except Exception as e:
+                logger.error(f"Error during maintenance {name}: {str(e)}")
+        return results
+    finally:
+        _maintenance_lock.release()
+
+
+def run_scheduled_checkpoint() -> None:
+    """Scheduler job: truncate the WAL."""
+    run_maintenance(['checkpoint'])
+
+
+def run_nightly_maintenance() -> None:
+    """
+    Scheduler job for the quiet hour: vacuum, refresh statistics (a full
+    ANALYZE once a week) and truncate the WAL the vacuum just grew.
+    """
+    weekly = datetime.utcnow().strftime('%a').lower() == MAINTENANCE_ANALYZE_DAY[:3].lower()
+    run_maintenance(['vacuum', 'analyze' if weekly else 'optimize', 'checkpoint'])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point: python -m utils.maintenance checkpoint|vacuum|optimize|analyze|all"""
+    parser = argparse.ArgumentParser(description="Run SQLite maintenance tasks.")
+    parser.add_argument('task', choices=sorted(TASKS) + ['all'])
+    args = parser.parse_args(argv)
+
+    tasks = ['vacuum', 'analyze', 'checkpoint'] if args.task == 'all' else [args.task]
+    for result in run_maintenance(tasks):
+        print(f"{result.task:<20} {result.duration * 1000:>10.0f} ms {result.reclaimed:>14} bytes reclaimed")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
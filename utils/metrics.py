@@ -0,0 +1,284 @@
+import bisect
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from utils.logger import logger
+from utils import tracing
+from utils.profiler import slow_update_profiler
+
+# Latency buckets in seconds, from fast cache hits to slow API round trips
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# TeleBot attributes holding registered handler lists
+HANDLER_LISTS = (
+    'message_handlers', 'edited_message_handlers', 'callback_query_handlers',
+    'inline_handlers', 'chosen_inline_handlers', 'my_chat_member_handlers',
+    'chat_member_handlers', 'chat_join_request_handlers',
+)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple, List[float]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block."""
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {series[-1]}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds all metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Create global registry and the application metrics
+registry = MetricsRegistry()
+
+HANDLER_LATENCY = registry.histogram(
+    'lpb_handler_duration_seconds', 'Time spent in update handlers', ['handler'])
+HANDLER_ERRORS = registry.counter(
+    'lpb_handler_errors_total', 'Exceptions escaping update handlers', ['handler'])
+DB_SESSION_LATENCY = registry.histogram(
+    'lpb_db_session_duration_seconds', 'Lifetime of get_db_session and run_write scopes including commit')
+DB_SESSION_ERRORS = registry.counter(
+    'lpb_db_session_errors_total', 'Database sessions rolled back after an error')
+WRITE_BATCH_SIZE = registry.histogram(
+    'lpb_db_write_batch_size', 'Operations committed together by the writer thread',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+WRITE_QUEUE_WAIT = registry.histogram(
+    'lpb_db_write_queue_wait_seconds', 'Time a write waited in the queue before its batch started')
+API_LATENCY = registry.histogram(
+    'lpb_telegram_api_duration_seconds', 'Telegram Bot API request time', ['method'])
+API_ERRORS = registry.counter(
+    'lpb_telegram_api_errors_total', 'Failed Telegram Bot API requests', ['method'])
+ABUSE_FLAGS = registry.counter(
+    'lpb_abuse_flags_total', 'Vote and click bursts flagged by the abuse detector', ['kind'])
+DB_MAINTENANCE_DURATION = registry.histogram(
+    'lpb_db_maintenance_duration_seconds', 'Time spent in SQLite maintenance tasks', ['task'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0))
+DB_MAINTENANCE_RECLAIMED = registry.counter(
+    'lpb_db_maintenance_reclaimed_bytes_total', 'Bytes returned to the filesystem by SQLite maintenance', ['task'])
+NOTIFICATIONS_SENT = registry.counter(
+    'lpb_notifications_total', 'Expiry notifications by kind and delivery status', ['kind', 'status'])
+
+
+def instrument_handler(function: Callable, name: str) -> Callable:
+    """Wrap one handler function with latency and error metrics, tracing and profiling."""
+    if getattr(function, '_instrumented', False):
+        return function
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        started = perf_counter()
+        try:
+            with tracing.trace(name, args[0] if args else None) as active_trace:
+                return slow_update_profiler.run(active_trace, function, *args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(perf_counter() - started, handler=name)
+
+    wrapper._instrumented = True
+    return wrapper
+
+
+def instrument_handlers(bot) -> int:
+    """
+    Wrap every handler registered on the bot with latency and error metrics.
+    Call after all handlers are registered.
+
+    Returns:
+        int: Number of handlers instrumented
+    """
+    count = 0
+    for attribute in HANDLER_LISTS:
+        for handler in getattr(bot, attribute, []):
+            handler['function'] = instrument_handler(handler['function'], handler['function'].__name__)
+            count += 1
+    logger.info(f"Instrumented {count} handlers")
+    return count
+
+
+def instrument_api_requests() -> None:
+    """Time every outgoing Telegram Bot API request by method name."""
+    from telebot import apihelper
+
+    original = apihelper._make_request
+    if getattr(original, '_instrumented', False):
+        return
+
+    @wraps(original)
+    def timed_request(token, method_name, *args, **kwargs):
+        started = perf_counter()
+        try:
+            with tracing.span(f'api.{method_name}'):
+                return original(token, method_name, *args, **kwargs)
+        except Exception:
+            API_ERRORS.inc(method=method_name)
+            raise
+        finally:
+            API_LATENCY.observe(perf_counter() - started, method=method_name)
+
+    timed_request._instrumented = True
+    apihelper._make_request = timed_request
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint serving /metrics (Prometheus text format),
+    /healthz (liveness) and /readyz (readiness).
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.readiness_checks: Dict[str, Callable[[], bool]] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def add_readiness_check(self, name: str, check: Callable[[], bool]) -> None:
+        """Register a check that must pass for /readyz to report ready."""
+        self.readiness_checks[name] = check
+
+    def _run_readiness_checks(self) -> Dict[str, bool]:
+        results = {}
+        for name, check in self.readiness_checks.items():
+            try:
+                results[name] = bool(check())
+            except Exception as e:
+                logger.error(f"Readiness check {name} failed: {str(e)}")
+                results[name] = False
+        return results
+
+    def start(self) -> None:
+        """Start serving on a daemon thread."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    self._reply(200, registry.render(), 'text/plain; version=0.0.4')
+                elif self.path == '/healthz':
+                    self._reply(200, 'ok\n')
+                elif self.path == '/readyz':
+                    results = server._run_readiness_checks()
+                    body = ''.join(f"{name}: {'ok' if ok else 'failing'}\n" for name, ok in results.items())
+                    self._reply(200 if all(results.values()) else 503, body or 'ok\n')
+                else:
+                    self._reply(404, 'not found\n')
+
+            def _reply(self, status: int, body: str, content_type: str = 'text/plain') -> None:
+                payload = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                # Scrapes are frequent; keep them out of the application log
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        Thread(target=self._server.serve_forever, name='metrics-server', daemon=True).start()
+        logger.info(f"Metrics endpoint listening on http://{self.host}:{self.port}/metrics")
+
+    def stop(self) -> None:
+        """Stop serving."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,401 @@
+"""
+Versioned schema migrations.
+
+Applied versions are recorded in schema_migrations; long data backfills
+keep their progress in migration_checkpoints so an interrupted run picks
+up where it stopped. Index builds use CREATE INDEX CONCURRENTLY on
+PostgreSQL so a live database keeps serving writes.
+
+    python -m utils.migrations status
+    python -m utils.migrations upgrade [--target VERSION]
+"""
+import argparse
+from datetime import datetime
+from time import perf_counter
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+from sqlalchemy import text, inspect
+from sqlalchemy.engine import Connection, Engine
+from utils.logger import logger
+
+# Rows per transaction in data backfills
+BACKFILL_BATCH_SIZE = 5000
+
+
+class Migration(NamedTuple):
+    """One schema change, applied once in version order."""
+    version: int
+    name: str
+    apply: Callable[[Engine], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str):
+    """Register the decorated function as the migration with this version."""
+    def register(function: Callable[[Engine], None]):
+        MIGRATIONS.append(Migration(version, name, function))
+        MIGRATIONS.sort(key=lambda item: item.version)
+        return function
+    return register
+
+
+def ensure_version_tables(engine: Engine) -> None:
+    """Create the bookkeeping tables if they do not exist."""
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL, duration_ms FLOAT NOT NULL)"
+        ))
+        connection.execute(text(
+            "CREATE TABLE IF NOT EXISTS migration_checkpoints ("
+            "name VARCHAR(100) PRIMARY KEY, position BIGINT NOT NULL, "
+            "updated_at TIMESTAMP NOT NULL)"
+        ))
+
+
+def applied_versions(engine: Engine) -> List[Tuple[int, str, datetime, float]]:
+    """Return (version, name, applied_at, duration_ms) for every applied migration."""
+    with engine.connect() as connection:
+        return [tuple(row) for row in connection.execute(text(
+            "SELECT version, name, applied_at, duration_ms FROM schema_migrations ORDER BY version"
+        ))]
+
+
+def run_migrations(engine: Engine, target: Optional[int] = None) -> List[Tuple[int, str, float]]:
+    """
+    Apply every pending migration up to target (default: all).
+
+    Args:
+        engine (Engine): Database to migrate
+        target (Optional[int]): Highest version to apply
+
+    Returns:
+        List[Tuple[int, str, float]]: (version, name, duration_ms) of each applied migration
+    """
+    ensure_version_tables(engine)
+    done = {version for version, *_ in applied_versions(engine)}
+    applied = []
+
+    for item in MIGRATIONS:
+        if item.version in done or (target is not None and item.version > target):
+            continue
+
+        logger.info(f"Applying migration {item.version} {item.name}")
+        started = perf_counter()
+        item.apply(engine)
+        duration_ms = (perf_counter() - started) * 1000
+
+        with engine.begin() as connection:
+            connection.execute(
+                text(
+                    "INSERT INTO schema_migrations (version, name, applied_at, duration_ms) "
+                    "VALUES (:version, :name, :applied_at, :duration_ms)"
+                ),
+                {'version': item.version, 'name': item.name,
+                 'applied_at': datetime.utcnow(), 'duration_ms': duration_ms}
+            )
+        logger.info(f"Migration {item.version} {item.name} applied in {duration_ms:.0f} ms")
+        applied.append((item.version, item.name, duration_ms))
+
+    return applied
+
+
+def create_index(engine: Engine, name: str, table: str, columns: Sequence[str],
+                 unique: bool = False) -> None:
+    """
+    Create an index if it is missing. On PostgreSQL the build runs
+    CONCURRENTLY, outside a transaction, so it does not block writes.
+
+    Raises:
+        RuntimeError: The concurrent build left the index INVALID; it is
+            dropped so the next run builds it again
+    """
+    concurrently = engine.dialect.name == 'postgresql'
+    statement = (
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX "
+        f"{'CONCURRENTLY ' if concurrently else ''}"
+        f"IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    )
+    started = perf_counter()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        # A failed concurrent build leaves an INVALID index behind, which
+        # IF NOT EXISTS would skip, recording the migration as applied
+        if concurrently:
+            _drop_invalid_index(connection, name)
+        try:
+            connection.execute(text(statement))
+        except Exception:
+            if concurrently:
+                _drop_invalid_index(connection, name)
+            raise
+        if concurrently and _drop_invalid_index(connection, name):
+            raise RuntimeError(f"Building index {name} left it invalid; dropped it")
+    logger.info(f"Index {name} ready in {(perf_counter() - started) * 1000:.0f} ms")
+
+
+def _drop_invalid_index(connection: Connection, name: str) -> bool:
+    """Drop a PostgreSQL index marked invalid by a failed concurrent build; True if one was dropped."""
+    valid = connection.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {'name': name}
+    ).scalar()
+    if valid is None or valid:
+        return False
+    logger.warning(f"Dropping invalid index {name}")
+    connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    return True
+
+
+def _checkpoint(connection: Connection, name: str) -> int:
+    position = connection.execute(
+        text("SELECT position FROM migration_checkpoints WHERE name = :name"), {'name': name}
+    ).scalar()
+    return position or 0
+
+
+def backfill(engine: Engine, name: str, table: str,
+             process: Callable[[Connection, List[Tuple]], None],
+             columns: str, where: str = "", batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Walk a table in id order and hand each batch of rows to process().
+
+    Each batch and its checkpoint commit together, so a crashed or
+    interrupted backfill resumes after the last finished batch.
+
+    Args:
+        engine (Engine): Database to work on
+        name (str): Checkpoint name, unique per backfill
+        table (str): Table to walk; must have an integer id column
+        process: Called with the connection and the rows (id first) of one batch
+        columns (str): Columns to select after id
+        where (str): Extra SQL condition limiting the rows to visit
+        batch_size (int): Rows per batch
+
+    Returns:
+        int: Rows processed in this run
+    """
+    with engine.connect() as connection:
+        position = _checkpoint(connection, name)
+    if position:
+        logger.info(f"Resuming backfill {name} after id {position}")
+
+    condition = f" AND ({where})" if where else ""
+    processed = 0
+    started = perf_counter()
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                text(
+                    f"SELECT id, {columns} FROM {table} WHERE id > :position{condition} "
+                    f"ORDER BY id LIMIT :limit"
+                ),
+                {'position': position, 'limit': batch_size}
+            ).fetchall()
+            if not rows:
+                break
+            process(connection, rows)
+            position = rows[-1][0]
+            updated = connection.execute(
+                text("UPDATE migration_checkpoints SET position = :position, updated_at = :now WHERE name = :name"),
+                {'position': position, 'now': datetime.utcnow(), 'name': name}
+            ).rowcount
+            if not updated:
+                connection.execute(
+                    text("INSERT INTO migration_checkpoints (name, position, updated_at) "
+                         "VALUES (:name, :position, :now)"),
+                    {'position': position, 'now': datetime.utcnow(), 'name': name}
+                )
+        processed += len(rows)
+        elapsed = perf_counter() - started
+        logger.info(f"Backfill {name}: {processed} rows, {processed / elapsed if elapsed else 0:.0f} rows/s")
+
+    return processed
+
+
+def _columns(engine: Engine, table: str) -> set:
+    return {column['name'] for column in inspect(engine).get_columns(table)}
+
+
+@migration(1, "initial_schema")
+def initial_schema(engine: Engine) -> None:
+    """Create the users and links tables on an empty database."""
+    from models.user_model import Base
+    # Registers the links table on the shared metadata
+    from models.link_model import Link  # noqa: F401
+    Base.metadata.create_all(engine)
+
+
+@migration(2, "links_canonical_url")
+def links_canonical_url(engine: Engine) -> None:
+    """
+    Add and backfill links.canonical_url on databases created before it existed.
+    When several existing rows share a canonical URL only the oldest keeps it.
+    """
+    # Imported here to keep the model layer free of handler imports at load time
+    from handlers.validation import canonicalize_group_link
+
+    if 'canonical_url' not in _columns(engine, 'links'):
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE links ADD COLUMN canonical_url VARCHAR(255)"))
+
+    # The unique index comes first: it keeps the NOT EXISTS check below fast
+    create_index(engine, 'ix_links_canonical_url', 'links', ['canonical_url'], unique=True)
+
+    def process(connection: Connection, rows: List[Tuple]) -> None:
+        for link_id, url in rows:
+            canonical_url = canonicalize_group_link(url)
+            if canonical_url is None:
+                continue
+            # Rows are walked in id order, so an existing holder is always older
+            connection.execute(
+                text(
+                    "UPDATE links SET canonical_url = :canonical_url WHERE id = :id "
+                    "AND NOT EXISTS (SELECT 1 FROM links WHERE canonical_url = :canonical_url)"
+                ),
+                {'canonical_url': canonical_url, 'id': link_id}
+            )
+
+    backfill(engine, 'links_canonical_url', 'links', process, columns="url", where="canonical_url IS NULL")
+
+
+@migration(3, "links_search_index")
+def links_search_index(engine: Engine) -> None:
+    """
+    Create the FTS5 index over link titles and the triggers that keep it in
+    sync with the links table, then index any existing rows. SQLite only;
+    other backends search with ILIKE.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    with engine.begin() as connection:
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'links_fts'"
+        )).first()
+        if exists:
+            return
+
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE links_fts USING fts5("
+            "title, content='links', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER links_fts_insert AFTER INSERT ON links BEGIN "
+            "INSERT INTO links_fts(rowid, title) VALUES (new.id, new.title); END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER links_fts_delete AFTER DELETE ON links BEGIN "
+            "INSERT INTO links_fts(links_fts, rowid, title) VALUES ('delete', old.id, old.title); END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER links_fts_update AFTER UPDATE OF title ON links BEGIN "
+            "INSERT INTO links_fts(links_fts, rowid, title) VALUES ('delete', old.id, old.title); "
+            "INSERT INTO links_fts(rowid, title) VALUES (new.id, new.title); END"
+        ))
+        connection.execute(text("INSERT INTO links_fts(links_fts) VALUES ('rebuild')"))
+
+
+@migration(4, "hot_query_indexes")
+def hot_query_indexes(engine: Engine) -> None:
+    """Indexes for link ranking, expiry, per-user lookups and referrals."""
+    create_index(engine, 'ix_links_score', 'links', ['score'])
+    create_index(engine, 'ix_links_submit_date', 'links', ['submit_date'])
+    create_index(engine, 'ix_links_user_id_submit_date', 'links', ['user_id', 'submit_date'])
+    create_index(engine, 'ix_users_referred_by', 'users', ['referred_by'])
+
+
+@migration(5, "links_markdown_columns")
+def links_markdown_columns(engine: Engine) -> None:
+    """Add links.title_md and links.url_md and render them for existing rows."""
+    from utils.helpers import escape_markdown
+
+    columns = _columns(engine, 'links')
+    with engine.begin() as connection:
+        if 'title_md' not in columns:
+            connection.execute(text("ALTER TABLE links ADD COLUMN title_md VARCHAR(200)"))
+        if 'url_md' not in columns:
+            connection.execute(text("ALTER TABLE links ADD COLUMN url_md VARCHAR(510)"))
+
+    def process(connection: Connection, rows: List[Tuple]) -> None:
+        connection.execute(
+            text("UPDATE links SET title_md = :title_md, url_md = :url_md WHERE id = :id"),
+            [{'id': link_id, 'title_md': escape_markdown(title), 'url_md': escape_markdown(url)}
+             for link_id, title, url in rows]
+        )
+
+    backfill(engine, 'links_markdown_columns', 'links', process, columns="title, url", where="title_md IS NULL")
+
+
+@migration(6, "stats_rollups")
+def stats_rollups(engine: Engine) -> None:
+    """Create the tables the journal rollup job (utils.rollups) maintains for /stats."""
+    from models.user_model import Base
+    from models.stats_model import STATS_TABLES
+    Base.metadata.create_all(engine, tables=STATS_TABLES)
+
+
+@migration(7, "sqlite_incremental_vacuum")
+def sqlite_incremental_vacuum(engine: Engine) -> None:
+    """
+    Switch SQLite to auto_vacuum=INCREMENTAL so utils.maintenance can hand
+    free pages back in small steps. The mode only takes effect after a full
+    VACUUM, which rewrites the file once and blocks writers while it runs.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        # 2 is INCREMENTAL
+        if connection.execute(text("PRAGMA auto_vacuum")).scalar() == 2:
+            return
+        connection.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+        connection.execute(text("VACUUM"))
+
+
+@migration(8, "expiry_notifications")
+def expiry_notifications(engine: Engine) -> None:
+    """Add users.notifications (opt-out, on by default) and links.expiry_warned_at."""
+    user_columns = _columns(engine, 'users')
+    link_columns = _columns(engine, 'links')
+    with engine.begin() as connection:
+        if 'notifications' not in user_columns:
+            connection.execute(text("ALTER TABLE users ADD COLUMN notifications BOOLEAN NOT NULL DEFAULT TRUE"))
+        if 'expiry_warned_at' not in link_columns:
+            connection.execute(text("ALTER TABLE links ADD COLUMN expiry_warned_at TIMESTAMP"))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point: python -m utils.migrations status|upgrade"""
+    parser = argparse.ArgumentParser(description="Show or apply schema migrations.")
+    parser.add_argument('command', choices=['status', 'upgrade'])
+    parser.add_argument('--target', type=int, help="Highest version to apply")
+    parser.add_argument('--database-uri', help="Database to migrate (default: config.DATABASE_URI)")
+    args = parser.parse_args(argv)
+
+    from sqlalchemy import create_engine
+    from config import DATABASE_URI
+    engine = create_engine(args.database_uri or DATABASE_URI)
+
+    if args.command == 'upgrade':
+        applied = run_migrations(engine, args.target)
+        for version, name, duration_ms in applied:
+            print(f"Applied {version:>3} {name:<30} {duration_ms:>10.0f} ms")
+        if not applied:
+            print("Database is up to date.")
+        return 0
+
+    ensure_version_tables(engine)
+    done = {version: (applied_at, duration_ms) for version, _, applied_at, duration_ms in applied_versions(engine)}
+    for item in MIGRATIONS:
+        if item.version in done:
+            applied_at, duration_ms = done[item.version]
+            print(f"{item.version:>3} {item.name:<30} applied {applied_at} ({duration_ms:.0f} ms)")
+        else:
+            print(f"{item.version:>3} {item.name:<30} pending")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+"""
+TeleBot instances for multi-bot mode (see utils/tenants.py).
+
+Every bot polls on its own thread, but none has worker threads of its
+own: their updates all go to one shared pool, and each task runs inside
+its bot's tenant context so handlers reach that bot's database.
+"""
+import threading
+from typing import List
+from telebot import TeleBot, util
+from telebot.storage import StateMemoryStorage
+from utils.logger import logger
+from utils.tenants import Tenant, tenant_context, bots as tenant_bots, tenants as hosted_tenants
+
+
+class TenantBot(TeleBot):
+    """A TeleBot that handles each update as its tenant."""
+
+    def __init__(self, tenant: Tenant):
+        # Per-bot state storage: TeleBot's default instance is shared by all bots
+        super().__init__(
+            tenant.token, use_class_middlewares=True, num_threads=0, state_storage=StateMemoryStorage()
+        )
+        self.tenant = tenant
+
+    def _exec_task(self, task, *args, **kwargs):
+        # Handlers, middlewares and next-step handlers all pass through here
+        tenant = self.tenant
+
+        def run_as_tenant(*task_args, **task_kwargs):
+            # Handle errors here, for this bot: an exception reaching the shared
+            # pool's exception_event would surface in whichever bot polled last
+            with tenant_context(tenant):
+                try:
+                    task(*task_args, **task_kwargs)
+                except Exception as e:
+                    if not self._handle_exception(e):
+                        logger.error(f"Unhandled error in bot {tenant.name}: {str(e)}")
+
+        super()._exec_task(run_as_tenant, *args, **kwargs)
+
+
+def create_bots(tenants: List[Tenant], num_threads: int) -> List[TenantBot]:
+    """
+    Build one TenantBot per tenant, all sharing a pool of num_threads
+    handler threads, and register them as the hosted tenants.
+
+    Returns:
+        List[TenantBot]: The bots, in the order of tenants
+    """
+    created = [TenantBot(tenant) for tenant in tenants]
+    if created:
+        # Tasks catch their own exceptions (see TenantBot._exec_task), so the
+        # pool's exception_event, which only one bot's polling loop watches, stays clear
+        pool = util.ThreadPool(created[0], num_threads=num_threads)
+        for bot in created:
+            bot.worker_pool = pool
+
+    hosted_tenants[:] = tenants
+    tenant_bots.clear()
+    tenant_bots.update((bot.tenant.name, bot) for bot in created)
+    return created
+
+
+def poll_all(created: List[TenantBot], **polling_args) -> None:
+    """
+    Long-poll every bot on its own thread until all of them stop. Ctrl+C
+    reaches the caller, which should then stop_all().
+    """
+    threads = [
+        threading.Thread(
+            target=bot.infinity_polling, kwargs=polling_args,
+            name=f"polling-{bot.tenant.name}", daemon=True
+        )
+        for bot in created
+    ]
+    for thread in threads:
+        thread.start()
+    logger.info(f"Polling {len(threads)} bots")
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=1)
+
+
+def stop_all(created: List[TenantBot]) -> None:
+    """Stop polling on every bot and close the shared worker pool."""
+    for bot in created:
+        bot.stop_polling()
+    if created:
+        created[0].worker_pool.close()
@@ -0,0 +1,230 @@
+"""
+Expiry warnings and notices for link owners.
+
+Regular users may only have one active link, and without a reminder the
+only way to learn when it expires is tapping "📝 Add Your Link" until the
+bot accepts a new one. Instead, a periodic job finds the links expiring
+soon with one range query on submit_date, groups them by owner and sends
+each owner a single warning; the cleanup job tells owners when their link
+is gone. Users opt out with /notifications off.
+
+Messages go through one shared PacedSender, which keeps the bot under
+Telegram's broadcast limit and waits out 429 responses.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+from threading import Lock
+from time import monotonic, perf_counter, sleep
+from typing import Callable, List, Optional, Tuple
+from telebot.apihelper import ApiTelegramException
+from utils.logger import logger
+from utils.metrics import NOTIFICATIONS_SENT
+from utils.tenants import current_bot
+from database import get_expiring_links, get_notified_users, mark_links_warned, set_notifications
+from config import EXPIRY_WARNING_HOURS, NOTIFY_RATE_PER_SECOND, NOTIFY_BATCH_SIZE
+
+# Delivery outcomes of PacedSender.send
+SENT = 'sent'
+UNDELIVERABLE = 'undeliverable'  # Blocked the bot or deleted the chat; do not retry
+FAILED = 'failed'
+
+OPT_OUT_HINT = "Turn these messages off with /notifications off"
+
+
+class PacedSender:
+    """
+    Send messages at a steady rate with a token bucket. A 429 answer pauses
+    every sender for the retry_after Telegram asks for, then the message is
+    retried.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None, max_retries: int = 3,
+                 send: Optional[Callable[[int, str], object]] = None):
+        """
+        Args:
+            rate (float): Messages per second
+            burst (Optional[int]): Messages that may go out back to back (default: rate)
+            max_retries (int): Retries of a message rate limited by Telegram
+            send: Called with (chat_id, text); defaults to the current bot's send_message
+        """
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.max_retries = max_retries
+        self._send = send
+        self._tokens = float(self.capacity)
+        self._updated = monotonic()
+        self._paused_until = 0.0
+        self._lock = Lock()
+
+    def _take(self) -> None:
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Stop all sending for the given number of seconds."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, monotonic() + seconds)
+            self._tokens = 0
+
+    def send(self, chat_id: int, text: str) -> str:
+        """
+        Send one message, waiting for the rate limit.
+
+        Returns:
+            str: SENT, UNDELIVERABLE (the user blocked the bot or the chat is
+                gone) or FAILED
+        """
+        # The current bot's send_message, in multi-bot mode the tenant's own bot
+        send = self._send or current_bot().send_message
+
+        for _ in range(self.max_retries + 1):
+            self._take()
+            try:
+                send(chat_id, text)
+                return SENT
+            except ApiTelegramException as e:
+                if e.error_code == 429:
+                    retry_after = (e.result_json.get('parameters') or {}).get('retry_after', 1)
+                    logger.warning(f"Rate limited while notifying {chat_id}; pausing {retry_after}s")
+                    self.pause(retry_after)
+                    continue
+                # 403: blocked or deactivated; 400 "chat not found": the chat is gone.
+                # Other 400s may be transient and are retried on the next run
+                chat_missing = e.error_code == 400 and 'chat not found' in (e.description or '').lower()
+                if e.error_code == 403 or chat_missing:
+                    return UNDELIVERABLE
+                logger.error(f"Error notifying {chat_id}: {str(e)}")
+                return FAILED
+            except Exception as e:
+                logger.error(f"Error notifying {chat_id}: {str(e)}")
+                return FAILED
+        return FAILED
+
+
+# Shared by every notification job so together they respect one rate
+notification_sender = PacedSender(NOTIFY_RATE_PER_SECOND)
+
+
+def _time_left(remaining: timedelta) -> str:
+    seconds = max(0, int(remaining.total_seconds()))
+    return f"{seconds // 3600} hours and {seconds % 3600 // 60} minutes"
+
+
+def warning_text(links: List[Tuple[int, int, str, datetime]], expires_at: Callable[[datetime], datetime],
+                 now: datetime) -> str:
+    """Build one owner's warning about all of their expiring links."""
+    if len(links) == 1:
+        _, _, title, submit_date = links[0]
+        head = f"⏳ Your link \"{title}\" expires in {_time_left(expires_at(submit_date) - now)}."
+    else:
+        items = "\n".join(
+            f"• \"{title}\" in {_time_left(expires_at(submit_date) - now)}"
+            for _, _, title, submit_date in links
+        )
+        head = f"⏳ Your links expire soon:\n{items}"
+    return f"{head}\n\nOnce it has expired you can add a new link with 📝 Add Your Link.\n\n{OPT_OUT_HINT}"
+
+
+def expired_text(titles: List[str]) -> str:
+    """Build one owner's notice about their links removed by the cleanup."""
+    if len(titles) == 1:
+        head = f"⌛️ Your link \"{titles[0]}\" has expired and was removed."
+    else:
+        head = "⌛️ These links of yours have expired and were removed:\n" + "\n".join(f"• \"{t}\"" for t in titles)
+    return f"{head}\n\nYou can now add a new link with 📝 Add Your Link.\n\n{OPT_OUT_HINT}"
+
+
+def warn_expiring_links(cleanup_days: int, window_hours: int = EXPIRY_WARNING_HOURS,
+                        batch_size: int = NOTIFY_BATCH_SIZE, sender: PacedSender = notification_sender) -> int:
+    """
+    Warn the owners of links that expire within window_hours, once per link.
+
+    Owners are handled batch_size at a time, and a batch's links are marked
+    as warned as soon as it is sent, so an interrupted run resumes without
+    warning anyone twice.
+
+    Args:
+        cleanup_days (int): Age at which the cleanup job removes links
+        window_hours (int): How long before expiry to warn
+        batch_size (int): Owners per batch
+        sender (PacedSender): Where messages go
+
+    Returns:
+        int: Number of warnings delivered
+    """
+    started = perf_counter()
+    now = datetime.utcnow()
+    lifetime = timedelta(days=cleanup_days)
+    # Links expiring in [now, now + window) were submitted in [now - lifetime, now - lifetime + window)
+    rows = get_expiring_links(now - lifetime, now - lifetime + timedelta(hours=window_hours))
+    owners = [(user_id, list(links)) for user_id, links in groupby(rows, key=itemgetter(1))]
+
+    delivered = 0
+    for start in range(0, len(owners), batch_size):
+        warned, unreachable = [], []
+        for user_id, links in owners[start:start + batch_size]:
+            status = sender.send(user_id, warning_text(links, lambda submitted: submitted + lifetime, now))
+            NOTIFICATIONS_SENT.inc(kind='warning', status=status)
+            if status == FAILED:
+                continue  # Retried on the next run
+            warned.extend(link_id for link_id, *_ in links)
+            if status == SENT:
+                delivered += 1
+            else:
+                unreachable.append(user_id)
+
+        mark_links_warned(warned)
+        # Users who blocked the bot would fail every time; stop trying
+        for user_id in unreachable:
+            set_notifications(user_id, False)
+
+    if owners:
+        logger.info(
+            f"Sent {delivered} of {len(owners)} expiry warnings for {len(rows)} links "
+            f"in {perf_counter() - started:.1f}s"
+        )
+    return delivered
+
+
+def notify_expired(removed: List[Tuple[int, int, str]], sender: PacedSender = notification_sender) -> int:
+    """
+    Tell owners that the cleanup removed their links, one message per owner.
+
+    Args:
+        removed (List[Tuple[int, int, str]]): (link_id, user_id, title) of the removed links
+        sender (PacedSender): Where messages go
+
+    Returns:
+        int: Number of notices delivered
+    """
+    titles = defaultdict(list)
+    notified = get_notified_users(sorted({user_id for _, user_id, _ in removed}))
+    for _, user_id, title in removed:
+        if user_id in notified:
+            titles[user_id].append(title)
+
+    delivered = 0
+    for user_id, owner_titles in titles.items():
+        status = sender.send(user_id, expired_text(owner_titles))
+        NOTIFICATIONS_SENT.inc(kind='expired', status=status)
+        if status == SENT:
+            delivered += 1
+        elif status == UNDELIVERABLE:
+            set_notifications(user_id, False)
+
+    if titles:
+        logger.info(f"Sent {delivered} of {len(titles)} expiry notices")
+    return delivered
@@ -0,0 +1,88 @@
+import cProfile
+import json
+import os
+from datetime import datetime
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable
+from utils.logger import logger
+from utils.tracing import Trace
+from config import PROFILER_ENABLED, SLOW_UPDATE_THRESHOLD_MS, PROFILE_OUTPUT_DIR
+
+
+def _update_payload(update: Any) -> Any:
+    """Best-effort raw JSON of a telebot update object."""
+    payload = getattr(update, 'json', None)
+    if payload is not None:
+        return payload
+    return repr(update)
+
+
+class SlowUpdateProfiler:
+    """
+    Profile updates with cProfile and keep the profiles of slow ones.
+
+    Only one update is profiled at a time; updates arriving while another
+    is being profiled run normally. Every update slower than the threshold
+    is logged with its span summary, profiled or not.
+    """
+
+    def __init__(self, threshold_ms: float, output_dir: str, enabled: bool = False):
+        self.threshold_ms = threshold_ms
+        self.output_dir = output_dir
+        self.enabled = enabled
+        self._lock = Lock()
+
+    def run(self, active_trace: Trace, function: Callable, *args, **kwargs):
+        """Call function, profiling it when enabled and the profiler is free."""
+        if not self.enabled or not self._lock.acquire(blocking=False):
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._check_slow(active_trace, None)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profile.disable()
+                self._check_slow(active_trace, profile)
+        finally:
+            self._lock.release()
+
+    def _check_slow(self, active_trace: Trace, profile) -> None:
+        """Log a slow update and dump its profile when one was taken."""
+        # The trace closes after the handler returns, so measure it here
+        elapsed_ms = (perf_counter() - active_trace.started) * 1000
+        if elapsed_ms < self.threshold_ms:
+            return
+
+        logger.warning(
+            "Slow update in %s: %.1f ms %s", active_trace.name, elapsed_ms, active_trace.summary()
+        )
+        if profile is not None:
+            self._dump(active_trace, profile, elapsed_ms)
+
+    def _dump(self, active_trace: Trace, profile, elapsed_ms: float) -> None:
+        """Write the pstats file and a JSON sidecar with the update and spans."""
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')
+            base = os.path.join(self.output_dir, f"{stamp}_{active_trace.name}_{int(elapsed_ms)}ms")
+
+            profile.dump_stats(base + '.prof')
+            details = active_trace.to_dict()
+            details['duration_ms'] = round(elapsed_ms, 3)
+            details['update'] = _update_payload(active_trace.payload)
+            with open(base + '.json', 'w', encoding='utf-8') as details_file:
+                json.dump(details, details_file, default=str, ensure_ascii=False, indent=2)
+
+            logger.info(f"Saved slow update profile to {base}.prof")
+        except Exception as e:
+            logger.error(f"Error saving slow update profile: {str(e)}")
+
+
+# Create global profiler instance
+slow_update_profiler = SlowUpdateProfiler(SLOW_UPDATE_THRESHOLD_MS, PROFILE_OUTPUT_DIR, PROFILER_ENABLED)
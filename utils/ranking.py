@@ -41,15 +41,16 @@ class RankingCalculator:
             )
 
             # Apply time decay
-            time_factor = self._calculate_time_factor(link.submission_time)
+            time_factor = self._calculate_time_factor(link.submit_date)
             score = base_score * time_factor
 
-            # Apply bonuses and penalties
-            if link.is_verified:
+            # Apply bonuses and penalties (optional attributes, not stored on Link yet)
+            if getattr(link, 'is_verified', False):
                 score *= self.WEIGHTS['verified_bonus']
             
-            if link.reported_count > 0:
-                score *= (self.WEIGHTS['report_penalty'] ** link.reported_count)
+            reported_count = getattr(link, 'reported_count', 0)
+            if reported_count > 0:
+                score *= (self.WEIGHTS['report_penalty'] ** reported_count)
 
             return max(score, 0)  # Ensure non-negative score
             
@@ -99,7 +100,7 @@ class RankingCalculator:
             # Filter recent links
             recent_links = [
                 link for link in links 
-                if link.last_updated >= trending_threshold
+                if getattr(link, 'last_updated', link.submit_date) >= trending_threshold
             ]
             
             # Sort by score
@@ -139,7 +140,7 @@ class RankingCalculator:
                 threshold = datetime.utcnow() - time_window
                 filtered_links = [
                     link for link in links 
-                    if link.submission_time >= threshold
+                    if link.submit_date >= threshold
                 ]
             else:
                 filtered_links = links
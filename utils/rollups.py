@@ -0,0 +1,284 @@
+"""
+Hourly rollups of the interaction journal, read by /stats.
+
+A periodic job tails the journal from its checkpoint, aggregates the new
+events in memory and upserts the counts together with the new checkpoint
+in one transaction, so every event is counted exactly once even if the
+job is interrupted. /stats then reads a bounded number of rollup rows
+instead of scanning links and users (which also forget expired links).
+"""
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from utils.logger import logger
+from utils.journal import JournalPosition, read_events, delete_segments, segment_name
+from utils.tenants import current_tenant, tenant_context, tenants, for_each_tenant
+from database import get_read_session, run_write
+from models.stats_model import (
+    stats_hourly, stats_link_hourly, stats_daily_users, stats_daily, rollup_checkpoints
+)
+from config import JOURNAL_DIR, JOURNAL_RETENTION_SEGMENTS, STATS_RETENTION_DAYS
+
+# Name of the journal rollup's row in rollup_checkpoints
+CHECKPOINT_NAME = 'journal'
+# Events aggregated per transaction
+ROLLUP_BATCH_SIZE = 20000
+# Link columns each event type counts towards
+LINK_COLUMNS = {'view': 'views', 'click': 'clicks'}
+
+
+def _hour(timestamp: float) -> datetime:
+    return datetime.utcfromtimestamp(timestamp).replace(minute=0, second=0, microsecond=0)
+
+
+def _insert(session, table):
+    """Dialect insert() with on_conflict_* support (SQLite and PostgreSQL)."""
+    dialect = postgresql if session.get_bind().dialect.name == 'postgresql' else sqlite
+    return dialect.insert(table)
+
+
+class RollupBatch:
+    """Counts aggregated from a run of journal events, waiting to be upserted."""
+
+    def __init__(self):
+        self.size = 0
+        self.events: Counter = Counter()
+        self.links: Dict[Tuple[datetime, int], Counter] = defaultdict(Counter)
+        self.users = set()
+
+    def add(self, event: Dict) -> None:
+        hour = _hour(event['t'])
+        kind = event['e']
+        self.size += 1
+        self.events[(hour, kind)] += 1
+
+        link_id = event.get('link')
+        if link_id is not None:
+            if kind == 'vote':
+                self.links[(hour, link_id)]['upvotes' if event.get('up') else 'downvotes'] += 1
+            elif kind in LINK_COLUMNS:
+                self.links[(hour, link_id)][LINK_COLUMNS[kind]] += 1
+
+        user_id = event.get('user')
+        if user_id is not None:
+            self.users.add((hour.date(), user_id))
+
+    def apply(self, session, position: JournalPosition) -> None:
+        """Upsert the counts and move the checkpoint, in the session's transaction."""
+        if self.events:
+            statement = _insert(session, stats_hourly)
+            session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=['hour', 'event'],
+                    set_={'count': stats_hourly.c.count + statement.excluded.count}
+                ),
+                [{'hour': hour, 'event': kind, 'count': count} for (hour, kind), count in self.events.items()]
+            )
+
+        if self.links:
+            statement = _insert(session, stats_link_hourly)
+            columns = ('views', 'clicks', 'upvotes', 'downvotes')
+            session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=['hour', 'link_id'],
+                    set_={name: stats_link_hourly.c[name] + statement.excluded[name] for name in columns}
+                ),
+                [
+                    {'hour': hour, 'link_id': link_id, **{name: counts[name] for name in columns}}
+                    for (hour, link_id), counts in self.links.items()
+                ]
+            )
+
+        if self.users:
+            session.execute(
+                _insert(session, stats_daily_users).on_conflict_do_nothing(),
+                [{'day': day, 'user_id': user_id} for day, user_id in self.users]
+            )
+            # Only the days in this batch are recounted, from their primary key range
+            for day in {day for day, _ in self.users}:
+                active = session.scalar(
+                    select(func.count()).select_from(stats_daily_users).where(stats_daily_users.c.day == day)
+                )
+                statement = _insert(session, stats_daily)
+                session.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=['day'], set_={'active_users': statement.excluded.active_users}
+                    ),
+                    {'day': day, 'active_users': active}
+                )
+
+        statement = _insert(session, rollup_checkpoints)
+        values = {'segment': position.segment, 'position': position.offset, 'updated_at': datetime.utcnow()}
+        session.execute(
+            statement.on_conflict_do_update(index_elements=['name'], set_=values),
+            {'name': CHECKPOINT_NAME, **values}
+        )
+
+
+def load_checkpoint() -> Optional[JournalPosition]:
+    """Return where the last rollup stopped reading, or None before the first run."""
+    with get_read_session() as session:
+        row = session.execute(
+            select(rollup_checkpoints.c.segment, rollup_checkpoints.c.position)
+            .where(rollup_checkpoints.c.name == CHECKPOINT_NAME)
+        ).first()
+    return JournalPosition(*row) if row else None
+
+
+def prune_rollups(session, retention_days: int = STATS_RETENTION_DAYS) -> None:
+    """Drop rollup rows older than the retention period."""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    session.execute(delete(stats_hourly).where(stats_hourly.c.hour < cutoff))
+    session.execute(delete(stats_link_hourly).where(stats_link_hourly.c.hour < cutoff))
+    session.execute(delete(stats_daily).where(stats_daily.c.day < cutoff.date()))
+    # Per-user rows only deduplicate recent days; late events older than this are rare
+    session.execute(delete(stats_daily_users).where(
+        stats_daily_users.c.day < (datetime.utcnow() - timedelta(days=7)).date()
+    ))
+
+
+def run_rollup(directory: str = JOURNAL_DIR, batch_size: int = ROLLUP_BATCH_SIZE) -> int:
+    """
+    Fold the journal events written since the last run into the rollup tables.
+
+    Returns:
+        int: Number of events rolled up
+    """
+    started = perf_counter()
+    total = 0
+    try:
+        tenant = current_tenant()
+        bot = tenant.name if tenant is not None else None
+        batch = RollupBatch()
+        position = None
+        for position, event in read_events(directory, load_checkpoint()):
+            # In multi-bot mode each bot's database rolls up only its own events
+            if event.get('bot') != bot:
+                continue
+            batch.add(event)
+            if batch.size >= batch_size:
+                run_write(lambda session, batch=batch, position=position: batch.apply(session, position))
+                total += batch.size
+                batch = RollupBatch()
+
+        # Also moves the checkpoint past trailing events of other bots
+        if position is not None:
+            run_write(lambda session: batch.apply(session, position))
+            total += batch.size
+        run_write(prune_rollups)
+
+        if total:
+            logger.info(f"Rolled up {total} journal events in {(perf_counter() - started) * 1000:.0f} ms")
+    except Exception as e:
+        logger.error(f"Error rolling up journal events: {str(e)}")
+    return total
+
+
+def prune_journal(directory: str = JOURNAL_DIR, keep: int = JOURNAL_RETENTION_SEGMENTS) -> int:
+    """
+    Delete the journal segments every bot's rollup has read past, beyond
+    the newest keep segments. Nothing is deleted while any bot's
+    checkpoint is missing or unreadable.
+
+    Returns:
+        int: Number of segments deleted
+    """
+    if keep <= 0:
+        return 0
+    try:
+        checkpoints = []
+        for tenant in list(tenants) or [None]:
+            with tenant_context(tenant):
+                checkpoints.append(load_checkpoint())
+        if None in checkpoints:
+            return 0
+
+        deleted = delete_segments(directory, min(checkpoint.segment for checkpoint in checkpoints), keep)
+        if deleted:
+            logger.info(
+                f"Deleted {len(deleted)} rolled-up journal segments "
+                f"({segment_name(deleted[0])} to {segment_name(deleted[-1])})"
+            )
+        return len(deleted)
+    except Exception as e:
+        logger.error(f"Error pruning journal segments: {str(e)}")
+        return 0
+
+
+def run_scheduled_rollup() -> None:
+    """Scheduler job: roll up the journal for every bot, then prune the segments all of them have read."""
+    for_each_tenant(run_rollup)
+    prune_journal()
+
+
+def event_totals(since: datetime) -> Dict[str, int]:
+    """Event counts per type from the hourly rollups since the given hour."""
+    with get_read_session() as session:
+        rows = session.execute(
+            select(stats_hourly.c.event, func.sum(stats_hourly.c.count))
+            .where(stats_hourly.c.hour >= since)
+            .group_by(stats_hourly.c.event)
+        )
+        return {event: int(count) for event, count in rows}
+
+
+def daily_counts(event: str, days: int) -> List[Tuple[date, int]]:
+    """Per-day totals of one event type over the last `days` days, oldest first."""
+    today = datetime.utcnow().date()
+    since = datetime.combine(today - timedelta(days=days - 1), datetime.min.time())
+    totals = Counter()
+    with get_read_session() as session:
+        rows = session.execute(
+            select(stats_hourly.c.hour, stats_hourly.c.count)
+            .where(stats_hourly.c.event == event, stats_hourly.c.hour >= since)
+        )
+        for hour, count in rows:
+            totals[hour.date()] += count
+    return [(day, totals[day]) for day in (today - timedelta(days=n) for n in range(days - 1, -1, -1))]
+
+
+def active_users(days: int) -> List[Tuple[date, int]]:
+    """Distinct active users per day over the last `days` days, oldest first."""
+    today = datetime.utcnow().date()
+    with get_read_session() as session:
+        rows = dict(session.execute(
+            select(stats_daily.c.day, stats_daily.c.active_users)
+            .where(stats_daily.c.day >= today - timedelta(days=days - 1))
+        ).all())
+    return [(day, rows.get(day, 0)) for day in (today - timedelta(days=n) for n in range(days - 1, -1, -1))]
+
+
+def link_activity(link_id: int, days: int) -> List[Tuple[date, int, int, int, int]]:
+    """(day, views, clicks, upvotes, downvotes) for one link over the last `days` days."""
+    today = datetime.utcnow().date()
+    since = datetime.combine(today - timedelta(days=days - 1), datetime.min.time())
+    totals: Dict[date, List[int]] = defaultdict(lambda: [0, 0, 0, 0])
+    with get_read_session() as session:
+        rows = session.execute(
+            select(stats_link_hourly.c.hour, stats_link_hourly.c.views, stats_link_hourly.c.clicks,
+                   stats_link_hourly.c.upvotes, stats_link_hourly.c.downvotes)
+            .where(stats_link_hourly.c.link_id == link_id, stats_link_hourly.c.hour >= since)
+        )
+        for hour, *counts in rows:
+            day_totals = totals[hour.date()]
+            for index, count in enumerate(counts):
+                day_totals[index] += count
+    return [(day, *totals[day]) for day in (today - timedelta(days=n) for n in range(days - 1, -1, -1))]
+
+
+def top_links(since: datetime, limit: int = 5) -> List[Tuple[int, int]]:
+    """(link_id, clicks) of the most clicked links since the given hour."""
+    clicks = func.sum(stats_link_hourly.c.clicks)
+    with get_read_session() as session:
+        return [
+            (link_id, int(count)) for link_id, count in session.execute(
+                select(stats_link_hourly.c.link_id, clicks)
+                .where(stats_link_hourly.c.hour >= since)
+                .group_by(stats_link_hourly.c.link_id)
+                .order_by(clicks.desc())
+                .limit(limit)
+            )
+        ]
@@ -1,22 +1,33 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime, timedelta
 from utils.logger import logger
-from database import get_db_session, get_all_links, delete_link
+from database import run_write, get_all_links, delete_link, rebuild_link_url_filter
+from models.link_model import Link
 from typing import List
-from pytz import utc
 from utils.helpers import is_admin
-from config import ADMINS
+from utils.cards import forget_link_card
+from utils.journal import journal
+from utils import notifications
+from utils.tenants import per_tenant
+from config import ADMINS, NOTIFICATIONS_ENABLED
 
 
 class LinkCleanupScheduler:
     def __init__(self):
-        # Configure scheduler to use UTC explicitly
-        self.scheduler = BackgroundScheduler(timezone=utc)
+        self._scheduler = None
         self.cleanup_days = 3  # Default: remove links older than 3 days
         self.runs_per_day = 4  # Default: run 4 times per day
         self.is_running = False
 
+    @property
+    def scheduler(self):
+        """The APScheduler instance, created (and APScheduler imported) on first use."""
+        if self._scheduler is None:
+            from apscheduler.schedulers.background import BackgroundScheduler
+            from pytz import utc
+            # Configure scheduler to use UTC explicitly
+            self._scheduler = BackgroundScheduler(timezone=utc)
+        return self._scheduler
+
     def calculate_intervals(self) -> List[int]:
         """Calculate the hours when the job should run based on runs_per_day"""
         interval = 24 // self.runs_per_day
@@ -28,7 +39,7 @@ class LinkCleanupScheduler:
             current_time = datetime.utcnow()
             cutoff_time = current_time - timedelta(days=self.cleanup_days)
             
-            with get_db_session() as session:
+            def delete_expired(session):
                 # Get expired links
                 expired_links = (
                     session.query(Link)
@@ -39,13 +50,13 @@ class LinkCleanupScheduler:
                 removed_count = 0
                 admin_count = 0
                 for link in expired_links:
-                    is_admin = is_admin(link.user_id)
+                    owner_is_admin = is_admin(link.user_id)
                     logger.info(
                         f"Removing old link: {link.title} (ID: {link.id}) "
-                        f"from {'admin' if is_admin else 'user'} {link.user_id}"
+                        f"from {'admin' if owner_is_admin else 'user'} {link.user_id}"
                     )
                     
-                    if not is_admin:
+                    if not owner_is_admin:
                         # Only log "can add new link" for regular users
                         logger.info(f"User {link.user_id} can now add a new link")
                         removed_count += 1
@@ -53,20 +64,40 @@ class LinkCleanupScheduler:
                         admin_count += 1
                         
                     session.delete(link)
-                
-                session.commit()
-                
-                logger.info(
-                    f"Cleanup completed at {current_time.strftime('%Y-%m-%d %H:%M:%S UTC')}. "
-                    f"Removed {removed_count} regular user links and {admin_count} admin links."
-                )
+                return removed_count, admin_count, [(link.id, link.user_id, link.title) for link in expired_links]
+
+            removed_count, admin_count, removed = run_write(delete_expired)
+            for link_id, _, _ in removed:
+                forget_link_card(link_id)
+                journal.append('delete', link=link_id, reason='expired')
+            logger.info(
+                f"Cleanup completed at {current_time.strftime('%Y-%m-%d %H:%M:%S UTC')}. "
+                f"Removed {removed_count} regular user links and {admin_count} admin links."
+            )
+
+            # Deleted URLs cannot be removed from a Bloom filter, so rebuild it
+            if removed_count or admin_count:
+                rebuild_link_url_filter()
+
+            if NOTIFICATIONS_ENABLED and removed:
+                notifications.notify_expired(removed)
                 
         except Exception as e:
             logger.error(f"Error during link cleanup: {str(e)}")
 
+    def warn_expiring_links(self):
+        """Warn owners whose links the cleanup will remove soon"""
+        try:
+            notifications.warn_expiring_links(self.cleanup_days)
+        except Exception as e:
+            logger.error(f"Error sending expiry warnings: {str(e)}")
+
     def setup_schedule(self, runs_per_day: int, cleanup_days: int):
         """Setup the cleanup schedule"""
         try:
+            from apscheduler.triggers.cron import CronTrigger
+            from pytz import utc
+
             # Update configuration
             self.runs_per_day = max(1, min(24, runs_per_day))  # Ensure between 1 and 24
             self.cleanup_days = max(1, cleanup_days)  # Ensure at least 1 day
@@ -74,14 +105,17 @@ class LinkCleanupScheduler:
             # Calculate run hours
             run_hours = self.calculate_intervals()
             
-            # Remove existing jobs
-            self.scheduler.remove_all_jobs()
+            # Remove existing cleanup jobs; other jobs share this scheduler
+            for job in self.scheduler.get_jobs():
+                if job.id.startswith('cleanup_at_'):
+                    job.remove()
             
             # Add new jobs for each hour with explicit UTC timezone
             for hour in run_hours:
                 self.scheduler.add_job(
-                    self.cleanup_old_links,
+                    per_tenant(self.cleanup_old_links),
                     CronTrigger(hour=hour, timezone=utc),
+                    id=f'cleanup_at_{hour}',
                     name=f'cleanup_at_{hour}'
                 )
             
@@ -106,10 +140,12 @@ class LinkCleanupScheduler:
             logger.info("Link cleanup scheduler stopped")
 
     def get_next_run_times(self) -> List[str]:
-        """Get the next scheduled run times for all jobs"""
+        """Get the next scheduled run times for the cleanup jobs"""
         try:
             next_runs = []
             for job in self.scheduler.get_jobs():
+                if not job.id.startswith('cleanup_at_'):
+                    continue
                 next_run = job.next_run_time
                 if next_run:
                     next_runs.append(next_run.strftime("%Y-%m-%d %H:%M:%S UTC"))
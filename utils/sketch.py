@@ -0,0 +1,119 @@
+from array import array
+from hashlib import blake2b
+from threading import Lock
+from time import monotonic
+from typing import Dict, Hashable, List, Tuple
+
+
+class CountMinSketch:
+    """
+    Fixed-size frequency estimator. Estimates never undercount; they may
+    overcount by about total_count * e / width with probability 1 - e^-depth.
+    """
+
+    def __init__(self, width: int = 1024, depth: int = 4):
+        """
+        Args:
+            width (int): Counters per row
+            depth (int): Rows, each with its own hash
+        """
+        self.width = width
+        self.depth = depth
+        self._counts = array('I', bytes(4 * width * depth))
+
+    def _cells(self, key: Hashable) -> List[int]:
+        digest = blake2b(str(key).encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, key: Hashable, count: int = 1) -> int:
+        """Count key and return its new estimate."""
+        cells = self._cells(key)
+        for cell in cells:
+            self._counts[cell] += count
+        return min(self._counts[cell] for cell in cells)
+
+    def estimate(self, key: Hashable) -> int:
+        return min(self._counts[cell] for cell in self._cells(key))
+
+    def clear(self) -> None:
+        self._counts = array('I', bytes(4 * self.width * self.depth))
+
+
+class WindowedSketch:
+    """
+    Count-min estimates over a sliding time window, plus the heaviest keys
+    seen in it.
+
+    The window is split into buckets, each with its own sketch; a bucket is
+    cleared when it is reused, so memory stays fixed and counts older than
+    the window drop out one bucket at a time.
+    """
+
+    def __init__(self, window: float, buckets: int = 6, width: int = 2048, depth: int = 4,
+                 top_size: int = 20):
+        """
+        Args:
+            window (float): Window length in seconds
+            buckets (int): Number of sub-windows the window slides by
+            width (int): Counters per sketch row
+            depth (int): Rows per sketch
+            top_size (int): Heavy-hitter candidates kept
+        """
+        self.window = window
+        self.bucket_seconds = window / buckets
+        self.top_size = top_size
+        self._sketches = [CountMinSketch(width, depth) for _ in range(buckets)]
+        self._epochs = [-1] * buckets
+        self._top: Dict[Hashable, int] = {}
+        self._lock = Lock()
+
+    def _current(self, now: float) -> int:
+        """Return the live epoch, clearing the bucket it lands on if that is stale."""
+        epoch = int(now // self.bucket_seconds)
+        slot = epoch % len(self._sketches)
+        if self._epochs[slot] != epoch:
+            self._sketches[slot].clear()
+            self._epochs[slot] = epoch
+        return epoch
+
+    def _estimate(self, key: Hashable, epoch: int) -> int:
+        oldest = epoch - len(self._sketches) + 1
+        return sum(
+            sketch.estimate(key)
+            for sketch, bucket_epoch in zip(self._sketches, self._epochs)
+            if bucket_epoch >= oldest
+        )
+
+    def add(self, key: Hashable, now: float = None) -> int:
+        """Count one event for key and return its estimate over the window."""
+        now = monotonic() if now is None else now
+        with self._lock:
+            epoch = self._current(now)
+            self._sketches[epoch % len(self._sketches)].add(key)
+            estimate = self._estimate(key, epoch)
+
+            if key in self._top or len(self._top) < self.top_size:
+                self._top[key] = estimate
+            else:
+                smallest = min(self._top, key=self._top.get)
+                if estimate > self._top[smallest]:
+                    del self._top[smallest]
+                    self._top[key] = estimate
+            return estimate
+
+    def estimate(self, key: Hashable, now: float = None) -> int:
+        now = monotonic() if now is None else now
+        with self._lock:
+            return self._estimate(key, self._current(now))
+
+    def top(self, limit: int = 10, now: float = None) -> List[Tuple[Hashable, int]]:
+        """Return the heaviest keys in the window with fresh estimates, largest first."""
+        now = monotonic() if now is None else now
+        with self._lock:
+            epoch = self._current(now)
+            fresh = {key: self._estimate(key, epoch) for key in self._top}
+            # Keys whose counts have all slid out of the window free their place
+            self._top = {key: count for key, count in fresh.items() if count}
+            return sorted(self._top.items(), key=lambda item: item[1], reverse=True)[:limit]
@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, List, Tuple
+from utils.logger import logger
+
+
+class StartupTimer:
+    """Collects how long each startup phase took, for one summary log line."""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+
+    def record(self, name: str, duration_ms: float) -> None:
+        self.phases.append((name, duration_ms))
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the with-block as one named phase."""
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (perf_counter() - started) * 1000)
+
+    def summary(self) -> str:
+        total = sum(duration_ms for _, duration_ms in self.phases)
+        parts = [f"{name} {duration_ms:.0f} ms" for name, duration_ms in self.phases]
+        return f"{', '.join(parts)} (total {total:.0f} ms)"
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Run the work the first updates would otherwise pay for: load the ranked
+    link list and build its keyboard, read the users table, compile the
+    content filter and validators and open the search index. This fills the
+    database page cache and SQLAlchemy's compiled statement cache.
+
+    Returns:
+        Dict[str, float]: Duration of each step in milliseconds
+    """
+    from sqlalchemy import func
+    from database import get_read_session, get_link_page, search_links
+    from handlers.link_handlers import create_links_keyboard
+    from handlers.validation import is_valid_title, is_valid_group_link
+    from models.user_model import User
+
+    timings = {}
+
+    def step(name: str, function) -> None:
+        started = perf_counter()
+        try:
+            function()
+        except Exception as e:
+            logger.error(f"Warm-up step {name} failed: {str(e)}")
+        timings[name] = (perf_counter() - started) * 1000
+
+    def links():
+        links, total_links = get_link_page()
+        create_links_keyboard(links, total_links=total_links)
+
+    def users():
+        with get_read_session() as session:
+            session.query(func.count(User.user_id)).scalar()
+            session.query(User).filter(User.user_id == 0).first()
+
+    def validators():
+        is_valid_title("Warm up")
+        is_valid_group_link("https://t.me/warm_up")
+
+    step('links', links)
+    step('users', users)
+    step('validators', validators)
+    step('search', lambda: search_links("warm"))
+
+    logger.info("Warm-up finished: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in timings.items()))
+    return timings
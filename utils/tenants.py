@@ -0,0 +1,157 @@
+"""
+Multi-bot mode: several near-identical bots served by one process.
+
+Each tenant is one bot with its own token, database and admins. All bots
+share the handler worker pool, the scheduler, the caches and the journal;
+the tenant whose update (or job) is running is kept in a thread-local
+context, and the database layer, is_admin, cache keys, backups and the
+journal consult it. Outside multi-bot mode there is no tenant and
+everything reads config.py as before.
+
+BOTS_FILE is a JSON list such as:
+
+    [
+        {"name": "links", "token": "123:abc", "admins": [111]},
+        {"name": "groups", "token": "456:def", "database_uri": "sqlite:///groups.db"}
+    ]
+"""
+import json
+import os
+from contextlib import contextmanager
+from functools import wraps
+from threading import local
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Sequence
+from utils.logger import logger
+from config import ADMINS
+
+
+class Tenant(NamedTuple):
+    """One hosted bot."""
+    name: str
+    token: str
+    database_uri: str
+    admins: tuple
+
+
+# Tenants hosted by this process and their TeleBot instances; empty in single-bot mode
+tenants: List[Tenant] = []
+bots: Dict[str, Any] = {}
+
+_context = local()
+
+
+def load_tenants(path: str) -> List[Tenant]:
+    """
+    Read the bot list from a JSON file.
+
+    Args:
+        path (str): File holding a list of {name, token, database_uri?, admins?};
+            database_uri defaults to sqlite:///<name>.db and admins to config.ADMINS
+
+    Returns:
+        List[Tenant]: The configured bots
+
+    Raises:
+        ValueError: A bot has no name or token, or two bots share a name or token
+    """
+    with open(path, encoding='utf-8') as handle:
+        entries = json.load(handle)
+
+    loaded = []
+    for entry in entries:
+        name, token = entry.get('name'), entry.get('token')
+        if not name or not token:
+            raise ValueError(f"Every bot in {path} needs a name and a token")
+        loaded.append(Tenant(
+            name=name,
+            token=token,
+            database_uri=entry.get('database_uri') or f"sqlite:///{name}.db",
+            admins=tuple(entry.get('admins', ADMINS)),
+        ))
+
+    for field in ('name', 'token'):
+        values = [getattr(tenant, field) for tenant in loaded]
+        if len(values) != len(set(values)):
+            raise ValueError(f"Bots in {path} must have distinct {field}s")
+    return loaded
+
+
+def current_tenant() -> Optional[Tenant]:
+    """The tenant whose work runs on this thread, or None."""
+    return getattr(_context, 'tenant', None)
+
+
+@contextmanager
+def tenant_context(tenant: Optional[Tenant]):
+    """Run the with-block as the given tenant."""
+    previous = current_tenant()
+    _context.tenant = tenant
+    try:
+        yield tenant
+    finally:
+        _context.tenant = previous
+
+
+def bind_tenant(function: Callable) -> Callable:
+    """Capture the current tenant so function runs as it on whichever thread calls it."""
+    tenant = current_tenant()
+    if tenant is None:
+        return function
+
+    @wraps(function)
+    def bound(*args, **kwargs):
+        with tenant_context(tenant):
+            return function(*args, **kwargs)
+    return bound
+
+
+def current_bot():
+    """The TeleBot of the current tenant, or config.bot in single-bot mode."""
+    tenant = current_tenant()
+    if tenant is not None:
+        return bots[tenant.name]
+    import config
+    return config.bot
+
+
+def admin_ids() -> Sequence[int]:
+    """Admins of the current tenant, or config.ADMINS."""
+    tenant = current_tenant()
+    return tenant.admins if tenant is not None else ADMINS
+
+
+def tenant_key(key: Hashable) -> Hashable:
+    """Qualify a shared cache key with the current tenant, whose ids overlap with other tenants'."""
+    tenant = current_tenant()
+    return (tenant.name, key) if tenant is not None else key
+
+
+def tenant_directory(base: str) -> str:
+    """A per-tenant subdirectory of base for files such as backups."""
+    tenant = current_tenant()
+    return os.path.join(base, tenant.name) if tenant is not None else base
+
+
+def for_each_tenant(function: Callable, *args, **kwargs) -> None:
+    """
+    Call function once per hosted tenant, inside its context; a failure for
+    one tenant is logged and does not stop the others. In single-bot mode
+    function is simply called once.
+    """
+    if not tenants:
+        function(*args, **kwargs)
+        return
+    for tenant in list(tenants):
+        with tenant_context(tenant):
+            try:
+                function(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Error running {getattr(function, '__name__', function)} for bot {tenant.name}: {str(e)}")
+
+
+def per_tenant(function: Callable) -> Callable:
+    """Wrap a scheduler job so one shared job serves every tenant."""
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        for_each_tenant(function, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,126 @@
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+
+_local = threading.local()
+
+
+class Span:
+    """One timed step of an update: handler, session, query or API call."""
+    __slots__ = ('name', 'depth', 'start', 'duration', 'attributes')
+
+    def __init__(self, name: str, depth: int, start: float, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.depth = depth
+        self.start = start
+        self.duration = 0.0
+        self.attributes = attributes or {}
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'depth': self.depth,
+            'offset_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round(self.duration * 1000, 3),
+            **self.attributes,
+        }
+
+
+class Trace:
+    """All spans recorded while one update was handled."""
+
+    def __init__(self, name: str, payload: Any = None):
+        self.name = name
+        self.payload = payload
+        self.started = perf_counter()
+        self.duration = 0.0
+        self.spans: List[Span] = []
+        self._depth = 0
+
+    def summary(self) -> Dict[str, float]:
+        """Total milliseconds per span name, e.g. db.session, db.query, api.sendMessage."""
+        totals: Dict[str, float] = {}
+        for recorded in self.spans:
+            totals[recorded.name] = totals.get(recorded.name, 0.0) + recorded.duration * 1000
+        return {name: round(total, 3) for name, total in totals.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'duration_ms': round(self.duration * 1000, 3),
+            'summary_ms': self.summary(),
+            'spans': [recorded.to_dict(self.started) for recorded in self.spans],
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    """Return the trace of the update handled by this thread, if any."""
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def trace(name: str, payload: Any = None):
+    """Collect spans for one update handled on this thread."""
+    if current_trace() is not None:
+        # Nested handler call (e.g. one handler invoking another); keep the outer trace
+        with span(f'handler.{name}'):
+            yield current_trace()
+        return
+
+    active = Trace(name, payload)
+    _local.trace = active
+    try:
+        yield active
+    finally:
+        active.duration = perf_counter() - active.started
+        _local.trace = None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block as a span of the current trace; a no-op outside a trace."""
+    active = current_trace()
+    if active is None:
+        yield None
+        return
+
+    active._depth += 1
+    recorded = Span(name, active._depth, perf_counter(), attributes)
+    active.spans.append(recorded)
+    try:
+        yield recorded
+    finally:
+        recorded.duration = perf_counter() - recorded.start
+        active._depth -= 1
+
+
+def install_query_tracing(engine) -> None:
+    """Record every SQL statement executed on the engine as a span."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        active = current_trace()
+        if active is not None:
+            active._depth += 1
+            recorded = Span('db.query', active._depth, perf_counter(), {'sql': statement[:200]})
+            active.spans.append(recorded)
+            conn.info.setdefault('trace_spans', []).append(recorded)
+
+    def finish_query_span(conn) -> None:
+        pending = conn.info.get('trace_spans')
+        active = current_trace()
+        if pending and active is not None:
+            recorded = pending.pop()
+            recorded.duration = perf_counter() - recorded.start
+            active._depth -= 1
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        finish_query_span(conn)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        if exception_context.connection is not None:
+            finish_query_span(exception_context.connection)
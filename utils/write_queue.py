@@ -0,0 +1,121 @@
+import queue
+import threading
+from concurrent.futures import Future
+from time import monotonic, perf_counter
+from typing import Callable, List, Optional, Tuple
+from utils.logger import logger
+from utils.metrics import WRITE_BATCH_SIZE, WRITE_QUEUE_WAIT, DB_SESSION_ERRORS
+
+# Sentinel that tells the writer thread to exit
+_STOP = object()
+
+
+class WriteQueue:
+    """
+    Funnel database mutations through one writer thread.
+
+    Operations are callables taking a session. The writer takes up to
+    batch_size queued operations, runs each inside its own savepoint and
+    commits them together, so one fsync covers the whole batch. A failing
+    operation only rolls back its savepoint; its caller gets the exception
+    and the rest of the batch still commits.
+    """
+
+    def __init__(self, session_factory, batch_size: int = 64, batch_wait: float = 0.002):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    def submit(self, operation: Callable, timeout: Optional[float] = None):
+        """
+        Run operation(session) on the writer thread and wait for its result.
+
+        Raises:
+            Exception: Whatever the operation or the batch commit raised
+        """
+        if threading.current_thread() is self._thread:
+            # Nested write from inside an operation: it joins the current batch
+            with self._session.begin_nested():
+                return operation(self._session)
+
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((operation, future, perf_counter()))
+        return future.result(timeout)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self._thread.start()
+                logger.info("Database writer thread started")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Finish the queued operations and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _take_batch(self) -> Tuple[List[Tuple], bool]:
+        """Block for one operation, then collect more for up to batch_wait seconds."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._take_batch()
+            if batch:
+                self._execute(batch)
+
+    def _execute(self, batch: List[Tuple]) -> None:
+        """Run one batch in a single transaction and resolve its futures."""
+        now = perf_counter()
+        WRITE_BATCH_SIZE.observe(len(batch))
+        results = []
+        session = self._session = self.session_factory()
+        try:
+            for operation, future, queued_at in batch:
+                WRITE_QUEUE_WAIT.observe(now - queued_at)
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with session.begin_nested():
+                        results.append((future, operation(session)))
+                except Exception as e:
+                    future.set_exception(e)
+
+            session.commit()
+            for future, result in results:
+                future.set_result(result)
+        except Exception as e:
+            session.rollback()
+            DB_SESSION_ERRORS.inc()
+            logger.error(f"Error committing write batch of {len(batch)}: {str(e)}")
+            for future, _ in results:
+                future.set_exception(e)
+        finally:
+            session.close()
+            self._session = None